@@ -1,9 +1,11 @@
-from flask import Flask, render_template, request, redirect, session, url_for, make_response, flash, jsonify
+from flask import Flask, render_template, request, redirect, session, url_for, make_response, flash, jsonify, Response, stream_with_context, g, has_app_context
 import sqlite3
-import joblib
 import numpy as np
+import errno
 import io
+import json
 import smtplib
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
@@ -16,6 +18,24 @@ import secrets
 import uuid
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from metrics import PDF_SECONDS, REQUEST_SECONDS, SMTP_SECONDS, exposition, record_predictions
+from db import DEFAULT_DB_PATH, DEFAULT_PROFILE, ConnectionPool, effective_pragmas
+from migrations import LATEST_VERSION, migrate
+from dashboard_stats import read_dashboard_stats
+from user_stats import read_user_stats
+from patient_search import search_patients
+from pagination import fetch_page
+from patient_export import ExportError, columnar_available, export_csv, export_parquet, parse_options as parse_export_options
+from model_registry import ModelRegistry
+from model_store import ModelStore, load_engine
+from rescoring import RescoringBusy, RescoringJob
+from prediction_cache import ArtifactFingerprint, PredictionCache
+from inference_threads import configure as configure_inference_threads
+from inference import MODEL_NAMES, PREDICTION_COLUMNS, prediction_values, stored_prediction
+from staging import classify_stage, classify_stages
+from coalescer import PredictionCoalescer
+from shadow import ShadowEvaluator
+from features import MEDICAL_RANGES, canonicalize_features, BatchFormatError, rows_from_csv, rows_from_json, validate_feature_matrix
 
 # Load environment variables
 load_dotenv()
@@ -552,6 +572,25 @@ translations = {
     }
 }
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.labels(route=route, method=request.method,
+                               status=response.status_code).observe(time.perf_counter() - started)
+    return response
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = exposition()
+    return Response(body, content_type=content_type)
+
 @app.context_processor
 def inject_translations():
     lang = session.get('lang', 'en')
@@ -576,99 +615,185 @@ EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
 FROM_EMAIL = f"Diabetes Health App <{EMAIL_USERNAME}>"
 EMAIL_CONFIGURED = os.getenv('EMAIL_CONFIGURED', 'False').lower() == 'true'
 
+# Batch prediction API
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', '1000'))
+
+# Micro-batching of concurrent /predict requests
+PREDICT_COALESCE = os.getenv('PREDICT_COALESCE', 'True').lower() == 'true'
+PREDICT_COALESCE_WAIT_MS = float(os.getenv('PREDICT_COALESCE_WAIT_MS', '2'))
+PREDICT_COALESCE_MAX_ROWS = int(os.getenv('PREDICT_COALESCE_MAX_ROWS', '32'))
+
+# Cache of /predict results for repeated identical inputs (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '2048'))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '3600'))
+
+MODEL_ARTIFACTS = ["scaler.pkl", "diabetes_model_lr.pkl", "diabetes_model_rf.pkl", "diabetes_model_xgb.pkl",
+                   "compiled/manifest.json"]
+
 # Load ML models & scaler
-try:
-    # Load all three models
-    model_lr = joblib.load("diabetes_model_lr.pkl")
-    model_rf = joblib.load("diabetes_model_rf.pkl")
-    model_xgb = joblib.load("diabetes_model_xgb.pkl")
-    scaler = joblib.load("scaler.pkl")
-    # Keep legacy model for backward compatibility
-    model = model_lr
-    print("✅ Multi-Model AI System Loaded:")
-    print("   • Logistic Regression")
-    print("   • Random Forest")
-    print("   • XGBoost")
-except FileNotFoundError:
-    print("Warning: ML model files not found. Please run train_model.py first.")
-    model = None
-    model_lr = None
-    model_rf = None
-    model_xgb = None
-    scaler = None
+USE_COMPILED_MODELS = os.getenv('USE_COMPILED_MODELS', 'True').lower() == 'true'
+# Memory-map the compiled model arrays so all workers share one page-cache copy
+COMPILED_MODELS_MMAP = os.getenv('COMPILED_MODELS_MMAP', 'True').lower() == 'true'
+# background: load on a thread at startup, lazy: load on first prediction, eager: load during import
+MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'background').lower()
+# How long a prediction request waits for models that are still loading
+MODEL_WAIT_TIMEOUT = float(os.getenv('MODEL_WAIT_TIMEOUT', '30'))
+# Versioned model bundles; when it has a current version it replaces the .pkl files above
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'model_registry')
+# Seconds between checks for a new current model version (0 disables hot swapping)
+MODEL_POLL_INTERVAL = float(os.getenv('MODEL_POLL_INTERVAL', '5'))
+
+# Threads per model call; requests already run concurrently, so inference should not fan out
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '1'))
+# "" (no pinning), a CPU list such as "0-3", or "worker" (one CPU per gunicorn worker, see gunicorn.conf.py)
+INFERENCE_CPU_AFFINITY = os.getenv('INFERENCE_CPU_AFFINITY', '')
+
+inference_threads = configure_inference_threads(INFERENCE_THREADS, INFERENCE_CPU_AFFINITY)
+thread_pools = ", ".join(f"{pool['api']}={pool['threads']}" for pool in inference_threads['pools'])
+print(f"🧵 Inference threads: {INFERENCE_THREADS} per call ({thread_pools or 'no native pools'}), "
+      f"CPUs {inference_threads['cpu_affinity']}")
+
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR)
+model_fingerprint = ArtifactFingerprint(MODEL_ARTIFACTS)
+
+def current_model_version():
+    """Registry's current version, or a content fingerprint of the .pkl files without a registry"""
+    return model_registry.current_version() or model_fingerprint.version()
+
+def load_model_version(version):
+    """Load the active version: the .pkl files only while the registry has no current version"""
+    if model_registry.current_version() is None:
+        return load_engine(USE_COMPILED_MODELS, COMPILED_MODELS_MMAP, directory=".", n_jobs=INFERENCE_THREADS)
+    return load_registry_version(version)
+
+def load_registry_version(version):
+    """Load a published version; never falls back to the .pkl files"""
+    directory = model_registry.version_dir(version)
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(errno.ENOENT, f"Model version {version!r} is not in the registry", directory)
+    return load_engine(USE_COMPILED_MODELS, COMPILED_MODELS_MMAP, directory=directory, n_jobs=INFERENCE_THREADS)
+
+model_store = ModelStore(load_model_version,
+                         version_provider=current_model_version,
+                         poll_interval=MODEL_POLL_INTERVAL)
+if MODEL_LOAD_MODE == 'eager':
+    model_store.load()
+elif MODEL_LOAD_MODE == 'background':
+    model_store.start()
+
+def get_engine():
+    """Return the loaded EnsembleEngine (None if the models are unavailable)"""
+    return model_store.get_engine(timeout=MODEL_WAIT_TIMEOUT)
+
+coalescer = PredictionCoalescer(get_engine,
+                                max_wait_ms=PREDICT_COALESCE_WAIT_MS,
+                                max_batch=PREDICT_COALESCE_MAX_ROWS)
+
+# Keyed on the active model version, so a swap never serves the previous model's results
+prediction_cache = PredictionCache(max_entries=PREDICTION_CACHE_SIZE,
+                                   ttl_seconds=PREDICTION_CACHE_TTL,
+                                   version_provider=lambda: model_store.version)
+
+# Background rescoring of stored patients after a model upgrade
+RESCORE_CHUNK_SIZE = int(os.getenv('RESCORE_CHUNK_SIZE', '500'))
+# Share of wall time the job may hold the database write lock
+RESCORE_DUTY_CYCLE = float(os.getenv('RESCORE_DUTY_CYCLE', '0.25'))
+
+rescoring_job = RescoringJob(lambda: get_db_connection(), get_engine,
+                             chunk_size=RESCORE_CHUNK_SIZE, duty_cycle=RESCORE_DUTY_CYCLE)
+
+# Shadow evaluation of a candidate registry version on sampled /predict traffic
+SHADOW_MODEL_VERSION = os.getenv('SHADOW_MODEL_VERSION', '')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', '1000'))
+SHADOW_BATCH_SIZE = int(os.getenv('SHADOW_BATCH_SIZE', '64'))
+
+shadow = ShadowEvaluator(lambda: get_db_connection(), load_registry_version,
+                         candidate_version=SHADOW_MODEL_VERSION, sample_rate=SHADOW_SAMPLE_RATE,
+                         queue_size=SHADOW_QUEUE_SIZE, batch_size=SHADOW_BATCH_SIZE)
+
+def score_features(features):
+    """Score one feature vector, sharing the model call with concurrent requests when enabled"""
+    if PREDICT_COALESCE:
+        return coalescer.predict_one(features)
+    return get_engine().predict_one(features)
+
+# Database connection pool (see db.py)
+DATABASE_PATH = os.getenv('DATABASE_PATH', DEFAULT_DB_PATH)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+# safe / balanced / fast: WAL plus synchronous, cache and mmap settings (see db.py)
+DB_PRAGMA_PROFILE = os.getenv('DB_PRAGMA_PROFILE', DEFAULT_PROFILE).lower()
+db_pool = ConnectionPool(DATABASE_PATH, size=DB_POOL_SIZE, profile=DB_PRAGMA_PROFILE)
+# Records per history page (keyset pagination, see pagination.py)
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
 
 # Database connection helper
 def get_db_connection():
-    """Get database connection with error handling"""
+    """Get a pooled database connection with error handling
+
+    Inside a request the connection is shared by every call and returned to
+    the pool at teardown, so close() there is a no-op.  Elsewhere close()
+    returns it to the pool.
+    """
     try:
-        conn = sqlite3.connect("diabetes_app.db", timeout=10)
-        conn.row_factory = sqlite3.Row
-        return conn
+        if has_app_context():
+            conn = g.get('db')
+            if conn is None or not conn.checked_out:
+                conn = g.db = db_pool.acquire()
+                conn.bound = True
+            return conn
+        return db_pool.acquire()
     except sqlite3.Error as e:
         print(f"Database connection error: {e}")
         return None
 
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+# Columns written for every saved prediction, per-model outputs included
+PATIENT_INSERT_COLUMNS = ["user_id", "name", "age", "pregnancies", "glucose", "bp", "skin", "insulin", "bmi",
+                          "dpf", "result", "stage", "suggestion", "model_version", *PREDICTION_COLUMNS]
+INSERT_PATIENT_SQL = (f"/* query: insert_patient */ INSERT INTO patients ({','.join(PATIENT_INSERT_COLUMNS)}) "
+                      f"VALUES ({','.join('?' * len(PATIENT_INSERT_COLUMNS))})")
+
+# Patient fields used by the PDF report and the share email, stored model outputs last
+REPORT_SELECT_SQL = ("/* query: patient_report */ SELECT name, age, glucose, bmi, bp, result, stage, suggestion, "
+                     f"{', '.join(PREDICTION_COLUMNS)} FROM patients")
+REPORT_PREDICTION_OFFSET = 8
+
 # Database initialization
 def init_db():
+    """Create or upgrade the schema (see migrations.py) and log the effective SQLite settings"""
     conn = get_db_connection()
     if not conn:
         print("Failed to initialize database")
         return False
-    cursor = conn.cursor()
-    
-    # Users table with email and reset token
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            email TEXT UNIQUE,
-            password TEXT,
-            role TEXT,
-            is_verified INTEGER DEFAULT 0,
-            verification_token TEXT,
-            reset_token TEXT,
-            reset_expires DATETIME,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Patients table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS patients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            name TEXT,
-            age INTEGER,
-            pregnancies INTEGER,
-            glucose REAL,
-            bp REAL,
-            skin REAL,
-            insulin REAL,
-            bmi REAL,
-            dpf REAL,
-            result TEXT,
-            stage TEXT,
-            suggestion TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    """)
-    
-    # Admin logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS admin_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            admin_user TEXT,
-            action TEXT,
-            target_user TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+    try:
+        applied = migrate(conn)
+        if applied:
+            print(f"🗄️  Applied schema migrations {', '.join(map(str, applied))} (schema version {LATEST_VERSION})")
+        log_db_settings(conn)
+    finally:
+        conn.close()
     return True
 
+def log_db_settings(conn):
+    """Print the pragmas SQLite actually applied; warns when WAL could not be enabled"""
+    try:
+        settings = effective_pragmas(conn, db_pool.pragmas)
+    except sqlite3.Error as e:
+        print(f"Database settings check failed: {e}")
+        return None
+    print(f"🗄️  SQLite {DATABASE_PATH} ({DB_PRAGMA_PROFILE}): "
+          + ", ".join(f"{name}={value}" for name, value in settings.items()))
+    if str(settings.get('journal_mode')).lower() != 'wal':
+        print(f"⚠️  WAL mode not active (journal_mode={settings.get('journal_mode')}); "
+              "writers will block dashboard readers")
+    return settings
+
 def hash_password(password):
     """Hash password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -723,11 +848,17 @@ def send_email(to_email, subject, body, attachment_data=None, attachment_name=No
             part.add_header('Content-Disposition', f'attachment; filename={attachment_name}')
             msg.attach(part)
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_USERNAME, to_email, msg.as_string())
-        server.quit()
+        started = time.perf_counter()
+        try:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+            server.starttls()
+            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
+            server.sendmail(EMAIL_USERNAME, to_email, msg.as_string())
+            server.quit()
+        except Exception:
+            SMTP_SECONDS.labels(outcome="error").observe(time.perf_counter() - started)
+            raise
+        SMTP_SECONDS.labels(outcome="sent").observe(time.perf_counter() - started)
 
         print(f"✅ Email sent successfully to {to_email}")
         return True
@@ -810,6 +941,7 @@ Diabetes Health App Team
 
     return send_email(email, subject, body, html_body=html_body)
 
+@PDF_SECONDS.time()
 def generate_pdf_report(patient_data):
     """Generate comprehensive PDF report with detailed health analysis"""
     from reportlab.lib.colors import HexColor, black, white
@@ -922,22 +1054,12 @@ def generate_pdf_report(patient_data):
 
     y -= 30
 
-    # Recalculate predictions from all models
-    try:
-        features_for_pred = [0, patient_data[2], patient_data[4], 0, 0, patient_data[3], 0, patient_data[1]]  # Basic features
-        features_scaled = scaler.transform([features_for_pred])
-
-        pred_lr = model_lr.predict(features_scaled)[0]
-        pred_rf = model_rf.predict(features_scaled)[0]
-        pred_xgb = model_xgb.predict(features_scaled)[0]
-
-        prob_lr = model_lr.predict_proba(features_scaled)[0][1] * 100
-        prob_rf = model_rf.predict_proba(features_scaled)[0][1] * 100
-        prob_xgb = model_xgb.predict_proba(features_scaled)[0][1] * 100
-
-        votes = [pred_lr, pred_rf, pred_xgb]
-        agreement = sum(votes)
-        agreement_text = "All Models Agree (100%)" if agreement in [0, 3] else "Majority Consensus (67%)"
+    # Per-model outputs stored when the prediction was made
+    ensemble = stored_prediction(patient_data[REPORT_PREDICTION_OFFSET:])
+    if ensemble:
+        pred_lr, pred_rf, pred_xgb = ensemble['votes']
+        prob_lr, prob_rf, prob_xgb = ensemble['probabilities']
+        agreement_text = ensemble['agreement_text']
 
         c.setFont("Helvetica", 11)
         c.drawString(70, y, f"Model Agreement: {agreement_text}")
@@ -954,8 +1076,6 @@ def generate_pdf_report(patient_data):
         y -= 16
         c.drawString(90, y, f"• XGBoost: {'Diabetic' if pred_xgb == 1 else 'Not Diabetic'} ({prob_xgb:.1f}% confidence)")
         y -= 25
-    except:
-        pass  # Fallback if models not available
 
     # Final Prediction Result
     c.setFont("Helvetica-Bold", 16)
@@ -1151,6 +1271,7 @@ def login():
 
             # First check if user exists with this username or email
             cursor.execute("""
+                /* query: login_lookup */
                 SELECT id, role, username, email FROM users
                 WHERE username=? OR email=?
             """, (username_or_email, username_or_email))
@@ -1163,6 +1284,7 @@ def login():
 
             # Now check with password and verification status
             cursor.execute("""
+                /* query: login_check */
                 SELECT id, role, username, is_verified, email FROM users
                 WHERE (username=? OR email=?) AND password=?
             """, (username_or_email, username_or_email, hashed_password))
@@ -1242,6 +1364,7 @@ def register():
             is_verified = 0 if EMAIL_CONFIGURED else 1
 
             cursor.execute("""
+                /* query: register_user */
                 INSERT INTO users (username, email, password, role, verification_token, is_verified)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (username, email, hashed_password, role, verification_token, is_verified))
@@ -1271,11 +1394,12 @@ def register():
 def verify_email(token):
     """Verify email address with token"""
     try:
-        conn = sqlite3.connect("diabetes_app.db")
+        conn = get_db_connection()
         cursor = conn.cursor()
 
         # Check if token exists and is valid
         cursor.execute("""
+            /* query: verify_email_lookup */
             SELECT id, username, email, is_verified
             FROM users
             WHERE verification_token = ?
@@ -1295,6 +1419,7 @@ def verify_email(token):
 
         # Verify the email
         cursor.execute("""
+            /* query: verify_email */
             UPDATE users
             SET is_verified = 1, verification_token = NULL
             WHERE id = ?
@@ -1316,9 +1441,9 @@ def forgot_password():
     if request.method == "POST":
         email = request.form["email"]
         
-        conn = sqlite3.connect("diabetes_app.db")
+        conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE email=?", (email,))
+        cursor.execute("/* query: forgot_password_lookup */ SELECT id FROM users WHERE email=?", (email,))
         user = cursor.fetchone()
         
         if user:
@@ -1327,6 +1452,7 @@ def forgot_password():
             expires = datetime.now() + timedelta(hours=1)
             
             cursor.execute("""
+                /* query: forgot_password_token */
                 UPDATE users SET reset_token=?, reset_expires=? WHERE email=?
             """, (reset_token, expires, email))
             conn.commit()
@@ -1363,9 +1489,10 @@ def forgot_password():
 
 @app.route("/reset-password/<token>", methods=["GET", "POST"])
 def reset_password(token):
-    conn = sqlite3.connect("diabetes_app.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
+        /* query: reset_password_lookup */
         SELECT id FROM users 
         WHERE reset_token=? AND reset_expires > ?
     """, (token, datetime.now()))
@@ -1385,6 +1512,7 @@ def reset_password(token):
         else:
             hashed_password = hash_password(new_password)
             cursor.execute("""
+                /* query: reset_password */
                 UPDATE users 
                 SET password=?, reset_token=NULL, reset_expires=NULL 
                 WHERE reset_token=?
@@ -1418,21 +1546,18 @@ def admin_dashboard():
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
     
-    conn = sqlite3.connect("diabetes_app.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get statistics
-    cursor.execute("SELECT COUNT(*) FROM users")
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role='doctor'")
-    total_doctors = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM patients")
-    total_predictions = cursor.fetchone()[0]
+    # Get statistics (maintained by triggers, see dashboard_stats.py)
+    dashboard = read_dashboard_stats(conn)
+    total_users = dashboard['total_users']
+    total_doctors = dashboard['roles'].get('doctor', 0)
+    total_predictions = dashboard['total_patients']
     
     # Get recent users
     cursor.execute("""
+        /* query: admin_recent_users */
         SELECT id, username, email, role, created_at 
         FROM users 
         ORDER BY created_at DESC 
@@ -1442,6 +1567,7 @@ def admin_dashboard():
     
     # Get admin logs
     cursor.execute("""
+        /* query: admin_recent_logs */
         SELECT admin_user, action, target_user, timestamp 
         FROM admin_logs 
         ORDER BY timestamp DESC 
@@ -1463,21 +1589,22 @@ def admin_delete_user(user_id):
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
     
-    conn = sqlite3.connect("diabetes_app.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Get username before deleting
-    cursor.execute("SELECT username FROM users WHERE id=?", (user_id,))
+    cursor.execute("/* query: delete_user_lookup */ SELECT username FROM users WHERE id=?", (user_id,))
     user = cursor.fetchone()
     
     if user:
         # Delete user's patients first
-        cursor.execute("DELETE FROM patients WHERE user_id=?", (user_id,))
+        cursor.execute("/* query: delete_user_patients */ DELETE FROM patients WHERE user_id=?", (user_id,))
         # Delete user
-        cursor.execute("DELETE FROM users WHERE id=?", (user_id,))
+        cursor.execute("/* query: delete_user */ DELETE FROM users WHERE id=?", (user_id,))
         
         # Log admin action
         cursor.execute("""
+            /* query: admin_log */
             INSERT INTO admin_logs (admin_user, action, target_user) 
             VALUES (?, ?, ?)
         """, (session.get("admin_user"), "DELETE_USER", user[0]))
@@ -1490,6 +1617,113 @@ def admin_delete_user(user_id):
     conn.close()
     return redirect(url_for("admin_dashboard"))
 
+@app.route("/admin/coalescer-stats")
+def admin_coalescer_stats():
+    """Queue-depth and batch-size metrics of the /predict coalescer"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    return jsonify(enabled=PREDICT_COALESCE, **coalescer.stats())
+
+@app.route("/admin/db-pool-stats")
+def admin_db_pool_stats():
+    """Connection reuse and churn counters of this worker's database pool"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    return jsonify(db_pool.stats())
+
+@app.route("/admin/prediction-cache-stats")
+def admin_prediction_cache_stats():
+    """Hit/miss counters of the /predict result cache"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    return jsonify(prediction_cache.stats())
+
+@app.route("/admin/models", methods=["GET", "POST"])
+def admin_models():
+    """Registry versions and this worker's active model; POST checks for a new version now"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    if request.method == "POST":
+        model_store.request_reload()
+    return jsonify({
+        "active": model_store.status(),
+        "threads": inference_threads,
+        "current": model_registry.current_version(),
+        "versions": model_registry.versions(),
+    })
+
+@app.route("/admin/shadow")
+def admin_shadow():
+    """Candidate-vs-active disagreement and latency from the shadow_results table"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database not available"}), 503
+    try:
+        worker = shadow.stats()
+        body = {"worker": worker, "results": shadow.summary(conn)}
+        if worker["candidate_error"]:
+            body["error"] = f"Candidate model failed to load: {worker['candidate_error']}"
+        return jsonify(body)
+    finally:
+        conn.close()
+
+@app.route("/admin/rescore", methods=["GET", "POST"])
+def admin_rescore():
+    """Progress and ETA of the patients rescoring job; POST starts or resumes it"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    try:
+        if request.method == "POST":
+            return jsonify(rescoring_job.start()), 202
+        return jsonify(rescoring_job.progress() or {"status": "idle"})
+    except RescoringBusy as e:
+        return jsonify(e.progress), 409
+    except (RuntimeError, sqlite3.Error) as e:
+        return jsonify({"error": str(e)}), 503
+
+@app.route("/admin/rescore/stop", methods=["POST"])
+def admin_rescore_stop():
+    """Pause the running rescoring job; POST /admin/rescore resumes it"""
+    if not session.get("admin"):
+        return jsonify({"error": "Admin access required"}), 403
+    try:
+        return jsonify(rescoring_job.stop())
+    except sqlite3.Error as e:
+        return jsonify({"error": str(e)}), 503
+
+@app.route("/readyz")
+def readyz():
+    """Readiness probe: 200 once the models, scaler and database can serve predictions"""
+    # Does not wait, but kicks off loading in lazy mode or in a freshly forked worker
+    engine = model_store.get_engine(timeout=0)
+
+    models = model_store.status()
+    if engine is None:
+        scaler = {"ready": False}
+    elif engine.scaler is not None:
+        scaler = {"ready": True, "mode": "standalone"}
+    elif all(getattr(m, "accepts_raw_features", False) for m in engine.models):
+        scaler = {"ready": True, "mode": "folded into compiled models"}
+    else:
+        scaler = {"ready": False, "error": "Scaler missing for a model that needs scaled input"}
+
+    database = {"ready": False}
+    conn = get_db_connection()
+    if conn:
+        try:
+            conn.execute("/* query: readyz */ SELECT 1 FROM patients LIMIT 1").fetchone()
+            database = {"ready": True}
+        except sqlite3.Error as e:
+            database["error"] = str(e)
+        finally:
+            conn.close()
+
+    checks = {"models": models, "scaler": scaler, "database": database}
+    ready = all(check["ready"] for check in checks.values())
+    return jsonify({"status": "ready" if ready else "not ready", "checks": checks}), 200 if ready else 503
+
 @app.route("/dashboard")
 def dashboard():
     if "user_id" not in session:
@@ -1504,37 +1738,12 @@ def validate_medical_input(name, age, pregnancies, glucose, bp, skin, insulin, b
     if not name or len(name.strip()) < 2:
         errors.append("Name must be at least 2 characters long")
 
-    # Age validation
-    if not (1 <= age <= 120):
-        errors.append("Age must be between 1 and 120 years")
-
-    # Pregnancies validation
-    if not (0 <= pregnancies <= 20):
-        errors.append("Pregnancies must be between 0 and 20")
-
-    # Glucose validation
-    if not (0 <= glucose <= 400):
-        errors.append("Glucose must be between 0 and 400 mg/dL")
-
-    # Blood Pressure validation
-    if not (40 <= bp <= 200):
-        errors.append("Blood Pressure must be between 40 and 200 mmHg")
-
-    # Skin Thickness validation
-    if not (0 <= skin <= 100):
-        errors.append("Skin Thickness must be between 0 and 100 mm")
-
-    # Insulin validation
-    if not (0 <= insulin <= 900):
-        errors.append("Insulin must be between 0 and 900 µU/mL")
-
-    # BMI validation
-    if not (10 <= bmi <= 70):
-        errors.append("BMI must be between 10 and 70")
-
-    # DPF validation
-    if not (0 <= dpf <= 3):
-        errors.append("Diabetes Pedigree Function must be between 0 and 3")
+    # Range validation (shared with the batch API)
+    values = {"age": age, "pregnancies": pregnancies, "glucose": glucose, "bp": bp,
+              "skin": skin, "insulin": insulin, "bmi": bmi, "dpf": dpf}
+    for column, low, high, _, message in MEDICAL_RANGES:
+        if not (low <= values[column] <= high):
+            errors.append(message)
 
     return errors
 
@@ -1543,7 +1752,7 @@ def predict():
     if "user_id" not in session:
         return redirect(url_for("login"))
 
-    if not model or not scaler:
+    if get_engine() is None:
         flash("Prediction model not available. Please contact administrator.", "error")
         return redirect(url_for("dashboard"))
 
@@ -1566,60 +1775,47 @@ def predict():
             return redirect(url_for("dashboard"))
 
         features = [pregnancies, glucose, bp, skin, insulin, bmi, dpf, age]
+        # Rounded to the form's precision only to look up the cache; scoring and storage use the raw values
+        cache_key = canonicalize_features(features)
 
     except (ValueError, KeyError) as e:
         flash("Invalid input data. Please check all fields and try again.", "error")
         return redirect(url_for("dashboard"))
     
-    features_scaled = scaler.transform([features])
-
-    # Get predictions from all three models
-    pred_lr = model_lr.predict(features_scaled)[0]
-    pred_rf = model_rf.predict(features_scaled)[0]
-    pred_xgb = model_xgb.predict(features_scaled)[0]
-
-    # Get probability scores for confidence
-    prob_lr = model_lr.predict_proba(features_scaled)[0][1] * 100  # Probability of diabetic
-    prob_rf = model_rf.predict_proba(features_scaled)[0][1] * 100
-    prob_xgb = model_xgb.predict_proba(features_scaled)[0][1] * 100
-
-    # Ensemble voting - majority wins
-    votes = [pred_lr, pred_rf, pred_xgb]
-    prediction = 1 if sum(votes) >= 2 else 0
-
-    # Calculate model agreement
-    model_agreement = sum(votes)  # 0, 1, 2, or 3
-    agreement_key = {
-        3: "agree_all",
-        2: "agree_majority",
-        1: "agree_majority",
-        0: "agree_all"
-    }[model_agreement]
-
-    # Individual model predictions
-    model_predictions = {
-        'lr': {'prediction': 'Diabetic' if pred_lr == 1 else 'Not Diabetic', 'confidence': round(prob_lr, 1)},
-        'rf': {'prediction': 'Diabetic' if pred_rf == 1 else 'Not Diabetic', 'confidence': round(prob_rf, 1)},
-        'xgb': {'prediction': 'Diabetic' if pred_xgb == 1 else 'Not Diabetic', 'confidence': round(prob_xgb, 1)}
-    }
+    # Identical inputs (refreshes, re-checks) are served from the cache
+    cached = prediction_cache.get(cache_key)
+    scoring_seconds = None
+    if cached is None:
+        # Score all three models in one vectorized pass
+        started = time.perf_counter()
+        ensemble = score_features(features)
+        scoring_seconds = time.perf_counter() - started
+        stage, suggestion_keys, suggestion = classify_stage(glucose, insulin, bmi)
+        cached = {
+            'prediction': ensemble['prediction'],
+            'votes': ensemble['votes'],
+            'probabilities': ensemble['probabilities'],
+            'agreement': ensemble['agreement'],
+            'agreement_key': ensemble['agreement_key'],
+            'model_predictions': ensemble['model_predictions'],
+            'model_version': ensemble['model_version'],
+            'stage': stage,
+            'suggestion_keys': suggestion_keys,
+            'suggestion': suggestion,
+        }
+        prediction_cache.put(cache_key, cached, cached['model_version'])
 
-    glucose, insulin, bmi = features[1], features[4], features[5]
-    if glucose < 110 and bmi < 25:
-        stage = "Normal"
-        suggestion_keys = ["rec_maintain_diet", "rec_exercise_30", "rec_annual_checkup"]
-        suggestion = "✅ Maintain healthy diet\n✅ Exercise 30 min daily\n✅ Annual checkup"
-    elif 110 <= glucose <= 140 or bmi >= 25:
-        stage = "Pre-Diabetic"
-        suggestion_keys = ["rec_reduce_sugar", "rec_exercise_5", "rec_monitor_3"]
-        suggestion = "⚠️ Reduce sugar\n⚠️ Exercise 5 days/week\n⚠️ Monitor glucose 3 months"
-    elif glucose >= 140 and insulin < 30:
-        stage = "Type 1 Diabetes"
-        suggestion_keys = ["rec_consult_insulin", "rec_monitor_glucose", "rec_balanced_meals"]
-        suggestion = "🚨 Consult doctor for insulin\n🚨 Blood glucose monitoring\n🚨 Balanced meals"
-    else:
-        stage = "Type 2 Diabetes"
-        suggestion_keys = ["rec_medication", "rec_weight", "rec_consult"]
-        suggestion = "🚨 Strict medication & diet\n🚨 Weight management\n🚨 Consult doctor"
+    record_predictions([{'result': "Diabetic" if cached['prediction'] == 1 else "Not Diabetic",
+                         'stage': cached['stage']}], source="form")
+    shadow.submit(features, cached, scoring_seconds)
+
+    prediction = cached['prediction']
+    agreement_key = cached['agreement_key']
+    model_predictions = cached['model_predictions']
+    model_version = cached['model_version']
+    stage = cached['stage']
+    suggestion_keys = cached['suggestion_keys']
+    suggestion = cached['suggestion']
 
     # Save patient
     try:
@@ -1634,11 +1830,10 @@ def predict():
                                  patient_id=None)
 
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO patients (user_id,name,age,pregnancies,glucose,bp,skin,insulin,bmi,dpf,result,stage,suggestion)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (session["user_id"], name, age, *features[:-1],
-              "Diabetic" if prediction == 1 else "Not Diabetic", stage, suggestion))
+        cursor.execute(INSERT_PATIENT_SQL, (
+            session["user_id"], name, age, *features[:-1],
+            "Diabetic" if prediction == 1 else "Not Diabetic", stage, suggestion, model_version,
+            *prediction_values(cached)))
         patient_id = cursor.lastrowid
         conn.commit()
         conn.close()
@@ -1657,6 +1852,98 @@ def predict():
                          model_predictions=model_predictions,
                          agreement_key=agreement_key)
 
+@app.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    """Score a cohort in one vectorized pass (JSON array or CSV body), streamed back as NDJSON"""
+    if "user_id" not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    engine = get_engine()
+    if engine is None:
+        return jsonify({"error": "Prediction model not available"}), 503
+
+    try:
+        if request.mimetype == "text/csv":
+            X, names = rows_from_csv(request.get_data(as_text=True))
+        else:
+            X, names = rows_from_json(request.get_json(silent=True))
+    except BatchFormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(X) == 0:
+        return jsonify({"error": "Batch is empty"}), 400
+    if len(X) > BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch too large: {len(X)} rows (maximum {BATCH_MAX_ROWS})"}), 413
+
+    save = request.args.get("save", "").lower() in ("1", "true", "yes")
+
+    valid_mask, errors = validate_feature_matrix(X)
+    if save:
+        for i, name in enumerate(names):
+            if not name or len(name) < 2:
+                errors[i].insert(0, "Name must be at least 2 characters long")
+                valid_mask[i] = False
+
+    valid_rows = np.flatnonzero(valid_mask)
+    ensemble = engine.predict(X[valid_rows]) if len(valid_rows) else None
+
+    stages = classify_stages(X[valid_rows, 1], X[valid_rows, 4], X[valid_rows, 5])
+    scored = {}
+    for k, i in enumerate(valid_rows):
+        row = ensemble.row(k)
+        row['stage'], row['suggestion_keys'], row['suggestion'] = stages[k]
+        scored[i] = row
+    record_predictions(scored.values(), source="batch")
+
+    # Optionally store every scored row in a single transaction
+    if save and scored:
+        records = [
+            (session["user_id"], names[i], int(X[i, 7]), int(X[i, 0]), *X[i, 1:7].tolist(),
+             row['result'], row['stage'], row['suggestion'], row['model_version'], *prediction_values(row))
+            for i, row in scored.items()
+        ]
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection error"}), 503
+        try:
+            with conn:
+                conn.executemany(INSERT_PATIENT_SQL, records)
+                # AUTOINCREMENT ids are consecutive inside one write transaction
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            for offset, row in enumerate(scored.values()):
+                row['patient_id'] = last_id - len(records) + 1 + offset
+        except sqlite3.Error as e:
+            print(f"Error saving batch predictions: {e}")
+            return jsonify({"error": "Batch scored but could not be saved"}), 500
+        finally:
+            conn.close()
+
+    def generate():
+        for i in range(len(X)):
+            if i not in scored:
+                yield json.dumps({"row": i, "name": names[i], "errors": errors[i]}) + "\n"
+                continue
+            row = scored[i]
+            yield json.dumps({
+                "row": i,
+                "name": names[i],
+                "patient_id": row.get('patient_id'),
+                "prediction": row['prediction'],
+                "result": row['result'],
+                "probabilities": dict(zip(MODEL_NAMES, (round(p, 2) for p in row['probabilities']))),
+                "votes": dict(zip(MODEL_NAMES, row['votes'])),
+                "agreement": row['agreement'],
+                "agreement_key": row['agreement_key'],
+                "stage": row['stage'],
+                "suggestion_keys": row['suggestion_keys'],
+                "model_version": row['model_version'],
+            }) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers['X-Batch-Rows'] = str(len(X))
+    response.headers['X-Batch-Scored'] = str(len(scored))
+    return response
+
 @app.route("/share-report/<int:patient_id>", methods=["POST"])
 def share_report(patient_id):
     if "user_id" not in session:
@@ -1664,20 +1951,14 @@ def share_report(patient_id):
     
     email = request.form["email"]
     
-    conn = sqlite3.connect("diabetes_app.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Check if user owns this report or is a doctor
     if session["role"] == "doctor":
-        cursor.execute("""
-            SELECT name, age, glucose, bmi, bp, result, stage, suggestion 
-            FROM patients WHERE id=?
-        """, (patient_id,))
+        cursor.execute(REPORT_SELECT_SQL + " WHERE id=?", (patient_id,))
     else:
-        cursor.execute("""
-            SELECT name, age, glucose, bmi, bp, result, stage, suggestion 
-            FROM patients WHERE id=? AND user_id=?
-        """, (patient_id, session["user_id"]))
+        cursor.execute(REPORT_SELECT_SQL + " WHERE id=? AND user_id=?", (patient_id, session["user_id"]))
     
     patient = cursor.fetchone()
     conn.close()
@@ -1693,22 +1974,12 @@ def share_report(patient_id):
     # Send email with PDF attachment
     subject = f"DiabetesAI Multi-Model Analysis Report - {patient[0]}"
 
-    # Recalculate multi-model predictions for email
-    try:
-        features_for_pred = [0, patient[2], patient[4], 0, 0, patient[3], 0, patient[1]]
-        features_scaled = scaler.transform([features_for_pred])
-
-        pred_lr = model_lr.predict(features_scaled)[0]
-        pred_rf = model_rf.predict(features_scaled)[0]
-        pred_xgb = model_xgb.predict(features_scaled)[0]
-
-        prob_lr = model_lr.predict_proba(features_scaled)[0][1] * 100
-        prob_rf = model_rf.predict_proba(features_scaled)[0][1] * 100
-        prob_xgb = model_xgb.predict_proba(features_scaled)[0][1] * 100
-
-        votes = [pred_lr, pred_rf, pred_xgb]
-        agreement = sum(votes)
-        agreement_text = "All Models Agree (100%)" if agreement in [0, 3] else "Majority Consensus (67%)"
+    # Multi-model predictions stored when the prediction was made
+    ensemble = stored_prediction(patient[REPORT_PREDICTION_OFFSET:])
+    if ensemble:
+        pred_lr, pred_rf, pred_xgb = ensemble['votes']
+        prob_lr, prob_rf, prob_xgb = ensemble['probabilities']
+        agreement_text = ensemble['agreement_text']
 
         model_info = f"""
     Multi-Model AI Analysis:
@@ -1717,7 +1988,7 @@ def share_report(patient_id):
     - Random Forest: {'Diabetic' if pred_rf == 1 else 'Not Diabetic'} ({prob_rf:.1f}% confidence)
     - XGBoost: {'Diabetic' if pred_xgb == 1 else 'Not Diabetic'} ({prob_xgb:.1f}% confidence)
     """
-    except:
+    else:
         model_info = ""
 
     body = f"""
@@ -1758,71 +2029,25 @@ def history():
             flash("Database connection error.", "error")
             return render_template("history.html", patients=[], stats=None)
 
-        cursor = conn.cursor()
-
-        # Get patient records
-        cursor.execute("""
+        # Get patient records, newest first, one page at a time (see pagination.py)
+        records = fetch_page(conn, """
+            /* query: history_page */
             SELECT p.id, u.username, p.name, p.age, p.glucose, p.bmi, p.bp, p.result, p.stage, p.suggestion, p.created_at
             FROM patients p
             JOIN users u ON p.user_id = u.id
-            WHERE p.user_id=?
-            ORDER BY p.created_at DESC
-        """, (session["user_id"],))
-        data = cursor.fetchall()
-
-        # Calculate statistics for trends
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_tests,
-                AVG(glucose) as avg_glucose,
-                AVG(bmi) as avg_bmi,
-                AVG(bp) as avg_bp,
-                MIN(glucose) as min_glucose,
-                MAX(glucose) as max_glucose,
-                MIN(bmi) as min_bmi,
-                MAX(bmi) as max_bmi
-            FROM patients
-            WHERE user_id=?
-        """, (session["user_id"],))
-        stats_row = cursor.fetchone()
-
-        # Get stage distribution
-        cursor.execute("""
-            SELECT stage, COUNT(*) as count
-            FROM patients
-            WHERE user_id=?
-            GROUP BY stage
-        """, (session["user_id"],))
-        stage_dist = cursor.fetchall()
-
-        # Get recent trend (last 5 records for chart)
-        cursor.execute("""
-            SELECT glucose, bmi, created_at
-            FROM patients
-            WHERE user_id=?
-            ORDER BY created_at DESC
-            LIMIT 5
-        """, (session["user_id"],))
-        trend_data = cursor.fetchall()
-
+            WHERE p.user_id=? AND {after}
+            ORDER BY {order}
+            LIMIT ?
+        """, [session["user_id"]], ("p.created_at", "p.id"), lambda row: (row[10], row[0]),
+            HISTORY_PAGE_SIZE, request.args.get('cursor'))
+
+        # Totals, averages, extremes and stage counts come from user_stats, not the rows above
+        stats = read_user_stats(conn, session["user_id"])
         conn.close()
 
-        stats = {
-            'total_tests': stats_row[0] if stats_row else 0,
-            'avg_glucose': round(stats_row[1], 1) if stats_row and stats_row[1] else 0,
-            'avg_bmi': round(stats_row[2], 1) if stats_row and stats_row[2] else 0,
-            'avg_bp': round(stats_row[3], 1) if stats_row and stats_row[3] else 0,
-            'min_glucose': round(stats_row[4], 1) if stats_row and stats_row[4] else 0,
-            'max_glucose': round(stats_row[5], 1) if stats_row and stats_row[5] else 0,
-            'min_bmi': round(stats_row[6], 1) if stats_row and stats_row[6] else 0,
-            'max_bmi': round(stats_row[7], 1) if stats_row and stats_row[7] else 0,
-            'stage_distribution': {row[0]: row[1] for row in stage_dist},
-            'trend_glucose': [row[0] for row in reversed(trend_data)],
-            'trend_bmi': [row[1] for row in reversed(trend_data)],
-            'trend_dates': [row[2][:10] if row[2] else '' for row in reversed(trend_data)]
-        }
-
-        return render_template("history.html", patients=data, stats=stats)
+        return render_template("history.html", patients=records.rows, stats=stats,
+                               page=records.page, page_size=HISTORY_PAGE_SIZE, total_pages=(stats['total_tests'] + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE,
+                               next_cursor=records.next_token, prev_cursor=records.prev_token)
 
     except Exception as e:
         print(f"History error: {e}")
@@ -1834,20 +2059,14 @@ def download_report(patient_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
     
-    conn = sqlite3.connect("diabetes_app.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Check if user owns this report or is a doctor
     if session["role"] == "doctor":
-        cursor.execute("""
-            SELECT name, age, glucose, bmi, bp, result, stage, suggestion 
-            FROM patients WHERE id=?
-        """, (patient_id,))
+        cursor.execute(REPORT_SELECT_SQL + " WHERE id=?", (patient_id,))
     else:
-        cursor.execute("""
-            SELECT name, age, glucose, bmi, bp, result, stage, suggestion 
-            FROM patients WHERE id=? AND user_id=?
-        """, (patient_id, session["user_id"]))
+        cursor.execute(REPORT_SELECT_SQL + " WHERE id=? AND user_id=?", (patient_id, session["user_id"]))
     
     patient = cursor.fetchone()
     conn.close()
@@ -1870,7 +2089,7 @@ def doctor_dashboard():
 
     try:
         search = request.args.get('search', '').strip()
-        page = int(request.args.get('page', 1))
+        page_token = request.args.get('cursor')
         per_page = 15  # Records per page
 
         conn = get_db_connection()
@@ -1878,66 +2097,33 @@ def doctor_dashboard():
             flash("Database connection error.", "error")
             return render_template("doctor_dashboard.html")
 
-        cursor = conn.cursor()
-
-        # Get statistics
-        cursor.execute("SELECT COUNT(*) FROM patients")
-        total_patients = cursor.fetchone()[0]
-
-        cursor.execute("SELECT result, COUNT(*) FROM patients GROUP BY result")
-        result_data = cursor.fetchall()
-        diabetic_count = 0
-        non_diabetic_count = 0
-        for row in result_data:
-            if row[0] == "Diabetic":
-                diabetic_count = row[1]
-            else:
-                non_diabetic_count = row[1]
+        # Dashboard totals are maintained by triggers (see dashboard_stats.py)
+        dashboard = read_dashboard_stats(conn)
+        total_patients = dashboard['total_patients']
+        diabetic_count = dashboard['results'].get("Diabetic", 0)
+        non_diabetic_count = total_patients - diabetic_count
+        stages = dashboard['stages']
+        avg_glucose = dashboard['avg_glucose']
+        avg_bmi = dashboard['avg_bmi']
 
-        cursor.execute("SELECT stage, COUNT(*) FROM patients GROUP BY stage")
-        stage_data = cursor.fetchall()
-        stages = {stage: 0 for stage in ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]}
-        for row in stage_data:
-            stages[row[0]] = row[1]
-
-        cursor.execute("SELECT AVG(glucose), AVG(bmi) FROM patients")
-        avg_result = cursor.fetchone()
-        avg_glucose = avg_result[0] if avg_result[0] else 0
-        avg_bmi = avg_result[1] if avg_result[1] else 0
-
-        # Get total count for pagination
-        if search:
-            cursor.execute("""
-                SELECT COUNT(*) FROM patients p
-                JOIN users u ON p.user_id = u.id
-                WHERE p.name LIKE ? OR u.username LIKE ? OR p.result LIKE ? OR p.stage LIKE ?
-            """, (f'%{search}%', f'%{search}%', f'%{search}%', f'%{search}%'))
-        else:
-            cursor.execute("SELECT COUNT(*) FROM patients")
-        total_records = cursor.fetchone()[0]
-        total_pages = (total_records + per_page - 1) // per_page  # Ceiling division
-
-        # Get patient records with search and pagination
-        offset = (page - 1) * per_page
+        # Get patient records with search and keyset pagination (see pagination.py)
         if search:
-            cursor.execute("""
-                SELECT p.id, u.username, p.name, p.age, p.glucose, p.bmi, p.bp, p.result, p.stage, p.suggestion
-                FROM patients p
-                JOIN users u ON p.user_id = u.id
-                WHERE p.name LIKE ? OR u.username LIKE ? OR p.result LIKE ? OR p.stage LIKE ?
-                ORDER BY p.id DESC
-                LIMIT ? OFFSET ?
-            """, (f'%{search}%', f'%{search}%', f'%{search}%', f'%{search}%', per_page, offset))
+            # FTS5 index with bm25 ranking, LIKE scan as the fallback (see patient_search.py)
+            total_records, result_page = search_patients(conn, search, per_page, page_token)
         else:
-            cursor.execute("""
+            total_records = total_patients
+            result_page = fetch_page(conn, """
+                /* query: doctor_dashboard_page */
                 SELECT p.id, u.username, p.name, p.age, p.glucose, p.bmi, p.bp, p.result, p.stage, p.suggestion
                 FROM patients p
                 JOIN users u ON p.user_id = u.id
-                ORDER BY p.id DESC
-                LIMIT ? OFFSET ?
-            """, (per_page, offset))
-
-        patients = cursor.fetchall()
+                WHERE {after}
+                ORDER BY {order}
+                LIMIT ?
+            """, [], ("p.id",), lambda row: (row[0],), per_page, page_token)
+        patients = result_page.rows
+        # None when the search could not count its matches cheaply
+        total_pages = (total_records + per_page - 1) // per_page if total_records is not None else None
         conn.close()
 
         return render_template("doctor_dashboard.html",
@@ -1949,7 +2135,9 @@ def doctor_dashboard():
                              stages=stages,
                              patients=patients,
                              search=search,
-                             page=page,
+                             page=result_page.page,
+                             next_cursor=result_page.next_token,
+                             prev_cursor=result_page.prev_token,
                              total_pages=total_pages,
                              total_records=total_records)
 
@@ -1960,68 +2148,91 @@ def doctor_dashboard():
 
 @app.route("/doctor/export-csv")
 def doctor_export_csv():
-    """Export all patient data to CSV"""
+    """Stream patient data as CSV, optionally filtered and gzipped (see patient_export.py)"""
     if "user_id" not in session or session["role"] != "doctor":
         return redirect(url_for("login"))
 
     try:
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection error.", "error")
-            return redirect(url_for("doctor_dashboard"))
-
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.id, u.username, p.name, p.age, p.pregnancies, p.glucose, p.bp, p.skin,
-                   p.insulin, p.bmi, p.dpf, p.result, p.stage, p.created_at
-            FROM patients p
-            JOIN users u ON p.user_id = u.id
-            ORDER BY p.id ASC
-        """)
-        patients = cursor.fetchall()
-        conn.close()
+        options = parse_export_options(request.args)
+    except ExportError as e:
+        flash(str(e), "error")
+        return redirect(url_for("doctor_dashboard"))
 
-        # Create CSV
-        import csv
-        from io import StringIO
-        output = StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow(['ID', 'Username', 'Patient Name', 'Age', 'Pregnancies', 'Glucose',
-                        'Blood Pressure', 'Skin Thickness', 'Insulin', 'BMI', 'DPF',
-                        'Result', 'Stage', 'Date'])
-
-        # Write data with formatted date
-        for patient in patients:
-            patient_list = list(patient)
-            # Format the date (last column) to just date without time for Excel compatibility
-            if patient_list[-1]:
-                try:
-                    # Extract just the date part (YYYY-MM-DD) to make it shorter
-                    date_str = str(patient_list[-1])
-                    if ' ' in date_str:
-                        # Take only the date part, not the time
-                        date_str = date_str.split(' ')[0]
-                    patient_list[-1] = date_str
-                except Exception as e:
-                    print(f"Date formatting error: {e}")
-                    patient_list[-1] = str(patient_list[-1])[:10]  # First 10 chars (date only)
-            writer.writerow(patient_list)
-
-        # Create response
-        output.seek(0)
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=patient_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-
-        return response
+    # Not the request's connection: the app context is torn down before the body streams
+    try:
+        conn = db_pool.acquire()
+    except sqlite3.Error as e:
+        print(f"Database connection error: {e}")
+        flash("Database connection error.", "error")
+        return redirect(url_for("doctor_dashboard"))
 
+    try:
+        # Runs the query now, so SQL errors still redirect; rows are fetched while streaming
+        blocks = export_csv(conn, options)
     except Exception as e:
+        db_pool.release(conn)
         print(f"CSV export error: {e}")
         flash("Error exporting data.", "error")
         return redirect(url_for("doctor_dashboard"))
 
+    filename = f'patient_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    if options.gzip:
+        filename += '.gz'
+    response = Response(blocks, mimetype='application/gzip' if options.gzip else 'text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    # Called when the server is done with the body, also if the client went away early
+    response.call_on_close(lambda: db_pool.release(conn))
+    return response
+
+@app.route("/doctor/export-parquet")
+def doctor_export_parquet():
+    """Stream patient data as typed, compressed Parquet for analysts (see patient_export.py)
+
+    Takes the from/to/stage filters of the CSV export and since_id for an
+    incremental export; X-Export-Last-Id is the since_id of the next one.
+    """
+    if "user_id" not in session or session["role"] != "doctor":
+        return redirect(url_for("login"))
+    if not columnar_available():
+        flash("Parquet export needs pyarrow installed on the server.", "error")
+        return redirect(url_for("doctor_dashboard"))
+
+    try:
+        options = parse_export_options(request.args)
+        since_id = request.args.get("since_id")
+        if since_id:
+            if not since_id.isdigit():
+                raise ExportError(f"since_id must be a patient id, got {since_id!r}")
+            since_id = int(since_id)
+        else:
+            since_id = None
+    except ExportError as e:
+        flash(str(e), "error")
+        return redirect(url_for("doctor_dashboard"))
+
+    # Not the request's connection: the app context is torn down before the body streams
+    try:
+        conn = db_pool.acquire()
+    except sqlite3.Error as e:
+        print(f"Database connection error: {e}")
+        flash("Database connection error.", "error")
+        return redirect(url_for("doctor_dashboard"))
+
+    try:
+        blocks, last_id = export_parquet(conn, options, since_id)
+    except Exception as e:
+        db_pool.release(conn)
+        print(f"Parquet export error: {e}")
+        flash("Error exporting data.", "error")
+        return redirect(url_for("doctor_dashboard"))
+
+    filename = f'patient_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.parquet'
+    response = Response(blocks, mimetype='application/vnd.apache.parquet')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Export-Last-Id'] = str(last_id)
+    response.call_on_close(lambda: db_pool.release(conn))
+    return response
+
 @app.route("/logout")
 def logout():
     session.clear()
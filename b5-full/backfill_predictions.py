@@ -0,0 +1,69 @@
+"""
+One-off backfill of the stored per-model outputs for old patients rows.
+
+Rows saved before the per-model columns existed have NULL in them, so their
+PDF reports and share emails show no model breakdown.  This scores those rows
+from their full stored features (one ensemble call per batch) and writes the
+results back with executemany, one short transaction per batch.  It can be
+stopped and re-run at any time: only rows that are still NULL are touched.
+Each updated row's model_version is set to the version that produced the
+new outputs, also when the row had a version label from an earlier model.
+
+    python backfill_predictions.py [--batch-size 500]
+"""
+
+import argparse
+import os
+import time
+
+# Load the models in this process before scoring starts
+os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+
+import app
+from inference import FEATURE_COLUMNS
+from rescoring import UPDATE_PATIENT_SQL, score_rows
+
+SELECT_SQL = (f"/* query: backfill_chunk */ SELECT id, {', '.join(FEATURE_COLUMNS)} FROM patients "
+              f"WHERE agreement IS NULL AND id > ? ORDER BY id LIMIT ?")
+
+
+def backfill(conn, engine, batch_size=500):
+    """Rescore every row that lacks PREDICTION_COLUMNS; returns the number of rows updated"""
+    last_id = 0
+    updated = 0
+    while True:
+        rows = conn.execute(SELECT_SQL, (last_id, batch_size)).fetchall()
+        if not rows:
+            return updated
+        # Rows with missing features cannot be scored; they are skipped instead of guessing values
+        records = score_rows(engine, rows)
+        if records:
+            with conn:
+                conn.executemany(UPDATE_PATIENT_SQL, records)
+            updated += len(records)
+        last_id = rows[-1][0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill stored per-model predictions")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    app.init_db()
+    engine = app.get_engine()
+    if engine is None:
+        raise SystemExit(f"Models not available: {app.model_store.error}")
+
+    conn = app.get_db_connection()
+    if conn is None:
+        raise SystemExit("Database connection error")
+    started = time.perf_counter()
+    try:
+        updated = backfill(conn, engine, args.batch_size)
+    finally:
+        conn.close()
+    print(f"✓ Backfilled {updated} patient rows in {time.perf_counter() - started:.1f}s "
+          f"(model version {engine.version})")
+
+
+if __name__ == "__main__":
+    main()
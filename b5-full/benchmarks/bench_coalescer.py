@@ -0,0 +1,76 @@
+"""
+Benchmark: concurrent single-row predictions with and without the coalescer.
+
+Simulates C clinicians submitting /predict at the same time (one thread
+each) and reports throughput and p50/p99 latency for direct engine calls
+and for the PredictionCoalescer at a few wait windows.
+
+Run from the project directory:
+    python benchmarks/bench_coalescer.py
+"""
+
+import os
+import sys
+import threading
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescer import PredictionCoalescer
+from inference import EnsembleEngine
+
+warnings.filterwarnings("ignore")
+
+REQUESTS_PER_CLIENT = 40
+
+
+def run(score, X, clients):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        local = []
+        for k in range(REQUESTS_PER_CLIENT):
+            start = time.perf_counter()
+            score(X[(offset + k) % len(X)])
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c * REQUESTS_PER_CLIENT,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    engine = EnsembleEngine(joblib.load("scaler.pkl"), joblib.load("diabetes_model_lr.pkl"),
+                            joblib.load("diabetes_model_rf.pkl"), joblib.load("diabetes_model_xgb.pkl"))
+    X = pd.read_csv("diabetes.csv").drop("Outcome", axis=1).to_numpy(dtype=float)
+
+    print(f"{'clients':>7} {'mode':<22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>10}")
+    for clients in (1, 8, 32):
+        rps, p50, p99 = run(engine.predict_one, X, clients)
+        print(f"{clients:>7} {'direct':<22} {rps:>8.1f} {p50:>8.2f} {p99:>8.2f} {'-':>10}")
+        for wait_ms in (1, 2, 5):
+            coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=wait_ms, max_batch=32)
+            rps, p50, p99 = run(coalescer.predict_one, X, clients)
+            stats = coalescer.stats()
+            print(f"{clients:>7} {f'coalesced {wait_ms}ms':<22} {rps:>8.1f} {p50:>8.2f} {p99:>8.2f} "
+                  f"{stats['avg_batch_size']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: compiled NumPy kernels vs the pickled sklearn/xgboost models.
+
+Compares, per row count, the cost of the library path
+(scaler.transform + model.predict_proba) with the compiled kernel on raw
+features, and the load time / memory of the compiled bundle
+against unpickling the estimators.
+
+Run from the project directory:
+    python benchmarks/bench_compiled.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import joblib
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_models import (COMPILED_DIR, SOURCE_ARTIFACTS, FusedLogisticRegression, compile_artifacts,
+                             load_bundle, load_compiled_models)
+
+warnings.filterwarnings("ignore")
+
+
+def per_row_us(fn, X, min_time=0.5):
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn(X)
+        runs += 1
+    return (time.perf_counter() - start) / runs / len(X) * 1e6
+
+
+def report(name, sklearn_fn, compiled_fn, X_all):
+    print(f"\n{name}")
+    print(f"{'rows':>8} {'library us/row':>16} {'compiled us/row':>16} {'speedup':>8}")
+    for n in (1, 16, 768):
+        X = X_all[:n]
+        base = per_row_us(sklearn_fn, X)
+        fast = per_row_us(compiled_fn, X)
+        print(f"{n:>8} {base:>16.2f} {fast:>16.2f} {base / fast:>7.1f}x")
+
+
+def load_cost(loader, repeat=5):
+    tracemalloc.start()
+    loader()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        loader()
+    return (time.perf_counter() - start) / repeat * 1000, peak / 1024
+
+
+def main():
+    scaler = joblib.load("scaler.pkl")
+    model_lr = joblib.load("diabetes_model_lr.pkl")
+    X = pd.read_csv("diabetes.csv").drop("Outcome", axis=1).to_numpy(dtype=float)
+
+    fused_lr = FusedLogisticRegression.from_sklearn(scaler, model_lr)
+    report("Logistic Regression (scaler + predict_proba vs fused lr_proba)",
+           lambda X: model_lr.predict_proba(scaler.transform(X)),
+           fused_lr.predict_proba, X)
+
+    compiled = load_compiled_models(mmap=False)
+    if compiled is None:
+        compile_artifacts()
+        compiled = load_compiled_models(mmap=False)
+
+    for name, label in (("rf", "Random Forest"), ("xgb", "XGBoost")):
+        pickle_path = f"diabetes_model_{name}.pkl"
+        model = joblib.load(pickle_path)
+        report(f"{label} (scaler + predict_proba vs flat-array evaluator)",
+               lambda X, model=model: model.predict_proba(scaler.transform(X)),
+               compiled[name].predict_proba, X)
+
+    pickle_ms, pickle_kib = load_cost(lambda: [joblib.load(p) for p in SOURCE_ARTIFACTS])
+    copy_ms, copy_kib = load_cost(lambda: load_bundle(COMPILED_DIR, mmap=False))
+    mmap_ms, mmap_kib = load_cost(lambda: load_bundle(COMPILED_DIR, mmap=True))
+    print("\nLoading scaler + all three models")
+    print(f"  joblib.load pickles:     {pickle_ms:7.2f} ms  {pickle_kib:8.1f} KiB peak heap")
+    print(f"  compiled bundle (copy):  {copy_ms:7.2f} ms  {copy_kib:8.1f} KiB peak heap")
+    print(f"  compiled bundle (mmap):  {mmap_ms:7.2f} ms  {mmap_kib:8.1f} KiB peak heap")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: peak memory of the CSV export, fetchall + StringIO vs. streaming.
+
+Builds plain patients/users tables with N rows and exports them the old way
+(fetchall, whole CSV in a StringIO, one string) and through
+patient_export.export_csv, with and without gzip.  Python's peak allocation
+is measured with tracemalloc; the streamed output is consumed block by block
+and discarded, as a WSGI server would send it.
+
+Run from the project directory:
+    python benchmarks/bench_csv_export.py
+"""
+
+import csv
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from patient_export import EXPORT_COLUMNS, ExportOptions, export_csv
+
+SIZES = (100_000, 300_000, 1_000_000)
+# The old implementation grows ~0.85 KB per row; skipped above this size to keep the run short
+OLD_MAX_ROWS = 300_000
+STAGES = ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]
+
+
+def build(path, n):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)")
+    conn.execute("""CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT, age INTEGER,
+                    pregnancies INTEGER, glucose REAL, bp REAL, skin REAL, insulin REAL, bmi REAL, dpf REAL,
+                    result TEXT, stage TEXT, created_at TEXT)""")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [(i, f"user{i}") for i in range(1, 1001)])
+    conn.executemany(
+        "INSERT INTO patients (user_id, name, age, pregnancies, glucose, bp, skin, insulin, bmi, dpf, result, stage, "
+        "created_at) VALUES (?, ?, 45, 2, ?, 72.0, 23.0, 94.0, ?, 0.47, 'Diabetic', ?, ?)",
+        ((i % 1000 + 1, f"Patient {i}", 80.0 + i % 120, 18.0 + i % 200 / 10, STAGES[i % 4],
+          f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:15:00") for i in range(n)))
+    conn.commit()
+    return conn
+
+
+def old_export(conn):
+    patients = conn.execute("""
+        SELECT p.id, u.username, p.name, p.age, p.pregnancies, p.glucose, p.bp, p.skin,
+               p.insulin, p.bmi, p.dpf, p.result, p.stage, p.created_at
+        FROM patients p JOIN users u ON p.user_id = u.id ORDER BY p.id ASC""").fetchall()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([column.header for column in EXPORT_COLUMNS.values()])
+    for patient in patients:
+        patient = list(patient)
+        patient[-1] = patient[-1].split(" ")[0]
+        writer.writerow(patient)
+    return len(output.getvalue().encode())
+
+
+def streamed_export(conn, gzip):
+    options = ExportOptions(list(EXPORT_COLUMNS), [], None, None, gzip)
+    return sum(len(block) for block in export_csv(conn, options))
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(*args)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    print(f"{'rows':>9} {'export':<16} {'output MB':>10} {'peak MB':>9} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in SIZES:
+            conn = build(os.path.join(directory, f"{n}.db"), n)
+            runs = [("stream", streamed_export, False), ("stream + gzip", streamed_export, True)]
+            if n <= OLD_MAX_ROWS:
+                runs.insert(0, ("fetchall", old_export))
+            for label, fn, *args in runs:
+                size, elapsed, peak = measure(fn, conn, *args)
+                print(f"{n:>9} {label:<16} {size / 1e6:>10.1f} {peak / 1e6:>9.1f} {elapsed:>8.2f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: dashboard totals from full scans vs. the dashboard_stats table.
+
+Builds a migrated database with N patients, then times the statistics part
+of doctor_dashboard() + admin_dashboard() the old way (COUNT, GROUP BY
+result, GROUP BY stage, AVG, user counts) and from dashboard_stats, plus the
+cost the triggers add to inserts.
+
+Run from the project directory:
+    python benchmarks/bench_dashboard_stats.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from dashboard_stats import read_dashboard_stats
+from migrations import migrate
+
+SIZES = (10_000, 100_000, 500_000)
+INSERT_ROWS = 20_000
+STAGES = ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]
+
+
+def rows(n, offset=0):
+    for i in range(offset, offset + n):
+        yield (i % 1000 + 1, f"p{i}", 80 + i % 120, 18 + (i % 200) / 10,
+               "Diabetic" if i % 3 else "Not Diabetic", STAGES[i % 4])
+
+
+INSERT_SQL = "INSERT INTO patients (user_id, name, glucose, bmi, result, stage) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def full_scans(conn):
+    conn.execute("SELECT COUNT(*) FROM patients").fetchone()
+    conn.execute("SELECT result, COUNT(*) FROM patients GROUP BY result").fetchall()
+    conn.execute("SELECT stage, COUNT(*) FROM patients GROUP BY stage").fetchall()
+    conn.execute("SELECT AVG(glucose), AVG(bmi) FROM patients").fetchone()
+    conn.execute("SELECT COUNT(*) FROM users").fetchone()
+    conn.execute("SELECT COUNT(*) FROM users WHERE role='doctor'").fetchone()
+
+
+def best_ms(fn, conn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(conn)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    print(f"{'patients':>9} {'full scans ms':>14} {'stats table ms':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in SIZES:
+            conn = sqlite3.connect(os.path.join(directory, f"{n}.db"))
+            migrate(conn)
+            conn.executemany("INSERT INTO users (username, role) VALUES (?, ?)",
+                             [(f"u{i}", "doctor" if i % 50 == 0 else "patient") for i in range(1000)])
+            conn.executemany(INSERT_SQL, rows(n))
+            conn.commit()
+            print(f"{n:>9} {best_ms(full_scans, conn):>14.2f} {best_ms(read_dashboard_stats, conn):>15.3f}")
+            conn.close()
+
+        # Insert cost with and without the triggers, one row per transaction like /predict
+        for label, drop in (("with triggers", False), ("without triggers", True)):
+            conn = sqlite3.connect(os.path.join(directory, f"insert-{drop}.db"))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(conn)
+            if drop:
+                for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall():
+                    conn.execute(f"DROP TRIGGER {name}")
+            started = time.perf_counter()
+            for row in rows(INSERT_ROWS):
+                conn.execute(INSERT_SQL, row)
+                conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"insert {label:<17} {elapsed / INSERT_ROWS * 1e6:8.1f} us per committed row")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
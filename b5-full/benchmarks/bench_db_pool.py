@@ -0,0 +1,66 @@
+"""
+Benchmark: per-request sqlite3.connect vs. the pooled connection layer.
+
+Simulates a page view that opens a connection, runs one indexed lookup and
+one COUNT(*), and closes it, against a database file with 20k
+patients.  "connect" is the old pattern, "pool" is ConnectionPool
+acquire/close as get_db_connection() now does.
+
+Run from the project directory:
+    python benchmarks/bench_db_pool.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from db import ConnectionPool
+from metrics import TimedConnection
+
+PAGE_VIEWS = 2000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+        conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, glucose REAL)")
+        conn.executemany("INSERT INTO users VALUES (?, ?, ?)", [(i, f"u{i}", f"u{i}@x") for i in range(1000)])
+        conn.executemany("INSERT INTO patients (user_id, glucose) VALUES (?, ?)",
+                         [(i % 1000, 100 + i % 80) for i in range(20000)])
+        conn.commit()
+        conn.close()
+
+        def page(c):
+            c.execute("SELECT id, username FROM users WHERE id=?", (42,)).fetchone()
+            c.execute("SELECT COUNT(*) FROM users").fetchone()
+
+        def per_connect():
+            c = sqlite3.connect(path, timeout=10, factory=TimedConnection)
+            c.row_factory = sqlite3.Row
+            page(c)
+            c.close()
+
+        pool = ConnectionPool(path)
+
+        def pooled():
+            c = pool.acquire()
+            page(c)
+            c.close()
+
+        print(f"{PAGE_VIEWS} page views, 2 queries each")
+        for label, view in (("connect", per_connect), ("pool", pooled)):
+            seconds = min(timeit.repeat(view, number=PAGE_VIEWS, repeat=5)) / PAGE_VIEWS
+            print(f"  {label:<8} {seconds * 1e6:8.1f} us per page view")
+        print(f"  pool stats: {pool.stats()}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
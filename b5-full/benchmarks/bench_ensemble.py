@@ -0,0 +1,77 @@
+"""
+Benchmark: legacy per-request inference vs the vectorized EnsembleEngine.
+
+The legacy path is what /predict used to do for every request: one
+scaler.transform on a single row followed by predict() and predict_proba()
+on each of the three models (six model calls).
+
+Run from the project directory:
+    python benchmarks/bench_ensemble.py
+"""
+
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import EnsembleEngine
+
+warnings.filterwarnings("ignore")
+
+
+def legacy_predict(scaler, model_lr, model_rf, model_xgb, features):
+    features_scaled = scaler.transform([features])
+    pred_lr = model_lr.predict(features_scaled)[0]
+    pred_rf = model_rf.predict(features_scaled)[0]
+    pred_xgb = model_xgb.predict(features_scaled)[0]
+    prob_lr = model_lr.predict_proba(features_scaled)[0][1] * 100
+    prob_rf = model_rf.predict_proba(features_scaled)[0][1] * 100
+    prob_xgb = model_xgb.predict_proba(features_scaled)[0][1] * 100
+    return [pred_lr, pred_rf, pred_xgb], [prob_lr, prob_rf, prob_xgb]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000
+    return np.median(samples), np.percentile(samples, 99)
+
+
+def main():
+    scaler = joblib.load("scaler.pkl")
+    model_lr = joblib.load("diabetes_model_lr.pkl")
+    model_rf = joblib.load("diabetes_model_rf.pkl")
+    model_xgb = joblib.load("diabetes_model_xgb.pkl")
+    engine = EnsembleEngine(scaler, model_lr, model_rf, model_xgb)
+
+    X = pd.read_csv("diabetes.csv").drop("Outcome", axis=1).to_numpy(dtype=float)
+    row = X[0].tolist()
+
+    print("Single request (1 row)")
+    med, p99 = timed(lambda: legacy_predict(scaler, model_lr, model_rf, model_xgb, row), 50)
+    print(f"  legacy (6 model calls):  median {med:8.2f} ms   p99 {p99:8.2f} ms")
+    med, p99 = timed(lambda: engine.predict_one(row), 50)
+    print(f"  EnsembleEngine:          median {med:8.2f} ms   p99 {p99:8.2f} ms")
+
+    print(f"\nWhole dataset ({len(X)} rows)")
+    start = time.perf_counter()
+    for features in X[:100]:
+        legacy_predict(scaler, model_lr, model_rf, model_xgb, features.tolist())
+    legacy_per_row = (time.perf_counter() - start) / 100 * 1000
+    print(f"  legacy, row by row:      {legacy_per_row:8.3f} ms/row (sampled over 100 rows)")
+    med, _ = timed(lambda: engine.predict(X), 10)
+    print(f"  EnsembleEngine, batched: {med / len(X):8.3f} ms/row ({med:.1f} ms total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: overhead of the Prometheus instrumentation.
+
+Times the primitives the request path adds (one histogram observation, one
+counter increment, a timed vs. plain SQLite execute) and a single-row
+ensemble call, in the default single-process mode and in multiprocess mode
+(PROMETHEUS_MULTIPROC_DIR set, as under gunicorn with several workers).
+
+Run from the project directory:
+    python benchmarks/bench_metrics.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = r"""
+import sqlite3, sys, timeit, warnings
+sys.path.insert(0, %(project)r)
+warnings.filterwarnings("ignore")
+from metrics import MODEL_SECONDS, PREDICTIONS, TimedConnection
+from model_store import load_engine
+
+def per_call_us(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+child = MODEL_SECONDS.labels(model="lr")
+counter = PREDICTIONS.labels(result="Diabetic", stage="Normal", source="form")
+plain = sqlite3.connect(":memory:")
+timed = sqlite3.connect(":memory:", factory=TimedConnection)
+for conn in (plain, timed):
+    conn.execute("CREATE TABLE t (x)")
+engine, _ = load_engine(directory=%(project)r)
+row = [1, 100, 70, 20, 80, 25.0, 0.5, 30]
+
+print(f"  histogram observe      {per_call_us(lambda: child.observe(0.001), 100000):7.2f} us")
+print(f"  counter inc            {per_call_us(lambda: counter.inc(), 100000):7.2f} us")
+print(f"  sqlite SELECT plain    {per_call_us(lambda: plain.execute('SELECT x FROM t'), 20000):7.2f} us")
+print(f"  sqlite SELECT timed    {per_call_us(lambda: timed.execute('SELECT x FROM t'), 20000):7.2f} us")
+print(f"  engine.predict_one     {per_call_us(lambda: engine.predict_one(row), 2000):7.2f} us  (3 model timers inside)")
+"""
+
+
+def main():
+    code = MEASURE % {"project": PROJECT_DIR}
+    print("Single process:")
+    subprocess.run([sys.executable, "-c", code], check=True)
+    with tempfile.TemporaryDirectory() as directory:
+        print("Multiprocess mode (PROMETHEUS_MULTIPROC_DIR):")
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       env=dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: OFFSET vs. keyset pagination on the doctor dashboard query.
+
+Builds a 200k-patient database and times fetching page N (15 rows, newest
+first) with ``LIMIT ? OFFSET ?`` and with the keyset query from
+pagination.py, starting from the token of page N-1.
+
+Run from the project directory:
+    python benchmarks/bench_pagination.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from pagination import encode_token, fetch_page
+
+PATIENTS = 200_000
+PER_PAGE = 15
+PAGES = (1, 10, 100, 1000, 10_000)
+
+COLUMNS = "p.id, u.username, p.name, p.age, p.glucose, p.bmi, p.bp, p.result, p.stage, p.suggestion"
+OFFSET_SQL = f"""
+    SELECT {COLUMNS} FROM patients p JOIN users u ON p.user_id = u.id
+    ORDER BY p.id DESC LIMIT ? OFFSET ?
+"""
+KEYSET_SQL = f"""
+    SELECT {COLUMNS} FROM patients p JOIN users u ON p.user_id = u.id
+    WHERE {{after}} ORDER BY {{order}} LIMIT ?
+"""
+
+
+def best_ms(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "pages.db"))
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)")
+        conn.execute("""CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT, age INTEGER,
+                        glucose REAL, bmi REAL, bp REAL, result TEXT, stage TEXT, suggestion TEXT)""")
+        conn.executemany("INSERT INTO users (id, username) VALUES (?, ?)", [(i, f"user{i}") for i in range(1, 1001)])
+        conn.executemany("INSERT INTO patients (user_id, name, age, glucose, bmi, bp, result, stage, suggestion) "
+                         "VALUES (?, ?, 40, 120, 28, 80, 'Diabetic', 'Pre-Diabetic', 'Exercise')",
+                         ((i % 1000 + 1, f"patient {i}") for i in range(PATIENTS)))
+        conn.commit()
+
+        print(f"{'page':>6} {'OFFSET ms':>10} {'keyset ms':>10}")
+        for page in PAGES:
+            offset = (page - 1) * PER_PAGE
+            # Token as the "Next" link of page-1 carries it: the id of that page's last row
+            last_id = PATIENTS - offset + 1
+            token = encode_token("next", [last_id], page) if page > 1 else None
+            offset_rows = conn.execute(OFFSET_SQL, (PER_PAGE, offset)).fetchall()
+            keyset = fetch_page(conn, KEYSET_SQL, [], ("p.id",), lambda row: (row[0],), PER_PAGE, token)
+            assert offset_rows == keyset.rows, page
+            print(f"{page:>6} {best_ms(lambda: conn.execute(OFFSET_SQL, (PER_PAGE, offset)).fetchall()):>10.3f} "
+                  f"{best_ms(lambda: fetch_page(conn, KEYSET_SQL, [], ('p.id',), lambda row: (row[0],), PER_PAGE, token)):>10.3f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
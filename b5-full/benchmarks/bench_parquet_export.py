@@ -0,0 +1,87 @@
+"""
+Benchmark: Parquet export size, time and peak memory vs. the streamed CSV.
+
+Builds plain patients/users tables with N rows and writes them through
+patient_export.export_csv (gzip) and export_parquet with two row group sizes,
+discarding the output block by block.  Arrow allocates outside the Python
+heap, so tracemalloc misses most of it; each export runs in a fresh process
+and reports its peak RSS instead (the baseline row is the same process with
+pyarrow imported and nothing exported).
+
+Run from the project directory:
+    python benchmarks/bench_parquet_export.py
+"""
+
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from patient_export import EXPORT_COLUMNS, ExportOptions, export_csv, export_parquet
+
+SIZES = (100_000, 1_000_000)
+STAGES = ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]
+
+
+def build(path, n):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)")
+    conn.execute("""CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT, age INTEGER,
+                    pregnancies INTEGER, glucose REAL, bp REAL, skin REAL, insulin REAL, bmi REAL, dpf REAL,
+                    result TEXT, stage TEXT, model_version TEXT, created_at TEXT)""")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [(i, f"user{i}") for i in range(1, 1001)])
+    conn.executemany(
+        "INSERT INTO patients (user_id, name, age, pregnancies, glucose, bp, skin, insulin, bmi, dpf, result, stage, "
+        "model_version, created_at) VALUES (?, ?, 45, 2, ?, 72.0, 23.0, 94.0, ?, 0.47, 'Diabetic', ?, 'v1', ?)",
+        ((i % 1000 + 1, f"Patient {i}", 80.0 + i % 120, 18.0 + i % 200 / 10, STAGES[i % 4],
+          f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:15:00") for i in range(n)))
+    conn.commit()
+    conn.close()
+
+
+def run(path, kind, row_group_rows, result):
+    import pyarrow  # noqa: F401  - import the library before the baseline is taken
+
+    conn = sqlite3.connect(path)
+    options = ExportOptions(list(EXPORT_COLUMNS), [], None, None, True)
+    started = time.perf_counter()
+    if kind == "csv + gzip":
+        blocks = export_csv(conn, options)
+    elif kind == "parquet":
+        blocks, _ = export_parquet(conn, options, row_group_rows=row_group_rows)
+    else:
+        blocks = []
+    size = sum(len(block) for block in blocks)
+    result.put((size, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))
+
+
+def measure(path, kind, row_group_rows=None):
+    result = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run, args=(path, kind, row_group_rows, result))
+    process.start()
+    values = result.get()
+    process.join()
+    return values
+
+
+def main():
+    print(f"{'rows':>9} {'export':<22} {'output MB':>10} {'peak RSS MB':>12} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in SIZES:
+            path = os.path.join(directory, f"{n}.db")
+            build(path, n)
+            for label, kind, row_group_rows in [("baseline", "none", None), ("csv + gzip", "csv + gzip", None),
+                                                ("parquet, groups 10k", "parquet", 10_000),
+                                                ("parquet, groups 50k", "parquet", 50_000)]:
+                size, elapsed, peak = measure(path, kind, row_group_rows)
+                print(f"{n:>9} {label:<22} {size / 1e6:>10.1f} {peak / 1e6:>12.1f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
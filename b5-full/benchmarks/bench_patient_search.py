@@ -0,0 +1,99 @@
+"""
+Benchmark: doctor dashboard search, LIKE scan vs. the FTS5 index.
+
+Builds a migrated database of N patients over 2000 users and times one
+search page (the COUNT for pagination plus 15 rows) through the old
+``LIKE '%x%'`` queries and through the patient_search index, plus what the
+index triggers add to each committed insert.
+
+Run from the project directory:
+    python benchmarks/bench_patient_search.py
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from migrations import migrate
+from patient_search import LIKE_COUNT_SQL, LIKE_ROWS_SQL, TRIGGER_NAMES, match_query, search_patients
+
+SIZES = (10_000, 100_000)
+QUERIES = ("smith", "maria jo", "type 2", "pre")
+INSERT_ROWS = 5_000
+FIRST = ["John", "Maria", "Ahmed", "Li", "Priya", "Carlos", "Anna", "Kofi", "Yuki", "Olga"]
+LAST = ["Smith", "Jones", "Garcia", "Khan", "Chen", "Okafor", "Ivanova", "Silva", "Tanaka", "Müller"]
+STAGES = ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]
+INSERT_SQL = "INSERT INTO patients (user_id, name, result, stage) VALUES (?, ?, ?, ?)"
+
+
+def rows(n, rng):
+    for i in range(n):
+        yield (i % 2000 + 1, f"{rng.choice(FIRST)} {rng.choice(LAST)}{i % 97}",
+               rng.choice(["Diabetic", "Not Diabetic"]), rng.choice(STAGES))
+
+
+def like_page(conn, text):
+    pattern = (f"%{text}%",) * 4
+    conn.execute(LIKE_COUNT_SQL, pattern).fetchone()
+    conn.execute(LIKE_ROWS_SQL.format(after="1", order="p.id DESC"), pattern + (15,)).fetchall()
+
+
+def fts_page(conn, text):
+    search_patients(conn, text, 15)
+
+
+def best_ms(fn, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'patients':>9} {'query':<10} {'matches':>8} {'LIKE ms':>9} {'FTS5 ms':>9}")
+        for n in SIZES:
+            conn = sqlite3.connect(os.path.join(directory, f"{n}.db"))
+            migrate(conn)
+            conn.executemany("INSERT INTO users (username, role) VALUES (?, 'patient')",
+                             [(f"{rng.choice(FIRST).lower()}{i}",) for i in range(2000)])
+            conn.executemany(INSERT_SQL, rows(n, rng))
+            conn.commit()
+            for text in QUERIES:
+                total, _ = search_patients(conn, text, 15)
+                print(f"{n:>9} {text:<10} {total:>8} {best_ms(like_page, conn, text):>9.2f} "
+                      f"{best_ms(fts_page, conn, text):>9.2f}")
+            conn.close()
+        print(f"(FTS5 query for 'maria jo': {match_query('maria jo')})")
+
+        # One committed row at a time, like /predict
+        for label, drop in (("with index", False), ("without index", True)):
+            conn = sqlite3.connect(os.path.join(directory, f"insert-{drop}.db"))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(conn)
+            conn.execute("INSERT INTO users (username, role) VALUES ('bench', 'patient')")
+            if drop:
+                for name in TRIGGER_NAMES:
+                    conn.execute(f"DROP TRIGGER {name}")
+            conn.commit()
+            started = time.perf_counter()
+            for row in rows(INSERT_ROWS, rng):
+                conn.execute(INSERT_SQL, (1,) + row[1:])
+                conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"insert {label:<14} {elapsed / INSERT_ROWS * 1e6:8.1f} us per committed row")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
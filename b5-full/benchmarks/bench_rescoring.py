@@ -0,0 +1,104 @@
+"""
+Benchmark: background rescoring throughput vs. live insert latency.
+
+Builds a temporary database with N patients, runs a RescoringJob over it at a
+few duty cycles while a "live" thread inserts one patient every 5 ms (like
+/predict), and reports rescoring rows/s next to the live inserts' p50/p99
+latency.  A duty cycle of 1.0 means no throttling.
+
+Run from the project directory:
+    python benchmarks/bench_rescoring.py [rows]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import FEATURE_COLUMNS, PREDICTION_COLUMNS
+from migrations import MIGRATIONS, migrate
+from model_store import load_engine
+from rescoring import RescoringJob
+
+warnings.filterwarnings("ignore")
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+
+def build_database(path, X):
+    conn = sqlite3.connect(path)
+    conn.execute(f"""
+        CREATE TABLE patients (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, name TEXT,
+            age INTEGER, pregnancies INTEGER, glucose REAL, bp REAL, skin REAL, insulin REAL,
+            bmi REAL, dpf REAL, result TEXT, stage TEXT, suggestion TEXT, model_version TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            {', '.join(c + ' REAL' for c in PREDICTION_COLUMNS)})
+    """)
+    # Only the job table; the other migrations' triggers would slow the live inserts being measured
+    migrate(conn, [m for m in MIGRATIONS if m.name == "rescoring jobs"], analyze=False)
+    rows = X[np.arange(ROWS) % len(X)].tolist()
+    with conn:
+        conn.executemany(f"INSERT INTO patients (user_id, name, {', '.join(FEATURE_COLUMNS)}) "
+                         f"VALUES (1, 'P', ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+
+def run(path, engine, duty_cycle):
+    connect = lambda: sqlite3.connect(path, timeout=10)
+    conn = connect()
+    with conn:
+        conn.execute("UPDATE patients SET model_version=NULL")
+        conn.execute("DELETE FROM rescoring_jobs")
+    conn.close()
+
+    job = RescoringJob(connect, lambda: engine, chunk_size=500, duty_cycle=duty_cycle)
+    job_id = job.prepare()
+    worker = threading.Thread(target=job.run, args=(job_id,))
+
+    latencies = []
+    live = connect()
+    started = time.perf_counter()
+    worker.start()
+    while worker.is_alive():
+        t = time.perf_counter()
+        with live:
+            live.execute("INSERT INTO patients (user_id, name, glucose) VALUES (2, 'live', 120)")
+        latencies.append(time.perf_counter() - t)
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - started
+    live.close()
+
+    progress = job.progress()
+    ms = np.array(latencies) * 1000
+    print(f"  duty {duty_cycle:>4.2f}: {progress['rows_done'] / elapsed:>9,.0f} rows/s  "
+          f"{elapsed:6.2f}s total | live inserts n={len(ms):>5}  "
+          f"p50 {np.percentile(ms, 50):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms  max {ms.max():6.1f} ms")
+
+
+def main():
+    engine, source = load_engine()
+    engine.version = "bench"
+    data = np.genfromtxt("diabetes.csv", delimiter=",", skip_header=1)
+    X = data[:, :len(FEATURE_COLUMNS)]
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        build_database(path, X)
+        print(f"Rescoring {ROWS:,} rows ({source}), chunk 500, live insert every 5 ms")
+        for duty in (1.0, 0.5, 0.25, 0.1):
+            run(path, engine, duty)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
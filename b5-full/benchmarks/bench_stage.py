@@ -0,0 +1,63 @@
+"""
+Benchmark: per-row cost of clinical staging.
+
+Compares the original scalar if/elif chain (called once per row) with the
+rule-mask NumPy classifier in staging.py at 1, 1k and 1M rows, and checks
+that both give the same stage for every row.
+
+Run from the project directory:
+    python benchmarks/bench_stage.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from staging import STAGE_NAMES, classify_stage, stage_indices
+
+
+def legacy_stage(glucose, insulin, bmi):
+    if glucose < 110 and bmi < 25:
+        return "Normal"
+    elif 110 <= glucose <= 140 or bmi >= 25:
+        return "Pre-Diabetic"
+    elif glucose >= 140 and insulin < 30:
+        return "Type 1 Diabetes"
+    return "Type 2 Diabetes"
+
+
+def per_row_us(fn, n, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / n * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>9} | {'if/elif chain':>14} | {'rule masks':>11} | {'speedup':>7}   (us per row)")
+    for n in (1, 1000, 1_000_000):
+        glucose, insulin, bmi = rng.uniform(0, 400, n), rng.uniform(0, 900, n), rng.uniform(10, 70, n)
+        g, i, b = glucose.tolist(), insulin.tolist(), bmi.tolist()
+        repeat = 3 if n >= 1_000_000 else 200
+
+        legacy = per_row_us(lambda: [legacy_stage(*row) for row in zip(g, i, b)], n, repeat)
+        if n == 1:
+            # The /predict path: one scalar call through the same rule masks
+            vectorized = per_row_us(lambda: classify_stage(g[0], i[0], b[0]), n, repeat)
+        else:
+            vectorized = per_row_us(lambda: stage_indices(glucose, insulin, bmi), n, repeat)
+
+        names = np.array(STAGE_NAMES)[stage_indices(glucose, insulin, bmi)]
+        assert names.tolist() == [legacy_stage(*row) for row in zip(g, i, b)]
+        print(f"{n:>9,} | {legacy:>14.3f} | {vectorized:>11.3f} | {legacy / vectorized:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
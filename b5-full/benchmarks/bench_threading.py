@@ -0,0 +1,100 @@
+"""
+Benchmark: inference threading settings under concurrent load.
+
+Runs C concurrent clients (one thread each, like gunicorn threads) scoring
+single rows through the uncompiled pickled models, which is where the
+thread settings matter, and through the compiled bundle for reference:
+
+    as trained    RF n_jobs=-1, BLAS/OpenMP pools at their defaults
+    n_threads=1   n_jobs and every pool reset to 1 (INFERENCE_THREADS=1)
+    n_threads=N   n_jobs and pools set to the number of CPUs
+
+Each setting runs in its own process because thread pools are process-wide.
+
+Run from the project directory:
+    python benchmarks/bench_threading.py
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUESTS_PER_CLIENT = 25
+
+
+def run(score, X, clients):
+    import numpy as np
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        local = []
+        for k in range(REQUESTS_PER_CLIENT):
+            start = time.perf_counter()
+            score(X[(offset + k) % len(X)])
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c * REQUESTS_PER_CLIENT,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def measure(setting):
+    sys.path.insert(0, PROJECT_DIR)
+    os.chdir(PROJECT_DIR)
+    import inference_threads
+
+    cpus = os.cpu_count()
+    n_threads = {"as trained": None, "n_threads=1": 1, "n_threads=N": cpus, "compiled": 1}[setting]
+    if n_threads is not None:
+        inference_threads.configure(n_threads)
+
+    import numpy as np
+    from model_store import load_engine
+
+    if setting == "compiled":
+        engine, _ = load_engine()
+    elif n_threads is None:
+        import joblib
+        from inference import EnsembleEngine
+        engine = EnsembleEngine(*(joblib.load(name) for name in (
+            "scaler.pkl", "diabetes_model_lr.pkl", "diabetes_model_rf.pkl", "diabetes_model_xgb.pkl")),
+            compile_lr=False, compile_trees=False)
+    else:
+        engine, _ = load_engine(use_compiled=False, n_jobs=n_threads)
+
+    X = np.genfromtxt("diabetes.csv", delimiter=",", skip_header=1)[:, :8]
+    engine.predict(X[:3])
+    label = setting.replace("N", str(cpus))
+    for clients in (1, 8, 32):
+        rps, p50, p99 = run(engine.predict_one, X, clients)
+        print(f"{clients:>7} {label:<14} {rps:>9.1f} {p50:>9.2f} {p99:>9.2f}", flush=True)
+
+
+def main():
+    print(f"{os.cpu_count()} CPUs, {REQUESTS_PER_CLIENT} single-row requests per client")
+    print(f"{'clients':>7} {'setting':<14} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for setting in ("as trained", "n_threads=1", "n_threads=N", "compiled"):
+        # Warnings are raised in joblib worker threads too, so silence them process-wide
+        subprocess.run([sys.executable, __file__, setting], check=True,
+                       env=dict(os.environ, PYTHONWARNINGS="ignore"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        measure(sys.argv[1])
+    else:
+        main()
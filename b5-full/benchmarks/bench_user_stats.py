@@ -0,0 +1,86 @@
+"""
+Benchmark: history() statistics from the user's rows vs. from user_stats.
+
+Builds a migrated database of 200k patients spread over 1000 users plus one
+long-term user with N records, then times the statistics part of history()
+the old way (AVG/MIN/MAX aggregate, GROUP BY stage, last 5 rows) and through
+read_user_stats(), plus what the user_stats triggers add to each insert.
+
+Run from the project directory:
+    python benchmarks/bench_user_stats.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from migrations import migrate
+from user_stats import TRIGGERS_SQL, read_user_stats
+
+BACKGROUND_ROWS = 200_000
+HISTORY_SIZES = (10, 100, 1000, 5000)
+INSERT_ROWS = 20_000
+STAGES = ["Normal", "Pre-Diabetic", "Type 1 Diabetes", "Type 2 Diabetes"]
+INSERT_SQL = "INSERT INTO patients (user_id, name, glucose, bmi, bp, stage) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def rows(user_ids, n):
+    for i in range(n):
+        yield (user_ids(i), f"p{i}", 80 + i % 120, 18 + (i % 200) / 10, 60 + i % 40, STAGES[i % 4])
+
+
+def old_stats(conn, user_id):
+    conn.execute("""SELECT COUNT(*), AVG(glucose), AVG(bmi), AVG(bp), MIN(glucose), MAX(glucose), MIN(bmi), MAX(bmi)
+                    FROM patients WHERE user_id=?""", (user_id,)).fetchone()
+    conn.execute("SELECT stage, COUNT(*) FROM patients WHERE user_id=? GROUP BY stage", (user_id,)).fetchall()
+    conn.execute("SELECT glucose, bmi, created_at FROM patients WHERE user_id=? ORDER BY created_at DESC LIMIT 5",
+                 (user_id,)).fetchall()
+
+
+def best_ms(fn, *args, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "history.db"))
+        migrate(conn)
+        conn.executemany(INSERT_SQL, rows(lambda i: i % 1000 + 1, BACKGROUND_ROWS))
+        conn.commit()
+        print(f"{'records':>8} {'aggregate queries ms':>21} {'user_stats ms':>14}")
+        for user_id, n in enumerate(HISTORY_SIZES, start=10_000):
+            conn.executemany(INSERT_SQL, rows(lambda i: user_id, n))
+            conn.commit()
+            print(f"{n:>8} {best_ms(old_stats, conn, user_id):>21.3f} {best_ms(read_user_stats, conn, user_id):>14.3f}")
+        conn.close()
+
+        # One committed row at a time, like /predict
+        for label, drop in (("with user_stats", False), ("without user_stats", True)):
+            conn = sqlite3.connect(os.path.join(directory, f"insert-{drop}.db"))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(conn)
+            if drop:
+                for sql in TRIGGERS_SQL:
+                    conn.execute(f"DROP TRIGGER {sql.split()[5]}")
+            started = time.perf_counter()
+            for row in rows(lambda i: i % 1000 + 1, INSERT_ROWS):
+                conn.execute(INSERT_SQL, row)
+                conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"insert {label:<19} {elapsed / INSERT_ROWS * 1e6:8.1f} us per committed row")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: dashboard reads while /predict-style inserts are committing.
+
+One writer thread inserts patient rows in small transactions (as /predict
+does) while reader threads run the doctor-dashboard query.  Compares the old
+rollback journal (journal_mode=DELETE, synchronous=FULL) with each pragma
+profile, reporting writes/s, read latency and "database is locked" errors.
+
+Run from the project directory:
+    python benchmarks/bench_wal.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from db import ConnectionPool
+
+SECONDS = 3
+READERS = 4
+SEED_ROWS = 20000
+
+CONFIGURATIONS = [
+    ("rollback journal", "safe", {"journal_mode": "DELETE", "busy_timeout": 200}),
+    ("safe", "safe", {"busy_timeout": 200}),
+    ("balanced", "balanced", {"busy_timeout": 200}),
+    ("fast", "fast", {"busy_timeout": 200}),
+]
+
+
+def run(label, profile, pragmas, directory):
+    path = os.path.join(directory, f"{profile}-{len(pragmas)}-{label[:4]}.db")
+    pool = ConnectionPool(path, size=READERS + 1, timeout=0.2, profile=profile, pragmas=pragmas)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT, "
+                     "glucose REAL, bmi REAL, result TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.executemany("INSERT INTO patients (user_id, name, glucose, bmi, result) VALUES (?, ?, ?, ?, ?)",
+                         [(i % 500, f"p{i}", 90 + i % 90, 20 + i % 15, "Diabetic" if i % 3 else "Not Diabetic")
+                          for i in range(SEED_ROWS)])
+        conn.commit()
+
+    stop = threading.Event()
+    writes, read_latencies, errors = [0], [], [0]
+    lock = threading.Lock()
+
+    def writer():
+        with pool.connection() as conn:
+            while not stop.is_set():
+                try:
+                    conn.execute("INSERT INTO patients (user_id, name, glucose, bmi, result) VALUES (1, 'w', 120, 25, 'Diabetic')")
+                    conn.commit()
+                    writes[0] += 1
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    with lock:
+                        errors[0] += 1
+
+    def reader():
+        local = []
+        with pool.connection() as conn:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute("SELECT result, COUNT(*), AVG(glucose) FROM patients WHERE id <= ? GROUP BY result",
+                                 (SEED_ROWS,)).fetchall()
+                    conn.execute("SELECT id, name FROM patients ORDER BY id DESC LIMIT 20").fetchall()
+                    local.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+        with lock:
+            read_latencies.extend(local)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(READERS)]
+    for t in threads:
+        t.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for t in threads:
+        t.join()
+    pool.close_all()
+
+    latencies = np.array(read_latencies or [0]) * 1000
+    print(f"{label:<18} {writes[0] / SECONDS:>9.0f} {len(read_latencies) / SECONDS:>9.0f} "
+          f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} {errors[0]:>7}")
+
+
+def main():
+    print(f"1 writer, {READERS} readers, {SECONDS}s each, {SEED_ROWS} seed rows")
+    print(f"{'':<18} {'writes/s':>9} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, profile, pragmas in CONFIGURATIONS:
+            run(label, profile, pragmas, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: per-worker memory for different model loading modes.
+
+Starts N worker processes the way a multi-worker server would and reports,
+per worker, how much RSS and private (unshared) memory loading the models
+added, and the worker's PSS (proportional set size: shared pages are divided
+between the processes mapping them).  The libraries are imported before the
+workers fork, so the numbers isolate the models themselves.
+
+    pickle          every worker runs joblib.load on the four pickles
+    compiled-copy   every worker reads the compiled bundle into private memory
+    compiled-mmap   every worker memory-maps the compiled bundle
+    preload-fork    the parent loads pickles once, then forks the workers
+
+Linux only (reads /proc/<pid>/smaps_rollup).  Run from the project directory:
+    python benchmarks/bench_worker_memory.py [workers]
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+warnings.filterwarnings("ignore")
+
+PICKLES = ["scaler.pkl", "diabetes_model_lr.pkl", "diabetes_model_rf.pkl", "diabetes_model_xgb.pkl"]
+
+
+def memory_kib(pid="self"):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":"):
+                values[parts[0][:-1]] = int(parts[1])
+    private = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values["Rss"], values["Pss"], private
+
+
+def load(mode):
+    import numpy as np
+    from compiled_models import load_bundle
+    from inference import EnsembleEngine
+
+    if mode == "pickle":
+        import joblib
+        scaler, lr, rf, xgb = [joblib.load(p) for p in PICKLES]
+        engine = EnsembleEngine(scaler, lr, rf, xgb, compile_lr=False, compile_trees=False)
+    else:
+        models, _ = load_bundle("compiled", mmap=(mode == "compiled-mmap"))
+        engine = EnsembleEngine(None, models["lr"], models["rf"], models["xgb"])
+    # One prediction so lazily touched pages are counted
+    engine.predict(np.array([[1, 120, 70, 20, 79, 25.0, 0.5, 33]]))
+    return engine
+
+
+def worker(mode, ready, done):
+    rss_before, _, private_before = memory_kib()
+    engine = load(mode) if mode != "preload-fork" else PRELOADED
+    engine.predict([[2, 140, 80, 30, 100, 30.0, 0.6, 45]])
+    rss_after, _, private_after = memory_kib()
+    ready.put((os.getpid(), rss_after - rss_before, private_after - private_before))
+    done.wait()
+
+
+PRELOADED = None
+
+
+def run(mode, workers):
+    global PRELOADED
+    ctx = mp.get_context("fork")
+    if mode == "preload-fork":
+        PRELOADED = load("pickle")
+    ready, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(mode, ready, done)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    results = [ready.get() for _ in procs]
+    # PSS is read once all workers are alive and sharing
+    results = [(rss, private, memory_kib(pid)[1]) for pid, rss, private in results]
+    done.set()
+    for p in procs:
+        p.join()
+    PRELOADED = None
+    return results
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    import numpy  # noqa: F401  - import the libraries before the baseline is taken
+    import joblib  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+    import xgboost  # noqa: F401
+
+    print(f"{workers} workers, per-worker memory in KiB")
+    print(f"{'mode':<16} {'+RSS (load)':>12} {'+private (load)':>16} {'PSS':>10}")
+    for mode in ("pickle", "compiled-copy", "compiled-mmap", "preload-fork"):
+        results = run(mode, workers)
+        n = len(results)
+        print(f"{mode:<16} {sum(r[0] for r in results) / n:>12.0f} "
+              f"{sum(r[1] for r in results) / n:>16.0f} {sum(r[2] for r in results) / n:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
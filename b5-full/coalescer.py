@@ -0,0 +1,143 @@
+"""
+Micro-batching coalescer for concurrent single-row predictions.
+
+Request threads hand their feature vector to the coalescer and block on a
+future.  A background worker takes the queued rows, scores them as one matrix
+through the EnsembleEngine and hands every waiting request its own row back.
+
+Rows that arrive while the engine is busy form the next batch.  The worker
+only holds a batch open for up to ``max_wait_ms`` (or until ``max_batch``
+rows are waiting) when other requests are already queued behind the first
+one, so a lone request is scored immediately instead of paying the window.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+class PredictionCoalescer:
+    """Coalesces concurrent predict_one() calls into batched engine calls"""
+
+    def __init__(self, engine_provider, max_wait_ms=2.0, max_batch=32):
+        # engine_provider is a callable so a reloaded engine is picked up automatically
+        self.engine_provider = engine_provider
+        self.max_wait = max(max_wait_ms, 0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        # Guards the pending rows and the counters below
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        self._batches = 0
+        self._rows = 0
+        self._max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._batch_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def predict_one(self, features, timeout=30):
+        """Score one feature vector, sharing the model call with concurrent requests"""
+        self._ensure_worker()
+        future = Future()
+        item = (np.asarray(features, dtype=np.float64), future, time.perf_counter())
+        with self._cond:
+            self._pending.append(item)
+            if len(self._pending) > self._max_queue_depth:
+                self._max_queue_depth = len(self._pending)
+            self._cond.notify()
+        return future.result(timeout)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+                return
+            if self._worker_pid != os.getpid():
+                # The parent's condition may have been held by a thread that no longer exists here
+                self._cond = threading.Condition()
+                self._pending = deque()
+            self._worker = threading.Thread(target=self._run, name="prediction-coalescer", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _collect(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            batch = [self._pending.popleft()]
+            # Nothing else queued: score the lone row now rather than wait for company
+            if not self._pending:
+                return batch
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self._pending:
+                    batch.append(self._pending.popleft())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                engine = self.engine_provider()
+                if engine is None:
+                    raise RuntimeError("Prediction model not available")
+                result = engine.predict(np.vstack([features for features, _, _ in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for k, (_, future, _) in enumerate(batch):
+                future.set_result(result.row(k))
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        with self._cond:
+            self._batches += 1
+            self._rows += len(batch)
+            for _, _, queued_at in batch:
+                waited = started - queued_at
+                self._wait_seconds += waited
+                if waited > self._max_wait_seconds:
+                    self._max_wait_seconds = waited
+            for b, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if len(batch) <= bound:
+                    self._batch_histogram[b] += 1
+                    break
+            else:
+                self._batch_histogram[-1] += 1
+
+    def stats(self):
+        """Queue-depth and batch-size metrics for tuning the wait window"""
+        labels = [str(b) for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        with self._cond:
+            return {
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch": self.max_batch,
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "rows": self._rows,
+                "avg_batch_size": round(self._rows / self._batches, 2) if self._batches else 0,
+                "avg_queue_wait_ms": round(self._wait_seconds / self._rows * 1000, 3) if self._rows else 0,
+                "max_queue_wait_ms": round(self._max_wait_seconds * 1000, 3),
+                "batch_size_histogram": dict(zip(labels, self._batch_histogram)),
+            }
@@ -0,0 +1,396 @@
+"""
+Load-time compilation of the trained models into pure-NumPy kernels.
+
+The compiled models take *raw* (unscaled) features: the StandardScaler is
+folded into their parameters (or applied with plain NumPy) once at load time,
+so a request never pays for ``scaler.transform`` or sklearn's per-call input
+validation.  Every compiled model sets ``accepts_raw_features = True``, which
+is how EnsembleEngine knows to hand it the raw matrix.
+
+The tree ensembles (Random Forest and XGBoost) are flattened into contiguous
+arrays.  All three compiled models are saved as a bundle directory of plain
+``.npy`` files plus a ``manifest.json``:
+
+    python compiled_models.py      # writes compiled/ next to the pickles
+
+The loader memory-maps the ``.npy`` files read-only, so every worker process
+on a host shares one page-cache copy of the model arrays instead of holding
+its own unpickled estimators.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def _scaler_params(scaler, n_features):
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def lr_proba(X_raw, coef, intercept):
+    """P(class 1) of a binary logistic regression on raw features"""
+    z = X_raw @ coef + intercept
+    # tanh form of the logistic function does not overflow for large |z|
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+class FusedLogisticRegression:
+    """Binary LogisticRegression with the StandardScaler folded into its weights
+
+    For z = coef . ((x - mean) / scale) + b the fused weights are
+    coef / scale and b - sum(coef * mean / scale), so z = coef' . x + b'.
+    """
+
+    accepts_raw_features = True
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        if coef.shape[0] != 1:
+            raise ValueError("Only binary LogisticRegression models can be fused")
+        coef = coef[0]
+        mean, scale = _scaler_params(scaler, len(coef))
+        fused_coef = coef / scale
+        fused_intercept = float(model.intercept_[0]) - float(np.dot(fused_coef, mean))
+        return cls(fused_coef, fused_intercept, model.classes_)
+
+    def decision_function(self, X_raw):
+        return np.asarray(X_raw, dtype=np.float64) @ self.coef + self.intercept
+
+    def predict_proba(self, X_raw):
+        p = lr_proba(np.asarray(X_raw, dtype=np.float64), self.coef, self.intercept)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X_raw):
+        # Same rule as sklearn: positive class when the decision value is > 0
+        return self.classes_[(self.decision_function(X_raw) > 0).astype(int)]
+
+    def arrays(self):
+        return {"coef": self.coef}
+
+    def meta(self):
+        return {"kind": "lr", "intercept": self.intercept, "classes": self.classes_.tolist()}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(arrays["coef"], meta["intercept"], meta["classes"])
+
+
+def file_digest(path):
+    """SHA-256 of an artifact file, used to detect stale compiled models"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CompiledTreeEnsemble:
+    """Random Forest or XGBoost model flattened into contiguous NumPy arrays
+
+    All trees share one node table.  Node i splits on ``feature[i]`` and goes
+    to ``children[2*i]`` when ``x <= threshold[i]`` (or when x is NaN and
+    ``default_left[i]``), otherwise to ``children[2*i + 1]``.  Leaves point at
+    themselves, so every row can walk every tree for ``depth`` steps without
+    branching.  ``value`` holds P(class 1) for forest leaves and the leaf
+    margin for boosted trees.
+
+    Features are scaled with the stored mean/scale and rounded to float32
+    exactly like the original libraries, so split decisions are identical.
+    The arrays are stored in the exact dtypes the walk uses, so memory-mapped
+    arrays are used in place without a private copy.
+    """
+
+    accepts_raw_features = True
+
+    # Rows walked per chunk, bounds the (rows x trees) index matrix
+    CHUNK_ROWS = 4096
+
+    ARRAY_NAMES = ("feature", "threshold", "children", "value", "default_left", "roots", "mean", "scale")
+
+    def __init__(self, kind, feature, threshold, children, value, default_left,
+                 roots, depth, mean, scale, base_margin=0.0, classes=(0, 1)):
+        self.kind = kind
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        self.mean = np.ascontiguousarray(mean, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float64)
+        self.base_margin = float(base_margin)
+        self.classes_ = np.asarray(classes)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+    # --- converters ---
+
+    @staticmethod
+    def _interleave(left, right):
+        return np.stack([left, right], axis=1).ravel()
+
+    @classmethod
+    def from_sklearn_forest(cls, scaler, forest):
+        if list(forest.classes_) != [0, 1]:
+            raise ValueError("Only binary 0/1 forests can be compiled")
+        mean, scale = _scaler_params(scaler, forest.n_features_in_)
+        features, thresholds, children, values, defaults, roots = [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n)
+
+            counts = tree.value[:, 0, :]
+            proba = counts[:, 1] / counts.sum(axis=1)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(cls._interleave(np.where(is_leaf, node_ids, tree.children_left),
+                                            np.where(is_leaf, node_ids, tree.children_right)) + offset)
+            values.append(proba)
+            missing_left = getattr(tree, "missing_go_to_left", np.zeros(n, dtype=np.uint8))
+            defaults.append(np.asarray(missing_left, dtype=bool))
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n
+
+        return cls("rf", np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(children), np.concatenate(values), np.concatenate(defaults),
+                   roots, depth, mean, scale, classes=forest.classes_)
+
+    @classmethod
+    def from_xgboost(cls, scaler, model):
+        booster = model.get_booster()
+        learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError("Only binary:logistic XGBoost models can be compiled")
+
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        mean, scale = _scaler_params(scaler, int(learner["learner_model_param"]["num_feature"]))
+        features, thresholds, children, values, defaults, roots = [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for tree in trees:
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            n = len(left)
+            is_leaf = left == -1
+            node_ids = np.arange(n)
+
+            # XGBoost goes left when x < condition (float32); for float32 x that is
+            # the same as x <= the next float32 below the condition
+            below = np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)
+
+            features.append(np.where(is_leaf, 0, tree["split_indices"]))
+            thresholds.append(np.where(is_leaf, 0.0, below))
+            children.append(cls._interleave(np.where(is_leaf, node_ids, left),
+                                            np.where(is_leaf, node_ids, right)) + offset)
+            values.append(np.where(is_leaf, conditions.astype(np.float64), 0.0))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool))
+            roots.append(offset)
+            depth = max(depth, _tree_depth(left, right))
+            offset += n
+
+        return cls("xgb", np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(children), np.concatenate(values), np.concatenate(defaults),
+                   roots, depth, mean, scale, base_margin=base_margin, classes=model.classes_)
+
+    # --- evaluation ---
+
+    def _leaf_values(self, X32):
+        n, width = X32.shape
+        nodes = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        row_offsets = (np.arange(n, dtype=np.intp) * width)[:, None]
+        flat_x = X32.ravel()
+        has_nan = np.isnan(flat_x).any()
+        for _ in range(self.depth):
+            x = flat_x.take(row_offsets + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(nodes), go_right)
+            nodes = self.children.take(nodes * 2 + go_right)
+        return self.value.take(nodes)
+
+    def positive_proba(self, X_raw):
+        """P(class 1) for an (N, 8) matrix of raw features"""
+        X_raw = np.asarray(X_raw, dtype=np.float64)
+        if X_raw.ndim == 1:
+            X_raw = X_raw.reshape(1, -1)
+        # Same arithmetic as StandardScaler.transform, then the libraries' float32 cast
+        X32 = ((X_raw - self.mean) / self.scale).astype(np.float32).astype(np.float64)
+
+        out = np.empty(X32.shape[0], dtype=np.float64)
+        for start in range(0, X32.shape[0], self.CHUNK_ROWS):
+            leaves = self._leaf_values(X32[start:start + self.CHUNK_ROWS])
+            if self.kind == "rf":
+                out[start:start + len(leaves)] = leaves.mean(axis=1)
+            else:
+                margin = self.base_margin + leaves.sum(axis=1)
+                out[start:start + len(leaves)] = 0.5 * (1.0 + np.tanh(0.5 * margin))
+        return out
+
+    def predict_proba(self, X_raw):
+        p = self.positive_proba(X_raw)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X_raw):
+        return self.classes_[np.argmax(self.predict_proba(X_raw), axis=1)]
+
+    # --- persistence ---
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def meta(self):
+        return {"kind": self.kind, "depth": self.depth, "base_margin": self.base_margin,
+                "classes": self.classes_.tolist(), "n_trees": self.n_trees}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(meta["kind"], *(arrays[name] for name in cls.ARRAY_NAMES[:6]),
+                   meta["depth"], arrays["mean"], arrays["scale"],
+                   base_margin=meta["base_margin"], classes=meta["classes"])
+
+
+def _tree_depth(left, right):
+    depth = 0
+    frontier = [0]
+    while True:
+        children = [c for node in frontier for c in (left[node], right[node]) if c != -1]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
+
+
+# --- bundle directory ---
+
+BUNDLE_FORMAT = 1
+
+COMPILED_DIR = "compiled"
+
+# Files each bundle is compiled from, recorded in the manifest to detect stale bundles
+SOURCE_ARTIFACTS = ["scaler.pkl", "diabetes_model_lr.pkl", "diabetes_model_rf.pkl", "diabetes_model_xgb.pkl"]
+
+_MODEL_CLASSES = {"lr": FusedLogisticRegression, "rf": CompiledTreeEnsemble, "xgb": CompiledTreeEnsemble}
+
+
+def save_bundle(directory, models, sources):
+    """Write compiled models as .npy files plus manifest.json
+
+    The manifest is written last (atomically), so a reader never sees a
+    manifest that points at missing arrays.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": BUNDLE_FORMAT, "sources": sources, "models": {}}
+    for name, model in models.items():
+        model_dir = os.path.join(directory, name)
+        os.makedirs(model_dir, exist_ok=True)
+        for array_name, array in model.arrays().items():
+            np.save(os.path.join(model_dir, array_name + ".npy"), np.ascontiguousarray(array))
+        manifest["models"][name] = model.meta()
+
+    tmp_path = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, "manifest.json"))
+    return manifest
+
+
+def load_bundle(directory, mmap=True):
+    """Load every model of a bundle; arrays are memory-mapped read-only when mmap is set"""
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported compiled bundle format: {manifest.get('format')}")
+
+    models = {}
+    for name, meta in manifest["models"].items():
+        model_dir = os.path.join(directory, name)
+        arrays = {}
+        for filename in os.listdir(model_dir):
+            if filename.endswith(".npy"):
+                arrays[filename[:-4]] = np.load(os.path.join(model_dir, filename),
+                                                mmap_mode="r" if mmap else None, allow_pickle=False)
+        models[name] = _MODEL_CLASSES[meta["kind"]].from_arrays(arrays, meta)
+    return models, manifest
+
+
+def source_digests(source_dir="."):
+    return {name: file_digest(os.path.join(source_dir, name)) for name in SOURCE_ARTIFACTS}
+
+
+def load_compiled_models(source_dir=".", directory=None, mmap=True):
+    """Load the compiled bundle if it was built from the current pickles
+
+    Returns a dict with "lr", "rf" and "xgb", or None when the bundle is
+    missing or stale so callers fall back to the pickles.
+    """
+    directory = directory or os.path.join(source_dir, COMPILED_DIR)
+    if not os.path.exists(os.path.join(directory, "manifest.json")):
+        return None
+    models, manifest = load_bundle(directory, mmap=mmap)
+    if manifest.get("sources") != source_digests(source_dir):
+        print(f"Warning: {directory} is out of date, falling back to the .pkl models")
+        return None
+    return models
+
+
+def compile_artifacts(source_dir=".", directory=None):
+    """Compile the pickled scaler + three models into a bundle directory"""
+    import joblib
+
+    directory = directory or os.path.join(source_dir, COMPILED_DIR)
+    scaler = joblib.load(os.path.join(source_dir, "scaler.pkl"))
+    models = {
+        "lr": FusedLogisticRegression.from_sklearn(
+            scaler, joblib.load(os.path.join(source_dir, "diabetes_model_lr.pkl"))),
+        "rf": CompiledTreeEnsemble.from_sklearn_forest(
+            scaler, joblib.load(os.path.join(source_dir, "diabetes_model_rf.pkl"))),
+        "xgb": CompiledTreeEnsemble.from_xgboost(
+            scaler, joblib.load(os.path.join(source_dir, "diabetes_model_xgb.pkl"))),
+    }
+    save_bundle(directory, models, source_digests(source_dir))
+    return directory, models
+
+
+if __name__ == "__main__":
+    directory, models = compile_artifacts()
+    for name, model in models.items():
+        details = f"{model.n_trees} trees, depth {model.depth}" if name != "lr" else "fused with scaler"
+        size = sum(a.nbytes for a in model.arrays().values())
+        print(f"✓ {directory}/{name}: {details}, {size / 1024:.1f} KiB")
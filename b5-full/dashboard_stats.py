@@ -0,0 +1,199 @@
+"""
+Incrementally maintained aggregates for the doctor and admin dashboards.
+
+``dashboard_stats`` holds one row per (kind, key):
+
+    patients / ''          all patients: count, glucose and BMI sums
+    result / <result>      patients per result ("Diabetic", "Not Diabetic")
+    stage / <stage>        patients per stage
+    users / ''             all users
+    role / <role>          users per role
+
+Triggers on ``patients`` and ``users`` keep the rows current for every
+write path: /predict and batch inserts, rescoring updates, and deleting a
+user (which deletes their patients first).  A dashboard then reads a
+handful of rows instead of scanning ``patients``.  Sums and non-NULL counts
+are stored separately so averages match SQL's AVG().
+
+The triggers run inside the writing transaction, so the stats cannot drift
+through the app.  Manual edits with triggers dropped, or a restore of only
+one table, can; ``python dashboard_stats.py check`` reports drift and
+``python dashboard_stats.py rebuild`` recomputes the table from scratch.
+"""
+
+import argparse
+import math
+import os
+
+from staging import STAGE_NAMES
+
+DASHBOARD_STATS_SQL = """
+    CREATE TABLE IF NOT EXISTS dashboard_stats (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        glucose_sum REAL NOT NULL DEFAULT 0,
+        glucose_n INTEGER NOT NULL DEFAULT 0,
+        bmi_sum REAL NOT NULL DEFAULT 0,
+        bmi_n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (kind, key)
+    ) WITHOUT ROWID
+"""
+
+# sign is +1 for the NEW row and -1 for the OLD one; NULL result/stage/role are stored under ''
+_PATIENT_DELTA = """
+    INSERT INTO dashboard_stats (kind, key, count, glucose_sum, glucose_n, bmi_sum, bmi_n)
+    VALUES ('{kind}', {key}, {sign}, {sign} * COALESCE({row}.glucose, 0), {sign} * ({row}.glucose IS NOT NULL),
+            {sign} * COALESCE({row}.bmi, 0), {sign} * ({row}.bmi IS NOT NULL))
+    ON CONFLICT (kind, key) DO UPDATE SET
+        count = count + excluded.count,
+        glucose_sum = glucose_sum + excluded.glucose_sum,
+        glucose_n = glucose_n + excluded.glucose_n,
+        bmi_sum = bmi_sum + excluded.bmi_sum,
+        bmi_n = bmi_n + excluded.bmi_n;
+"""
+
+_USER_DELTA = """
+    INSERT INTO dashboard_stats (kind, key, count) VALUES ('{kind}', {key}, {sign})
+    ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count;
+"""
+
+
+def _patient_deltas(row, sign):
+    return "".join(_PATIENT_DELTA.format(kind=kind, key=key.format(row=row), row=row, sign=sign)
+                   for kind, key in (("patients", "''"), ("result", "COALESCE({row}.result, '')"),
+                                     ("stage", "COALESCE({row}.stage, '')")))
+
+
+def _user_deltas(row, sign):
+    return "".join(_USER_DELTA.format(kind=kind, key=key.format(row=row), sign=sign)
+                   for kind, key in (("users", "''"), ("role", "COALESCE({row}.role, '')")))
+
+
+TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_patient_insert AFTER INSERT ON patients
+        BEGIN {_patient_deltas("NEW", 1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_patient_delete AFTER DELETE ON patients
+        BEGIN {_patient_deltas("OLD", -1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_patient_update
+        AFTER UPDATE OF result, stage, glucose, bmi ON patients
+        BEGIN {_patient_deltas("OLD", -1)} {_patient_deltas("NEW", 1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_user_insert AFTER INSERT ON users
+        BEGIN {_user_deltas("NEW", 1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_user_delete AFTER DELETE ON users
+        BEGIN {_user_deltas("OLD", -1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS dashboard_stats_user_update AFTER UPDATE OF role ON users
+        BEGIN {_user_deltas("OLD", -1)} {_user_deltas("NEW", 1)} END""",
+]
+
+# What the table should contain, computed from scratch
+EXPECTED_SQL = """
+    SELECT 'patients', '', COUNT(*), COALESCE(SUM(glucose), 0), COUNT(glucose), COALESCE(SUM(bmi), 0), COUNT(bmi)
+    FROM patients
+    UNION ALL
+    SELECT 'result', COALESCE(result, ''), COUNT(*), COALESCE(SUM(glucose), 0), COUNT(glucose),
+           COALESCE(SUM(bmi), 0), COUNT(bmi)
+    FROM patients GROUP BY COALESCE(result, '')
+    UNION ALL
+    SELECT 'stage', COALESCE(stage, ''), COUNT(*), COALESCE(SUM(glucose), 0), COUNT(glucose),
+           COALESCE(SUM(bmi), 0), COUNT(bmi)
+    FROM patients GROUP BY COALESCE(stage, '')
+    UNION ALL
+    SELECT 'users', '', COUNT(*), 0, 0, 0, 0 FROM users
+    UNION ALL
+    SELECT 'role', COALESCE(role, ''), COUNT(*), 0, 0, 0, 0 FROM users GROUP BY COALESCE(role, '')
+"""
+
+def create_dashboard_stats(conn):
+    """Table, triggers and initial contents; used by the schema migration"""
+    conn.execute(DASHBOARD_STATS_SQL)
+    for sql in TRIGGERS_SQL:
+        conn.execute(sql)
+    _fill(conn)
+
+
+def _fill(conn):
+    conn.execute("DELETE FROM dashboard_stats")
+    conn.execute("INSERT INTO dashboard_stats (kind, key, count, glucose_sum, glucose_n, bmi_sum, bmi_n) "
+                 + EXPECTED_SQL)
+
+
+def rebuild(conn):
+    """Recompute every row from patients and users in one write transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _fill(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _rows(conn, sql):
+    # Empty groups (count 0) are equivalent to missing rows
+    return {(row[0], row[1]): tuple(row[2:]) for row in conn.execute(sql) if row[2]}
+
+
+def _same(stored, expected):
+    # Running float sums may differ from a fresh SUM() in the last bits
+    if stored is None or expected is None:
+        return stored is expected
+    return all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(stored, expected))
+
+
+def check(conn):
+    """Rows whose stored value differs from a full recount: {(kind, key): (stored, expected)}"""
+    stored = _rows(conn, "SELECT kind, key, count, glucose_sum, glucose_n, bmi_sum, bmi_n FROM dashboard_stats")
+    expected = _rows(conn, EXPECTED_SQL)
+    return {key: (stored.get(key), expected.get(key))
+            for key in stored.keys() | expected.keys() if not _same(stored.get(key), expected.get(key))}
+
+
+def read_dashboard_stats(conn):
+    """Totals for both dashboards from the maintained rows"""
+    stats = {
+        "total_patients": 0, "avg_glucose": 0, "avg_bmi": 0,
+        "results": {}, "stages": {stage: 0 for stage in STAGE_NAMES},
+        "total_users": 0, "roles": {},
+    }
+    for kind, key, count, glucose_sum, glucose_n, bmi_sum, bmi_n in conn.execute(
+            "/* query: dashboard_stats */ SELECT kind, key, count, glucose_sum, glucose_n, bmi_sum, bmi_n "
+            "FROM dashboard_stats"):
+        if kind == "patients":
+            stats["total_patients"] = count
+            stats["avg_glucose"] = glucose_sum / glucose_n if glucose_n else 0
+            stats["avg_bmi"] = bmi_sum / bmi_n if bmi_n else 0
+        elif kind == "users":
+            stats["total_users"] = count
+        elif count:
+            stats[{"result": "results", "stage": "stages", "role": "roles"}[kind]][key] = count
+    return stats
+
+
+def main():
+    from db import DEFAULT_DB_PATH, ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the dashboard_stats aggregates")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", DEFAULT_DB_PATH))
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.db, size=1, profile=os.getenv("DB_PRAGMA_PROFILE", "balanced"))
+    with pool.connection() as conn:
+        drift = check(conn)
+        for (kind, key), (stored, expected) in sorted(drift.items()):
+            print(f"  {kind}/{key or '(none)'}: stored {stored}, expected {expected}")
+        if args.command == "rebuild":
+            rebuild(conn)
+            print(f"✓ Rebuilt dashboard_stats ({len(drift)} rows had drifted)")
+        elif drift:
+            print(f"❌ {len(drift)} rows differ; run: python dashboard_stats.py rebuild")
+        else:
+            print("✓ dashboard_stats matches patients and users")
+    pool.close_all()
+    if args.command == "check" and drift:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
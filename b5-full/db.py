@@ -0,0 +1,235 @@
+"""
+Shared SQLite connection layer.
+
+Opening a connection costs a file open, schema parse and page-cache warm-up,
+so connections are pooled instead of opened per page view.  Routes call
+``get_db_connection()`` (app.py), which binds one pooled connection to the
+Flask app context: every call within a request gets the same connection, and
+the ``teardown_appcontext`` hook returns it to the pool even when a route
+returns early or raises.  Code outside a request (background jobs, CLIs) gets
+its own pooled connection and hands it back with ``close()``.
+
+Every new connection is configured from a named pragma profile.  All of them
+use WAL, so a /predict INSERT no longer blocks dashboard readers; they differ
+in how much durability they trade for speed:
+
+    safe        synchronous=FULL: a commit survives power loss
+    balanced    synchronous=NORMAL: a commit survives an app crash; the last
+                transactions can roll back on power loss (the default)
+    fast        synchronous=OFF: OS crash or power loss can corrupt the file;
+                for throwaway or easily rebuilt databases only
+
+    DATABASE_PATH=diabetes_app.db   SQLite file
+    DB_POOL_SIZE=8                  idle connections kept per process
+    DB_PRAGMA_PROFILE=balanced      safe / balanced / fast
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import DB_CONNECTIONS, TimedConnection
+
+DEFAULT_DB_PATH = "diabetes_app.db"
+
+# Applied in this order to every new connection (cache_size < 0 is KiB, mmap_size is bytes);
+# busy_timeout comes first so the one-time switch to WAL waits for other connections
+PRAGMA_PROFILES = {
+    "safe": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "balanced": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 512 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+# PRAGMA read-backs return codes for these
+_PRAGMA_NAMES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        # journal_mode is stored in the file; switching it needs a lock, so only ask when it differs
+        if name == "journal_mode" and conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == value.lower():
+            continue
+        conn.execute(f"PRAGMA {name}={value}").fetchall()
+
+
+def effective_pragmas(conn, names=PRAGMA_PROFILES[DEFAULT_PROFILE]):
+    """Read the settings back as SQLite applied them"""
+    settings = {}
+    for name in names:
+        value = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        settings[name] = _PRAGMA_NAMES.get(name, {}).get(value, value)
+    return settings
+
+
+class PooledConnection(TimedConnection):
+    """Timed connection whose close() returns it to its pool"""
+
+    pool = None
+    # True while bound to a Flask app context: close() is then left to the teardown hook
+    bound = False
+    checked_out = False
+
+    def close(self):
+        if self.bound:
+            return
+        if self.pool is not None and self.checked_out:
+            self.pool.release(self)
+        else:
+            self.discard()
+
+    def discard(self):
+        """Really close the underlying SQLite handle"""
+        self.checked_out = False
+        super().close()
+
+
+class ConnectionPool:
+    """Per-process pool of SQLite connections
+
+    ``acquire()`` never blocks: it reuses an idle connection or opens a new
+    one.  ``release()`` rolls back anything left uncommitted and keeps up to
+    ``size`` idle connections; the rest are closed.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, size=8, timeout=10, profile=DEFAULT_PROFILE, pragmas=None):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown DB_PRAGMA_PROFILE {profile!r}; use one of {', '.join(PRAGMA_PROFILES)}")
+        self.path = path
+        self.size = max(int(size), 0)
+        self.timeout = timeout
+        self.profile = profile
+        self.pragmas = dict(PRAGMA_PROFILES[profile], **(pragmas or {}))
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.opened = 0
+        self.reused = 0
+        self.released = 0
+        self.closed = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def _connect(self):
+        # Pooled connections move between request threads, one thread at a time
+        conn = sqlite3.connect(self.path, timeout=self.timeout, factory=PooledConnection,
+                               check_same_thread=False)
+        conn.pool = self
+        try:
+            apply_pragmas(conn, self.pragmas)
+        except sqlite3.Error:
+            conn.discard()
+            raise
+        self.opened += 1
+        DB_CONNECTIONS.labels(event="opened").inc()
+        return conn
+
+    def acquire(self):
+        """Connection with row_factory=sqlite3.Row; close() or release() it when done"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # SQLite handles must not cross fork(); forget (never close) the parent's
+                self._idle, self._pid, self.in_use = [], os.getpid(), 0
+            conn = self._idle.pop() if self._idle else None
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        if conn is None:
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self.in_use -= 1
+                raise
+        else:
+            self.reused += 1
+            DB_CONNECTIONS.labels(event="reused").inc()
+        conn.row_factory = sqlite3.Row
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        """Return a connection acquired from this pool"""
+        if not conn.checked_out:
+            return
+        conn.checked_out = False
+        conn.bound = False
+        keep = conn.pool is self
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            keep = False
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+            if keep and self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                self.released += 1
+                DB_CONNECTIONS.labels(event="released").inc()
+                return
+        self._close(conn)
+
+    def _close(self, conn):
+        conn.discard()
+        self.closed += 1
+        DB_CONNECTIONS.labels(event="closed").inc()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... (released on exit, uncommitted work rolled back)"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def settings(self):
+        """Effective pragma values of a pooled connection, for the startup log"""
+        with self.connection() as conn:
+            return effective_pragmas(conn, self.pragmas)
+
+    def close_all(self):
+        """Close the idle connections, e.g. before the database file is replaced"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "profile": self.profile,
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "opened": self.opened,
+            "reused": self.reused,
+            "released": self.released,
+            "closed": self.closed,
+            "reuse_ratio": round(self.reused / (self.reused + self.opened), 4) if self.opened else 0,
+        }
@@ -0,0 +1,161 @@
+"""
+Parsing and columnar validation of PIMA feature batches.
+
+Used by the JSON/CSV batch prediction API.  Rows arrive either as JSON
+objects keyed by feature name, JSON arrays in FEATURE_COLUMNS order, or a CSV
+body with a header row.  Validation runs per column over the whole batch
+with NumPy masks instead of row by row.
+"""
+
+import csv
+import io
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS
+
+# (column, low, high, must be whole number, error message) - same ranges as the /predict form
+MEDICAL_RANGES = [
+    ("age", 1, 120, True, "Age must be between 1 and 120 years"),
+    ("pregnancies", 0, 20, True, "Pregnancies must be between 0 and 20"),
+    ("glucose", 0, 400, False, "Glucose must be between 0 and 400 mg/dL"),
+    ("bp", 40, 200, False, "Blood Pressure must be between 40 and 200 mmHg"),
+    ("skin", 0, 100, False, "Skin Thickness must be between 0 and 100 mm"),
+    ("insulin", 0, 900, False, "Insulin must be between 0 and 900 µU/mL"),
+    ("bmi", 10, 70, False, "BMI must be between 10 and 70"),
+    ("dpf", 0, 3, False, "Diabetes Pedigree Function must be between 0 and 3"),
+]
+
+# Decimal places kept for each feature, matching the /predict form inputs
+FEATURE_PRECISION = {
+    "pregnancies": 0,
+    "glucose": 1,
+    "bp": 1,
+    "skin": 1,
+    "insulin": 1,
+    "bmi": 1,
+    "dpf": 2,
+    "age": 0,
+}
+
+# Aliases accepted in JSON keys / CSV headers (form field names and PIMA dataset names)
+COLUMN_ALIASES = {
+    "pregnancies": "pregnancies",
+    "glucose": "glucose",
+    "bp": "bp",
+    "blood_pressure": "bp",
+    "bloodpressure": "bp",
+    "skin": "skin",
+    "skin_thickness": "skin",
+    "skinthickness": "skin",
+    "insulin": "insulin",
+    "bmi": "bmi",
+    "dpf": "dpf",
+    "diabetespedigreefunction": "dpf",
+    "age": "age",
+}
+
+
+class BatchFormatError(ValueError):
+    """Raised when a batch payload cannot be turned into a feature matrix"""
+
+
+def _canonical(key):
+    return COLUMN_ALIASES.get(str(key).strip().lower())
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def rows_from_json(payload):
+    """Turn a JSON array of objects or 8-item arrays into (matrix, names)"""
+    if isinstance(payload, dict):
+        payload = payload.get("rows", payload.get("patients"))
+    if not isinstance(payload, list):
+        raise BatchFormatError("Expected a JSON array of patient rows")
+
+    X = np.full((len(payload), len(FEATURE_COLUMNS)), np.nan)
+    names = [None] * len(payload)
+    for i, item in enumerate(payload):
+        if isinstance(item, dict):
+            for key, value in item.items():
+                column = _canonical(key)
+                if column:
+                    X[i, FEATURE_COLUMNS.index(column)] = _to_float(value)
+                elif str(key).lower() == "name":
+                    names[i] = str(value).strip() if value is not None else None
+        elif isinstance(item, (list, tuple)) and len(item) == len(FEATURE_COLUMNS):
+            X[i] = [_to_float(v) for v in item]
+        else:
+            raise BatchFormatError(f"Row {i}: expected an object or an array of {len(FEATURE_COLUMNS)} values")
+    return X, names
+
+
+def rows_from_csv(text):
+    """Turn a CSV body with a header row into (matrix, names)"""
+    reader = csv.reader(io.StringIO(text))
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise BatchFormatError("CSV body is empty")
+
+    positions = {}
+    name_position = None
+    for pos, key in enumerate(header):
+        column = _canonical(key)
+        if column:
+            positions[column] = pos
+        elif key.strip().lower() == "name":
+            name_position = pos
+
+    missing = [c for c in FEATURE_COLUMNS if c not in positions]
+    if missing:
+        raise BatchFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+
+    records = [r for r in reader if r]
+    X = np.full((len(records), len(FEATURE_COLUMNS)), np.nan)
+    names = [None] * len(records)
+    for i, record in enumerate(records):
+        for j, column in enumerate(FEATURE_COLUMNS):
+            pos = positions[column]
+            X[i, j] = _to_float(record[pos]) if pos < len(record) else np.nan
+        if name_position is not None and name_position < len(record):
+            names[i] = record[name_position].strip() or None
+    return X, names
+
+
+def canonicalize_features(features):
+    """Round a feature vector (FEATURE_COLUMNS order) to the form's precision"""
+    canonical = []
+    for column, value in zip(FEATURE_COLUMNS, features):
+        digits = FEATURE_PRECISION[column]
+        canonical.append(int(round(float(value))) if digits == 0 else round(float(value), digits))
+    return canonical
+
+
+def validate_feature_matrix(X):
+    """Validate every column of an (N, 8) matrix at once
+
+    Returns (valid_mask, errors) where errors[i] is the list of messages for row i.
+    """
+    n = X.shape[0]
+    invalid = np.zeros((n, len(MEDICAL_RANGES)), dtype=bool)
+    for k, (column, low, high, whole, _) in enumerate(MEDICAL_RANGES):
+        values = X[:, FEATURE_COLUMNS.index(column)]
+        with np.errstate(invalid="ignore"):
+            bad = ~np.isfinite(values) | (values < low) | (values > high)
+            if whole:
+                bad |= values != np.floor(values)
+        invalid[:, k] = bad
+
+    valid_mask = ~invalid.any(axis=1)
+    errors = [[] for _ in range(n)]
+    for i, k in zip(*np.nonzero(invalid)):
+        errors[i].append(MEDICAL_RANGES[k][4])
+    return valid_mask, errors
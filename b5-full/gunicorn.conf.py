@@ -0,0 +1,65 @@
+"""
+gunicorn configuration for production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+preload_app imports app.py (and loads the models) once in the master process
+before the workers are forked, so the model arrays are shared copy-on-write
+instead of being loaded again by every worker.  Models load on a background
+thread, so the master waits for that load to finish before the first fork.
+"""
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Prometheus counters are per process; with several workers they are written to
+# files in this directory and /metrics aggregates them. Must be set before the
+# app (and prometheus_client) is imported.
+if workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    metrics_dir = os.path.join(tempfile.gettempdir(), "diabetes-app-metrics")
+    # Start every run with empty metric files (this runs once, before the app is loaded)
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+# Load the app, models included, before forking workers
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() == "true"
+
+
+def pre_fork(server, worker):
+    # Threads do not survive fork(): finish the background model load in the
+    # master so workers inherit the loaded models instead of loading their own
+    app_module = sys.modules.get("app")
+    if app_module is not None and getattr(app_module, "model_store", None) and app_module.model_store.loading:
+        app_module.model_store.wait(timeout=float(os.getenv("MODEL_WAIT_TIMEOUT", "30")))
+
+    # Move everything loaded so far out of the garbage collector's reach, so the
+    # collector running in a worker does not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Thread pools and CPU pinning are per process; worker.age numbers workers for "worker" pinning
+    import inference_threads
+    inference_threads.configure(int(os.getenv("INFERENCE_THREADS", "1")),
+                                os.getenv("INFERENCE_CPU_AFFINITY", ""), worker.age)
+
+
+def post_worker_init(worker):
+    # Create missing tables and columns before the worker serves requests
+    import app
+    app.init_db()
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (counters and histograms are kept)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,170 @@
+"""
+Vectorized ensemble inference for the Diabetes Health App.
+
+The three models (Logistic Regression, Random Forest, XGBoost) are always
+scored together, so the engine takes a whole (N, 8) feature matrix, scales
+it once and runs each model exactly once through ``predict_proba``.  Class
+labels are derived from the probabilities instead of a second ``predict``
+call per model.
+"""
+
+import time
+
+import numpy as np
+
+from compiled_models import CompiledTreeEnsemble, FusedLogisticRegression
+from metrics import SCALER_SECONDS, model_timer
+
+# Column order expected by the scaler and all three models (PIMA dataset)
+FEATURE_COLUMNS = ["pregnancies", "glucose", "bp", "skin", "insulin", "bmi", "dpf", "age"]
+
+MODEL_NAMES = ["lr", "rf", "xgb"]
+
+MODEL_LABELS = {
+    "lr": "Logistic Regression",
+    "rf": "Random Forest",
+    "xgb": "XGBoost",
+}
+
+
+def result_label(prediction):
+    """Human readable label for a 0/1 class"""
+    return "Diabetic" if prediction == 1 else "Not Diabetic"
+
+
+def agreement_key_for(positive_votes):
+    """Translation key describing how many models agree (0-3 positive votes)"""
+    return "agree_all" if positive_votes in (0, 3) else "agree_majority"
+
+
+def agreement_text_for(positive_votes):
+    """English agreement summary used in PDF reports and emails"""
+    return "All Models Agree (100%)" if positive_votes in (0, 3) else "Majority Consensus (67%)"
+
+
+# patients columns that store each model's output, in prediction_values() order
+PREDICTION_COLUMNS = ([f"{name}_prediction" for name in MODEL_NAMES]
+                      + [f"{name}_probability" for name in MODEL_NAMES]
+                      + ["agreement"])
+
+
+def prediction_values(row):
+    """Values for PREDICTION_COLUMNS from an EnsembleResult.row() dict"""
+    return (*row['votes'], *row['probabilities'], row['agreement'])
+
+
+def stored_prediction(values):
+    """Rebuild votes, probabilities and agreement from stored PREDICTION_COLUMNS values
+
+    Returns None for rows saved before the per-model outputs were stored.
+    """
+    if values is None or len(values) != len(PREDICTION_COLUMNS) or any(v is None for v in values):
+        return None
+    n = len(MODEL_NAMES)
+    agreement = int(values[2 * n])
+    return {
+        'votes': [int(v) for v in values[:n]],
+        'probabilities': [float(p) for p in values[n:2 * n]],
+        'agreement': agreement,
+        'agreement_key': agreement_key_for(agreement),
+        'agreement_text': agreement_text_for(agreement),
+    }
+
+
+class EnsembleResult:
+    """Per-row outputs of one ensemble pass
+
+    votes          (N, 3) int array of per-model classes, columns in MODEL_NAMES order
+    probabilities  (N, 3) float array of per-model P(diabetic) in percent
+    agreement      (N,)   number of models voting diabetic (0-3)
+    classes        (N,)   majority-vote ensemble class
+    model_version  version of the models that produced the outputs (None if unversioned)
+    """
+
+    def __init__(self, votes, probabilities, model_version=None):
+        self.model_version = model_version
+        self.votes = votes
+        self.probabilities = probabilities
+        self.agreement = votes.sum(axis=1)
+        self.classes = (self.agreement >= 2).astype(int)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def row(self, i):
+        """Return the outputs for one row in the shape the routes and templates use"""
+        model_predictions = {
+            name: {
+                'prediction': result_label(self.votes[i, j]),
+                'confidence': round(float(self.probabilities[i, j]), 1),
+            }
+            for j, name in enumerate(MODEL_NAMES)
+        }
+        agreement = int(self.agreement[i])
+        return {
+            'prediction': int(self.classes[i]),
+            'result': result_label(self.classes[i]),
+            'votes': [int(v) for v in self.votes[i]],
+            'probabilities': [float(p) for p in self.probabilities[i]],
+            'agreement': agreement,
+            'agreement_key': agreement_key_for(agreement),
+            'agreement_text': agreement_text_for(agreement),
+            'model_predictions': model_predictions,
+            'model_version': self.model_version,
+        }
+
+
+class EnsembleEngine:
+    """Scores feature matrices with the scaler and the three loaded models
+
+    With compile_lr the Logistic Regression leg runs as a fused NumPy kernel on
+    raw features, and with compile_trees pickled Random Forest / XGBoost models
+    are flattened into CompiledTreeEnsembles (see compiled_models.py).  Any
+    model exposing ``accepts_raw_features = True`` skips the scaler.
+    """
+
+    def __init__(self, scaler, model_lr, model_rf, model_xgb, compile_lr=True, compile_trees=True, version=None):
+        if compile_lr and not getattr(model_lr, "accepts_raw_features", False):
+            model_lr = FusedLogisticRegression.from_sklearn(scaler, model_lr)
+        if compile_trees and not getattr(model_rf, "accepts_raw_features", False):
+            model_rf = CompiledTreeEnsemble.from_sklearn_forest(scaler, model_rf)
+        if compile_trees and not getattr(model_xgb, "accepts_raw_features", False):
+            model_xgb = CompiledTreeEnsemble.from_xgboost(scaler, model_xgb)
+        self.scaler = scaler
+        self.models = [model_lr, model_rf, model_xgb]
+        self.version = version
+        self._timers = [model_timer(name) for name in MODEL_NAMES]
+
+    def predict(self, X):
+        """Score an (N, 8) matrix of raw features in a single pass per model"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features, got {X.shape[1]}")
+
+        X_scaled = None
+        n = X.shape[0]
+        votes = np.empty((n, len(self.models)), dtype=int)
+        probabilities = np.empty((n, len(self.models)), dtype=np.float64)
+        for j, model in enumerate(self.models):
+            if getattr(model, "accepts_raw_features", False):
+                started = time.perf_counter()
+                proba = model.predict_proba(X)
+            else:
+                if X_scaled is None:
+                    started = time.perf_counter()
+                    X_scaled = self.scaler.transform(X)
+                    SCALER_SECONDS.observe(time.perf_counter() - started)
+                started = time.perf_counter()
+                proba = model.predict_proba(X_scaled)
+            self._timers[j].observe(time.perf_counter() - started)
+            # Same decision rule as each estimator's own predict()
+            votes[:, j] = model.classes_[np.argmax(proba, axis=1)]
+            probabilities[:, j] = proba[:, 1] * 100
+
+        return EnsembleResult(votes, probabilities, self.version)
+
+    def predict_one(self, features):
+        """Convenience wrapper for a single feature vector"""
+        return self.predict([features]).row(0)
@@ -0,0 +1,91 @@
+"""
+Inference threading configuration.
+
+Every gunicorn worker already runs requests on several threads, so inference
+inside a request should not fan out again.  The pickled Random Forest keeps
+``n_jobs=-1`` from training, and OpenBLAS / OpenMP (used by scikit-learn and
+XGBoost) default to one thread per core; under concurrent load that
+oversubscribes the CPU.  This module caps those pools per worker process,
+resets the models' own thread settings at load time, and can pin workers to
+CPUs.
+
+    INFERENCE_THREADS=1          threads per model call (BLAS, OpenMP, n_jobs)
+    INFERENCE_CPU_AFFINITY=      "" (no pinning), a CPU list like "0-3,6",
+                                 or "worker" for one CPU per gunicorn worker
+"""
+
+import os
+
+# Read by OpenBLAS / MKL / OpenMP when they initialise; set before NumPy is imported
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                   "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"]
+
+
+def set_thread_env(n_threads):
+    """Export the thread-count variables unless the operator set them explicitly"""
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(n_threads))
+
+
+def limit_thread_pools(n_threads):
+    """Cap already-loaded BLAS/OpenMP pools at runtime; returns the pools found"""
+    from threadpoolctl import threadpool_info, threadpool_limits
+
+    threadpool_limits(limits=n_threads)
+    return [{"api": pool["internal_api"], "threads": pool["num_threads"]} for pool in threadpool_info()]
+
+
+def set_model_threads(model, n_jobs):
+    """Reset the thread setting a model was pickled with"""
+    if model is None:
+        return
+    params = model.get_params() if hasattr(model, "get_params") else {}
+    if "n_jobs" in params:
+        model.set_params(n_jobs=n_jobs)
+    if hasattr(model, "get_booster"):
+        # XGBoost predicts with the booster's nthread, not the wrapper's n_jobs
+        model.get_booster().set_param({"nthread": n_jobs})
+
+
+def parse_cpu_list(spec):
+    """Turn "0-3,6" into {0, 1, 2, 3, 6}"""
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            low, high = part.split("-", 1)
+            cpus.update(range(int(low), int(high) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def pin_cpus(spec, worker_index=None):
+    """Pin the current process according to INFERENCE_CPU_AFFINITY; returns the CPUs or None"""
+    if not spec or not hasattr(os, "sched_setaffinity"):
+        return None
+    available = sorted(os.sched_getaffinity(0))
+    if spec == "worker":
+        if worker_index is None:
+            return None
+        cpus = {available[worker_index % len(available)]}
+    else:
+        cpus = parse_cpu_list(spec) & set(available)
+        if not cpus:
+            return None
+    os.sched_setaffinity(0, cpus)
+    return sorted(cpus)
+
+
+def configure(n_threads, affinity="", worker_index=None):
+    """Apply the thread cap and CPU pinning to this process; returns the effective settings"""
+    set_thread_env(n_threads)
+    pools = limit_thread_pools(n_threads)
+    pin_cpus(affinity, worker_index)
+    return {
+        "threads": n_threads,
+        "pools": pools,
+        "cpu_affinity": sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None,
+    }
@@ -0,0 +1,147 @@
+"""
+Prometheus metrics for the Diabetes Health App, served at /metrics.
+
+Under gunicorn every worker keeps its own counters, so with more than one
+worker set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does this) before
+prometheus_client is imported: workers then write their values to shared
+files and /metrics aggregates all of them, whichever worker answers.
+
+Everything recorded on the request path is a histogram observation or a
+counter increment, a few microseconds each.
+
+SQL timings are labelled per logical query.  A statement names itself with a
+leading comment, which SQLite ignores:
+
+    /* query: doctor_dashboard_page */ SELECT ... FROM patients ...
+
+Unnamed statements fall back to their type and table ("select patients").
+Names are literals in the code and at most ``MAX_QUERY_LABELS`` label values
+are created; anything beyond that is recorded as "other".
+"""
+
+import os
+import re
+import sqlite3
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# Sub-millisecond buckets for model and query timings, up to seconds for routes
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = Histogram(
+    "diabetes_http_request_duration_seconds", "Time to produce a response, by route",
+    ["route", "method", "status"], buckets=REQUEST_BUCKETS)
+MODEL_SECONDS = Histogram(
+    "diabetes_model_inference_seconds", "Time spent in one model's predict_proba per ensemble call",
+    ["model"], buckets=FAST_BUCKETS)
+SCALER_SECONDS = Histogram(
+    "diabetes_scaler_seconds", "Time spent in StandardScaler.transform per ensemble call",
+    buckets=FAST_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    "diabetes_db_query_seconds", "Time spent executing SQLite statements, by query name (or type and table)",
+    ["query"], buckets=FAST_BUCKETS)
+PDF_SECONDS = Histogram(
+    "diabetes_pdf_generation_seconds", "Time to render a PDF report", buckets=REQUEST_BUCKETS)
+SMTP_SECONDS = Histogram(
+    "diabetes_smtp_send_seconds", "Time to deliver one email over SMTP", ["outcome"], buckets=REQUEST_BUCKETS)
+DB_CONNECTIONS = Counter(
+    "diabetes_db_connection_events_total",
+    "SQLite connection churn: opened, reused from the pool, released to it, closed", ["event"])
+PREDICTIONS = Counter(
+    "diabetes_predictions_total", "Predictions served, by ensemble result and stage",
+    ["result", "stage", "source"])
+
+
+def model_timer(name):
+    """Histogram child for one model, bound once so the hot path skips the label lookup"""
+    return MODEL_SECONDS.labels(model=name)
+
+
+MAX_QUERY_LABELS = 100
+
+_QUERY_NAME_PATTERN = re.compile(r"^\s*/\*\s*query:\s*([a-z][a-z0-9_]{0,63})\s*\*/", re.IGNORECASE)
+_QUERY_PATTERN = re.compile(
+    r"^\s*(?:(SELECT)\b.*?\bFROM\s+(\w+)|(INSERT)\s+(?:OR\s+\w+\s+)?INTO\s+(\w+)|(UPDATE)\s+(\w+)"
+    r"|(DELETE)\s+FROM\s+(\w+)|(\w+))",
+    re.IGNORECASE | re.DOTALL)
+_query_timers = {}
+_query_labels = set()
+
+
+def query_label(sql):
+    """The statement's "/* query: name */" name, else a label such as "select patients" """
+    match = _QUERY_NAME_PATTERN.match(sql)
+    if match:
+        return match.group(1).lower()
+    match = _QUERY_PATTERN.match(sql)
+    parts = [p for p in match.groups() if p] if match else ["other"]
+    return " ".join(parts).lower()
+
+
+def query_timer(sql):
+    """Histogram child for an SQL statement, cached by statement text"""
+    timer = _query_timers.get(sql)
+    if timer is None:
+        label = query_label(sql)
+        if label not in _query_labels:
+            if len(_query_labels) >= MAX_QUERY_LABELS:
+                label = "other"
+            else:
+                _query_labels.add(label)
+        timer = DB_QUERY_SECONDS.labels(query=label)
+        # SQL text is mostly constant; do not let ad-hoc statements grow the cache without bound
+        if len(_query_timers) < 1024:
+            _query_timers[sql] = timer
+    return timer
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_timer(sql).observe(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_timer(sql).observe(time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that times every execute/executemany"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def record_predictions(rows, source):
+    """Count predictions from dicts carrying "result" and "stage" """
+    counts = {}
+    for row in rows:
+        key = (row['result'], row['stage'])
+        counts[key] = counts.get(key, 0) + 1
+    for (result, stage), n in counts.items():
+        PREDICTIONS.labels(result=result, stage=stage, source=source).inc(n)
+
+
+def exposition():
+    """(body, content type) for a scrape, aggregated over workers in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,245 @@
+"""
+Versioned schema migrations for diabetes_app.db.
+
+Each migration runs once, in order, in its own ``BEGIN IMMEDIATE``
+transaction together with the ``schema_version`` row that records it, so an
+interrupted upgrade leaves the database at the previous version and the next
+start simply retries.  The write lock also serialises gunicorn workers that
+all call init_db() at startup: whichever gets the lock first applies a
+migration, the others see it recorded and skip it.
+
+Databases created before this runner existed have no ``schema_version``
+table; the first migrations use ``IF NOT EXISTS`` / column checks, so they
+adopt such a database in place without touching its data.
+
+    python migrations.py              # upgrade DATABASE_PATH to the latest version
+    python migrations.py --status     # show applied and pending migrations
+    python migrations.py --backup backup.db
+"""
+
+import argparse
+import os
+import sqlite3
+from collections import namedtuple
+
+from dashboard_stats import create_dashboard_stats
+from inference import MODEL_NAMES
+from patient_search import create_patient_search
+from user_stats import create_user_stats
+
+SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# steps: SQL strings or callables taking the connection
+Migration = namedtuple("Migration", ["version", "name", "steps"])
+
+
+def _add_prediction_columns(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(patients)")}
+    added_columns = [("model_version", "TEXT")]
+    added_columns += [(f"{name}_prediction", "INTEGER") for name in MODEL_NAMES]
+    added_columns += [(f"{name}_probability", "REAL") for name in MODEL_NAMES]
+    added_columns += [("agreement", "INTEGER")]
+    for column, definition in added_columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE patients ADD COLUMN {column} {definition}")
+
+
+MIGRATIONS = [
+    Migration(1, "base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            email TEXT UNIQUE,
+            password TEXT,
+            role TEXT,
+            is_verified INTEGER DEFAULT 0,
+            verification_token TEXT,
+            reset_token TEXT,
+            reset_expires DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT,
+            age INTEGER,
+            pregnancies INTEGER,
+            glucose REAL,
+            bp REAL,
+            skin REAL,
+            insulin REAL,
+            bmi REAL,
+            dpf REAL,
+            result TEXT,
+            stage TEXT,
+            suggestion TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS admin_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_user TEXT,
+            action TEXT,
+            target_user TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    Migration(2, "stored model outputs", [_add_prediction_columns]),
+    # username and email are UNIQUE, so SQLite already indexes them (login's OR uses both)
+    Migration(3, "lookup and sort indexes", [
+        # history(): WHERE user_id=? ORDER BY created_at DESC, per-user stats, deleting a user's rows
+        "CREATE INDEX IF NOT EXISTS idx_patients_user_created ON patients(user_id, created_at)",
+        # Token lookups; tokens are NULL for most users, so the partial indexes stay small
+        "CREATE INDEX IF NOT EXISTS idx_users_verification_token ON users(verification_token) "
+        "WHERE verification_token IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_users_reset_token ON users(reset_token) WHERE reset_token IS NOT NULL",
+        # admin_dashboard: recent users and recent admin actions
+        "CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_admin_logs_timestamp ON admin_logs(timestamp)",
+    ]),
+    # Counts and sums kept current by triggers, filled from the existing rows
+    Migration(4, "dashboard stats", [create_dashboard_stats]),
+    # Per-user history statistics, same approach
+    Migration(5, "user stats", [create_user_stats]),
+    # Skipped without FTS5; search then keeps using LIKE
+    Migration(6, "patient search index", [create_patient_search]),
+    # Progress and checkpoints of background rescoring (rescoring.py); older databases may
+    # already have these two tables from when they were created at runtime
+    Migration(7, "rescoring jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS rescoring_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_version TEXT,
+            status TEXT,
+            last_id INTEGER DEFAULT 0,
+            max_id INTEGER,
+            rows_total INTEGER,
+            rows_done INTEGER DEFAULT 0,
+            active_seconds REAL DEFAULT 0,
+            heartbeat REAL,
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME,
+            error TEXT
+        )
+        """,
+    ]),
+    # One summary row per batch scored by the shadow candidate (shadow.py)
+    Migration(8, "shadow results", [
+        """
+        CREATE TABLE IF NOT EXISTS shadow_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            primary_version TEXT,
+            candidate_version TEXT,
+            rows INTEGER,
+            disagreements INTEGER,
+            lr_disagreements INTEGER,
+            rf_disagreements INTEGER,
+            xgb_disagreements INTEGER,
+            probability_delta REAL,
+            primary_seconds REAL,
+            candidate_seconds REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # Active-model timings now come from the sampled requests, which may be cache hits;
+    # older rows timed the whole batch
+    Migration(9, "shadow primary rows", [
+        "ALTER TABLE shadow_results ADD COLUMN primary_rows INTEGER",
+        "UPDATE shadow_results SET primary_rows = rows WHERE primary_seconds IS NOT NULL",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn):
+    conn.execute(SCHEMA_VERSION_SQL)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def applied_migrations(conn):
+    conn.execute(SCHEMA_VERSION_SQL)
+    return conn.execute("SELECT version, name, applied_at FROM schema_version ORDER BY version").fetchall()
+
+
+def migrate(conn, migrations=MIGRATIONS, analyze=True):
+    """Apply pending migrations in order; returns the versions applied by this call"""
+    conn.execute(SCHEMA_VERSION_SQL)
+    conn.commit()
+    applied = []
+    for migration in migrations:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked under the write lock: another worker may have just applied it
+            done = conn.execute("SELECT 1 FROM schema_version WHERE version=?", (migration.version,)).fetchone()
+            if not done:
+                for step in migration.steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                             (migration.version, migration.name))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not done:
+            applied.append(migration.version)
+
+    newest = current_version(conn)
+    if newest > migrations[-1].version:
+        print(f"⚠️  Database schema version {newest} is newer than this code ({migrations[-1].version})")
+    if applied and analyze:
+        # Fresh statistics so the planner picks up the new indexes
+        conn.execute("ANALYZE")
+        conn.commit()
+    return applied
+
+
+def main():
+    from db import DEFAULT_DB_PATH, ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Upgrade the SQLite schema in place")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations only")
+    parser.add_argument("--backup", help="copy the database here (online backup) before migrating")
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.db, size=1, profile=os.getenv("DB_PRAGMA_PROFILE", "balanced"))
+    with pool.connection() as conn:
+        if args.status:
+            done = {row[0]: row for row in applied_migrations(conn)}
+            for migration in MIGRATIONS:
+                row = done.get(migration.version)
+                print(f"{migration.version:>3}  {migration.name:<28} {row[2] if row else 'pending'}")
+            return
+        if args.backup:
+            target = sqlite3.connect(args.backup)
+            conn.backup(target)
+            target.close()
+            print(f"✓ Backed up {args.db} to {args.backup}")
+        applied = migrate(conn)
+        version = current_version(conn)
+    pool.close_all()
+    if applied:
+        print(f"✓ Applied migrations {', '.join(map(str, applied))}; schema version {version}")
+    else:
+        print(f"✓ Schema is up to date (version {version})")
+
+
+if __name__ == "__main__":
+    main()
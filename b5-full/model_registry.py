@@ -0,0 +1,140 @@
+"""
+Versioned model registry.
+
+    model_registry/
+        CURRENT              name of the active version, replaced atomically
+        versions/
+            <version>/       scaler.pkl, diabetes_model_{lr,rf,xgb}.pkl,
+                             compiled/ bundle and metadata.json
+
+A version directory is never modified once published.  Rolling out a model
+means publishing a new version and pointing CURRENT at it; running workers
+notice the new pointer (see ModelStore) and swap to it without a restart.
+
+    python model_registry.py publish [--source-dir .] [--no-activate]
+    python model_registry.py activate <version>
+    python model_registry.py list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from compiled_models import SOURCE_ARTIFACTS, compile_artifacts, source_digests
+
+REGISTRY_DIR = "model_registry"
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus an atomic "current" pointer"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+
+    def exists(self):
+        return os.path.isdir(self.versions_dir)
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not self.exists():
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir)
+                      if os.path.exists(os.path.join(self.versions_dir, v, METADATA_FILE)))
+
+    def metadata(self, version):
+        with open(os.path.join(self.version_dir(version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def current_version(self):
+        """Active version name, or None when nothing has been activated"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def publish(self, source_dir=".", version=None, metadata=None, activate=True):
+        """Copy the pickled artifacts in source_dir into a new version and compile it"""
+        digests = source_digests(source_dir)
+        if version is None:
+            combined = hashlib.sha256("".join(digests[name] for name in SOURCE_ARTIFACTS).encode())
+            version = f"{time.strftime('%Y%m%d-%H%M%S')}-{combined.hexdigest()[:8]}"
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise ValueError(f"Model version {version} already exists")
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        # Build under a temporary name so a half-written version is never visible
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.versions_dir)
+        try:
+            for name in SOURCE_ARTIFACTS:
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(staging, name))
+            compile_artifacts(source_dir=staging)
+            info = {
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sources": digests,
+            }
+            info.update(metadata or {})
+            with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                json.dump(info, f, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point CURRENT at an existing version (atomic rename)"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        fd, tmp_path = tempfile.mkstemp(prefix=".current-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument("--registry", default=os.getenv("MODEL_REGISTRY_DIR", REGISTRY_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="publish the .pkl files in a directory as a new version")
+    publish.add_argument("--source-dir", default=".")
+    publish.add_argument("--version")
+    publish.add_argument("--no-activate", action="store_true")
+    activate = commands.add_parser("activate", help="make a published version current")
+    activate.add_argument("version")
+    commands.add_parser("list", help="list published versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "publish":
+        version = registry.publish(args.source_dir, version=args.version, activate=not args.no_activate)
+        print(f"✓ Published model version {version}" + ("" if args.no_activate else " (current)"))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✓ Model version {args.version} is now current")
+    else:
+        current = registry.current_version()
+        for version in registry.versions():
+            created = registry.metadata(version).get("created_at", "")
+            print(f"{'*' if version == current else ' '} {version}  {created}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Model loading for the Diabetes Health App.
+
+Models are no longer loaded while app.py is imported.  A ModelStore loads
+them on a background thread (or lazily on first use), runs a warm-up
+inference so the first real request does not pay for first-call allocation
+and page faults, and reports its state for the /readyz endpoint.
+
+With a version provider (the model registry's "current" pointer) the store
+also watches for new versions: a watcher thread polls the provider, loads and
+warms up the new version in the background, then swaps the engine reference
+in one assignment.  Requests already holding the old engine finish on it.
+"""
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from compiled_models import load_compiled_models
+from inference import EnsembleEngine
+from inference_threads import set_model_threads
+
+# Representative rows scored once after loading (normal, pre-diabetic, diabetic)
+WARMUP_ROWS = np.array([
+    [1, 95, 70, 20, 80, 22.0, 0.3, 25],
+    [2, 125, 75, 25, 100, 27.5, 0.5, 40],
+    [6, 165, 85, 35, 20, 34.0, 0.9, 55],
+], dtype=np.float64)
+
+
+def load_engine(use_compiled=True, mmap=True, directory=".", n_jobs=1):
+    """Build an EnsembleEngine from the compiled bundle, or from the pickles as a fallback
+
+    Pickled models have their thread setting reset to n_jobs (training uses n_jobs=-1).
+    """
+    compiled = load_compiled_models(source_dir=directory, mmap=mmap) if use_compiled else None
+    if compiled:
+        # Compiled bundle takes raw features, so neither the scaler nor the estimators are unpickled
+        engine = EnsembleEngine(None, compiled["lr"], compiled["rf"], compiled["xgb"])
+        source = f"compiled bundle, {'memory-mapped' if mmap else 'in memory'}"
+    else:
+        model_lr = joblib.load(os.path.join(directory, "diabetes_model_lr.pkl"))
+        model_rf = joblib.load(os.path.join(directory, "diabetes_model_rf.pkl"))
+        model_xgb = joblib.load(os.path.join(directory, "diabetes_model_xgb.pkl"))
+        scaler = joblib.load(os.path.join(directory, "scaler.pkl"))
+        for model in (model_lr, model_rf, model_xgb):
+            set_model_threads(model, n_jobs)
+        engine = EnsembleEngine(scaler, model_lr, model_rf, model_xgb,
+                                compile_lr=use_compiled, compile_trees=use_compiled)
+        source = "pickles, compiled in memory" if use_compiled else "pickles"
+    return engine, source
+
+
+class ModelStore:
+    """Owns the active EnsembleEngine, its loading state and version swaps"""
+
+    def __init__(self, loader, version_provider=None, poll_interval=0):
+        # loader(version) returns (engine, source description); version_provider()
+        # returns the version that should be active (None when unversioned)
+        self.loader = loader
+        self.version_provider = version_provider
+        self.poll_interval = poll_interval
+        self.engine = None
+        self.version = None
+        self.source = None
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.loaded_at = None
+        self.swaps = 0
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._watcher = None
+        self._watcher_pid = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and self.engine is not None
+
+    @property
+    def loading(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        """Load the models on a background thread"""
+        with self._lock:
+            if self.ready or self.loading:
+                return
+            self._ready.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+        self._ensure_watcher()
+
+    def load(self, version=None):
+        """Load, warm up and activate a model version in the calling thread
+
+        Returns True when the new engine is active.  On failure the previous
+        engine (if any) keeps serving.
+        """
+        self._pid = self._pid or os.getpid()
+        with self._load_lock:
+            if version is None and self.version_provider is not None:
+                version = self.version_provider()
+            started = time.perf_counter()
+            try:
+                engine, source = self.loader(version)
+                engine.version = version
+                loaded = time.perf_counter()
+                engine.predict(WARMUP_ROWS)
+                engine.predict(np.repeat(WARMUP_ROWS, 11, axis=0))
+                warmed = time.perf_counter()
+            except FileNotFoundError as e:
+                self._load_failed(version, f"Model file not found: {e.filename}",
+                                  f"Warning: ML model files not found ({e.filename}). Please run train_model.py first.")
+                return False
+            except Exception as e:
+                self._load_failed(version, f"Model loading failed: {e}", f"❌ Model loading failed: {e}")
+                return False
+
+            previous = self.version if self.engine is not None else None
+            # Single reference swap: in-flight requests keep the engine they already hold
+            self.engine = engine
+            self.version, self.source, self.error = version, source, None
+            self.load_seconds, self.warmup_seconds = loaded - started, warmed - loaded
+            self.loaded_at = time.time()
+            self._failed_version = None
+            self._ready.set()
+
+            timings = f"load {self.load_seconds * 1000:.0f} ms, warm-up {self.warmup_seconds * 1000:.0f} ms"
+            if previous is None:
+                print("✅ Multi-Model AI System Loaded:")
+                print("   • Logistic Regression")
+                print("   • Random Forest")
+                print("   • XGBoost")
+                print(f"   ({source}; {'version ' + version + '; ' if version else ''}{timings})")
+            else:
+                self.swaps += 1
+                print(f"🔄 Model version {previous} → {version} ({source}; {timings})")
+            return True
+
+    def _load_failed(self, version, error, message):
+        self.error = error
+        self._failed_version = version
+        if self.engine is not None:
+            message += f" Still serving model version {self.version}."
+        print(message)
+        self._ready.set()
+
+    def check_for_update(self):
+        """Load the provider's version if it differs from the active one"""
+        if self.version_provider is None:
+            return False
+        target = self.version_provider()
+        if target is None or target == self.version or target == self._failed_version:
+            return False
+        return self.load(target)
+
+    def request_reload(self):
+        """Wake the watcher for an immediate check (also retries a version that failed to load)"""
+        self._failed_version = None
+        self._ensure_watcher()
+        self._wake.set()
+
+    def _ensure_watcher(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self.version_provider is None or self.poll_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._wake = threading.Event()
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self._ready.is_set():
+                continue
+            try:
+                self.check_for_update()
+            except Exception as e:
+                print(f"Model version check failed: {e}")
+
+    def get_engine(self, timeout=None):
+        """Return the engine, waiting up to timeout seconds for a load in progress
+
+        Starts loading on first use (lazy mode) and in forked workers whose
+        parent's loader thread did not survive the fork.  Returns None when
+        the models are unavailable.
+        """
+        if self._watcher_pid != os.getpid():
+            self._ensure_watcher()
+        if self.ready:
+            return self.engine
+        if self._pid != os.getpid():
+            self.start()
+        self._ready.wait(timeout)
+        return self.engine
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "loading": self.loading,
+            "version": self.version,
+            "source": self.source,
+            "error": self.error,
+            "load_ms": round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            "warmup_ms": round(self.warmup_seconds * 1000, 1) if self.warmup_seconds is not None else None,
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+        }
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination for the doctor dashboard and history pages.
+
+``LIMIT ? OFFSET ?`` makes SQLite step over every skipped row, so page 500
+of the dashboard costs 500 pages of work.  A keyset query instead continues
+from the sort key of the last row shown (``WHERE (created_at, id) < (?, ?)``)
+and reads one page straight from the index, however deep it is.
+
+The position travels in an opaque token (URL-safe base64 of a small JSON
+document) holding the direction, the key values of the edge row and the page
+number for display.  A token that does not decode, or whose key does not
+match the query (e.g. the search switched ordering between requests), is
+treated as "first page" rather than an error.
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+# rows: one page in display order; page: 1-based number for "Page x of y"
+Page = namedtuple("Page", ["rows", "next_token", "prev_token", "page"])
+
+
+def encode_token(direction, values, page):
+    payload = json.dumps({"d": direction, "k": list(values), "p": page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_token(token, n_keys):
+    """(direction, key values, page) or None for a missing, malformed or mismatched token"""
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        direction, values, page = payload["d"], payload["k"], int(payload["p"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+    if direction not in ("next", "prev") or not isinstance(values, list) or len(values) != n_keys:
+        return None
+    if not all(value is None or isinstance(value, (int, float, str)) for value in values):
+        return None
+    return direction, values, max(page, 1)
+
+
+def fetch_page(conn, sql, params, keys, key_of, limit, token=None, descending=True):
+    """One page of a keyset-paginated query
+
+    sql contains ``{after}`` (a condition, ANDed into its WHERE clause) and
+    ``{order}`` (its ORDER BY list) and ends with ``LIMIT ?``.  keys are the
+    SQL expressions of the sort key, which must be unique per row (end with
+    the id); key_of(row) returns their values for a fetched row.  With
+    descending=True the pages run from the highest key down.
+    """
+    cursor = decode_token(token, len(keys))
+    direction, values, page = cursor if cursor else ("next", None, 1)
+    # Walking backwards reads the rows before the token in reverse order, then flips them
+    forward = direction == "next"
+    ascending = forward != descending
+    order = ", ".join(f"{key} {'ASC' if ascending else 'DESC'}" for key in keys)
+    if values is None:
+        after, key_params = "1", []
+    else:
+        placeholders = ", ".join("?" for _ in keys)
+        after, key_params = f"({', '.join(keys)}) {'>' if ascending else '<'} ({placeholders})", values
+
+    rows = conn.execute(sql.format(after=after, order=order), [*params, *key_params, limit + 1]).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return Page(rows, None, None, page)
+
+    has_next = more if forward else True
+    has_prev = (values is not None) if forward else more
+    return Page(
+        rows,
+        encode_token("next", key_of(rows[-1]), page + 1) if has_next else None,
+        encode_token("prev", key_of(rows[0]), max(page - 1, 1)) if has_prev else None,
+        page,
+    )
@@ -0,0 +1,379 @@
+"""
+Streaming patient exports for doctors.
+
+The export used to ``fetchall()`` the whole patients JOIN users result and
+build the CSV in one string, so peak memory grew with the table (several
+times its size).  Here the query is read with ``fetchmany`` in chunks of
+``CHUNK_ROWS`` rows, and each chunk is encoded and handed to the response
+before the next one is read.  Memory stays flat however many rows match.
+
+    /doctor/export-csv?from=2024-01-01&to=2024-06-30    created_at range, both ends inclusive
+                      &stage=Normal&stage=Pre-Diabetic  one or more stages (or stage=a,b)
+                      &columns=id,name,glucose,stage    subset and order of EXPORT_COLUMNS
+                      &gzip=1                           gzip-compressed .csv.gz download
+
+The whole export is one read transaction, so it is a consistent snapshot.
+Under WAL it does not block writers.
+
+For analysts there is a typed, columnar variant: /doctor/export-parquet
+(same from/to/stage filters, plus since_id) and ``python patient_export.py``
+write Parquet through pyarrow.  Each fetchmany chunk of ``ROW_GROUP_ROWS``
+rows becomes one zstd-compressed row group and is sent or written before the
+next is read, so memory is bounded by one row group.  The file has the eight
+model features, result, stage, model version and created_at as a UTC
+timestamp, keyed by patient and user id; names and usernames are left out.
+
+Incremental runs export only patients added since the previous run.  The
+upper bound is MAX(id) read when the export starts; the route returns it in
+``X-Export-Last-Id`` and the CLI keeps it in a state file.  Rows changed in
+place (e.g. rescored) after they were exported are not picked up again.
+
+    python patient_export.py --since-last                 # new patients since the last run
+    python patient_export.py --from 2024-01-01 --stage Normal -o normal.parquet
+    python patient_export.py --format csv --gzip -o patients.csv.gz
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+CHUNK_ROWS = 1000
+GZIP_LEVEL = 6
+ROW_GROUP_ROWS = 50_000
+PARQUET_COMPRESSION = "zstd"
+
+ExportColumn = namedtuple("ExportColumn", ["sql", "header"])
+
+# Key -> SQL expression and CSV header; the order is the default column order
+EXPORT_COLUMNS = {
+    "id": ExportColumn("p.id", "ID"),
+    "username": ExportColumn("u.username", "Username"),
+    "name": ExportColumn("p.name", "Patient Name"),
+    "age": ExportColumn("p.age", "Age"),
+    "pregnancies": ExportColumn("p.pregnancies", "Pregnancies"),
+    "glucose": ExportColumn("p.glucose", "Glucose"),
+    "bp": ExportColumn("p.bp", "Blood Pressure"),
+    "skin": ExportColumn("p.skin", "Skin Thickness"),
+    "insulin": ExportColumn("p.insulin", "Insulin"),
+    "bmi": ExportColumn("p.bmi", "BMI"),
+    "dpf": ExportColumn("p.dpf", "DPF"),
+    "result": ExportColumn("p.result", "Result"),
+    "stage": ExportColumn("p.stage", "Stage"),
+    "created_at": ExportColumn("p.created_at", "Date"),
+}
+
+# Parquet columns: name, SQL expression (cast so a stray value cannot break the column type), Arrow type
+COLUMNAR_COLUMNS = [
+    ("id", "p.id", "int64"),
+    ("user_id", "p.user_id", "int64"),
+    ("pregnancies", "CAST(p.pregnancies AS INTEGER)", "int32"),
+    ("glucose", "CAST(p.glucose AS REAL)", "float64"),
+    ("bp", "CAST(p.bp AS REAL)", "float64"),
+    ("skin", "CAST(p.skin AS REAL)", "float64"),
+    ("insulin", "CAST(p.insulin AS REAL)", "float64"),
+    ("bmi", "CAST(p.bmi AS REAL)", "float64"),
+    ("dpf", "CAST(p.dpf AS REAL)", "float64"),
+    ("age", "CAST(p.age AS INTEGER)", "int32"),
+    ("result", "p.result", "string"),
+    ("stage", "p.stage", "string"),
+    ("model_version", "p.model_version", "string"),
+    # CURRENT_TIMESTAMP text, which SQLite writes in UTC
+    ("created_at", "p.created_at", "timestamp"),
+]
+
+ExportOptions = namedtuple("ExportOptions", ["columns", "stages", "date_from", "date_to", "gzip"])
+
+
+class ExportError(ValueError):
+    """Invalid export parameters"""
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ExportError(f"{name} must be a date like 2024-01-31, got {value!r}") from None
+
+
+def parse_options(args):
+    """ExportOptions from request.args (a MultiDict) or any mapping with get/getlist"""
+    getlist = args.getlist if hasattr(args, "getlist") else lambda key: [args[key]] if key in args else []
+
+    columns = [c.strip() for value in getlist("columns") for c in value.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ExportError(f"Unknown columns: {', '.join(unknown)}; choose from {', '.join(EXPORT_COLUMNS)}")
+    stages = [s.strip() for value in getlist("stage") for s in value.split(",") if s.strip()]
+
+    date_from = _parse_date(args.get("from"), "from") if args.get("from") else None
+    date_to = _parse_date(args.get("to"), "to") if args.get("to") else None
+    if date_from and date_to and date_from > date_to:
+        raise ExportError("from must not be after to")
+
+    return ExportOptions(columns or list(EXPORT_COLUMNS), stages, date_from, date_to,
+                         args.get("gzip", "").lower() in ("1", "true", "yes"))
+
+
+def _conditions(options, since_id=None, until_id=None):
+    conditions, params = [], []
+    if options.stages:
+        conditions.append(f"p.stage IN ({', '.join('?' for _ in options.stages)})")
+        params += options.stages
+    # created_at is 'YYYY-MM-DD HH:MM:SS' text, so date bounds compare as strings
+    if options.date_from:
+        conditions.append("p.created_at >= ?")
+        params.append(options.date_from.isoformat())
+    if options.date_to:
+        conditions.append("p.created_at < ?")
+        params.append((options.date_to + timedelta(days=1)).isoformat())
+    if since_id is not None:
+        conditions.append("p.id > ?")
+        params.append(since_id)
+    if until_id is not None:
+        conditions.append("p.id <= ?")
+        params.append(until_id)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def build_query(options, order_by="p.id ASC"):
+    """(sql, params) selecting the chosen columns of the matching patients"""
+    where, params = _conditions(options)
+    sql = (f"/* query: export_csv */ SELECT {', '.join(EXPORT_COLUMNS[c].sql for c in options.columns)} "
+           "FROM patients p JOIN users u ON p.user_id = u.id")
+    return sql + where + f" ORDER BY {order_by}", params
+
+
+def iter_chunks(cursor, size=CHUNK_ROWS):
+    """Rows of an executed cursor, size at a time"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def _date_only(value):
+    # Date without the time, shorter and Excel-friendly
+    if value is None:
+        return value
+    value = str(value)
+    return value.split(" ")[0] if " " in value else value
+
+
+def csv_stream(chunks, columns):
+    """Encoded CSV: the header, then one bytes block per chunk of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([EXPORT_COLUMNS[c].header for c in columns])
+    date_index = columns.index("created_at") if "created_at" in columns else None
+    for rows in chunks:
+        if date_index is not None:
+            rows = ([*row[:date_index], _date_only(row[date_index]), *row[date_index + 1:]] for row in rows)
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(blocks, level=GZIP_LEVEL):
+    """gzip-compress a stream of bytes blocks without holding it all"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_csv(conn, options, chunk_size=CHUNK_ROWS):
+    """Stream the export as bytes blocks; the query runs before the first block is requested"""
+    sql, params = build_query(options)
+    cursor = conn.execute(sql, params)
+    blocks = csv_stream(iter_chunks(cursor, chunk_size), options.columns)
+    return gzip_stream(blocks) if options.gzip else blocks
+
+
+def columnar_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def columnar_schema():
+    import pyarrow as pa
+
+    types = {"int64": pa.int64(), "int32": pa.int32(), "float64": pa.float64(), "string": pa.string(),
+             "timestamp": pa.timestamp("ms", tz="UTC")}
+    return pa.schema([pa.field(name, types[kind], nullable=name != "id") for name, _, kind in COLUMNAR_COLUMNS])
+
+
+def _to_table(rows, schema):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_timestamp(field.type):
+            # Unparseable text becomes null rather than failing the export
+            text = pa.array(values, pa.string())
+            arrays.append(pc.strptime(text, format="%Y-%m-%d %H:%M:%S", unit="s", error_is_null=True)
+                          .cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class _BlockSink:
+    """Write-only file object for pyarrow whose bytes are handed on after every row group"""
+
+    closed = False
+
+    def __init__(self):
+        self._blocks = []
+        self._position = 0
+
+    def write(self, data):
+        self._blocks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self):
+        block, self._blocks = b"".join(self._blocks), []
+        return block
+
+
+def parquet_stream(cursor, row_group_rows=ROW_GROUP_ROWS, compression=PARQUET_COMPRESSION):
+    """Parquet file bytes: one block per row group, the footer last"""
+    import pyarrow.parquet as pq
+
+    schema = columnar_schema()
+    sink = _BlockSink()
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for rows in iter_chunks(cursor, row_group_rows):
+            writer.write_table(_to_table(rows, schema), row_group_size=len(rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_parquet(conn, options, since_id=None, row_group_rows=ROW_GROUP_ROWS):
+    """(Parquet bytes blocks, last id covered) for patients after since_id
+
+    The id bound is fixed before the rows are read, so a patient inserted
+    during the export is left for the next incremental run, not lost.
+    """
+    until_id = conn.execute("/* query: export_last_id */ SELECT MAX(id) FROM patients").fetchone()[0]
+    if until_id is None or (since_id is not None and until_id < since_id):
+        until_id = since_id or 0
+    where, params = _conditions(options, since_id, until_id)
+    sql = (f"/* query: export_parquet */ SELECT {', '.join(expression for _, expression, _ in COLUMNAR_COLUMNS)} "
+           f"FROM patients p{where} ORDER BY p.id")
+    return parquet_stream(conn.execute(sql, params), row_group_rows), until_id
+
+
+def load_state(path):
+    """Last exported patient id from an incremental export state file (None before the first run)"""
+    try:
+        with open(path) as f:
+            return json.load(f).get("last_id")
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path, last_id, output, rows):
+    # Written next to the target and renamed, so an interrupted run keeps the old state
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+        json.dump({"last_id": last_id, "output": output, "rows": rows,
+                   "exported_at": datetime.now().isoformat(timespec="seconds")}, f, indent=2)
+    os.replace(f.name, path)
+
+
+def write_blocks(blocks, path):
+    """Write a stream of blocks to path atomically; returns the byte count"""
+    directory = os.path.dirname(os.path.abspath(path))
+    size = 0
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False, suffix=".tmp") as f:
+        try:
+            for block in blocks:
+                f.write(block)
+                size += len(block)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+    return size
+
+
+def main():
+    from db import DEFAULT_DB_PATH, ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Export patients as Parquet (typed, columnar) or CSV")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("-o", "--output", help="output file (default patients_<timestamp>.parquet/.csv)")
+    parser.add_argument("--from", dest="date_from", help="first created_at date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last created_at date, YYYY-MM-DD")
+    parser.add_argument("--stage", action="append", default=[], help="only this stage (repeatable)")
+    parser.add_argument("--columns", help="CSV only: comma-separated subset of " + ", ".join(EXPORT_COLUMNS))
+    parser.add_argument("--gzip", action="store_true", help="CSV only: gzip the output")
+    parser.add_argument("--since-last", action="store_true", help="Parquet only: patients added since the last run")
+    parser.add_argument("--since-id", type=int, help="Parquet only: patients with a larger id")
+    parser.add_argument("--state", default="patient_export_state.json", help="state file for --since-last")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS)
+    args = parser.parse_args()
+
+    try:
+        options = parse_options({key: value for key, value in (
+            ("from", args.date_from), ("to", args.date_to), ("stage", ",".join(args.stage)),
+            ("columns", args.columns), ("gzip", "1" if args.gzip else "")) if value})
+    except ExportError as e:
+        parser.error(str(e))
+    if args.format == "csv" and (args.since_last or args.since_id is not None):
+        parser.error("incremental exports are Parquet only")
+    if args.format == "parquet" and not columnar_available():
+        raise SystemExit("❌ Parquet export needs pyarrow: pip install pyarrow")
+
+    suffix = ".csv.gz" if args.format == "csv" and args.gzip else "." + args.format
+    output = args.output or f"patients_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+    since_id = load_state(args.state) if args.since_last else args.since_id
+
+    pool = ConnectionPool(args.db, size=1, profile=os.getenv("DB_PRAGMA_PROFILE", "balanced"))
+    with pool.connection() as conn:
+        if args.format == "csv":
+            size = write_blocks(export_csv(conn, options), output)
+            print(f"✓ Wrote {output} ({size / 1e6:.1f} MB)")
+        else:
+            blocks, last_id = export_parquet(conn, options, since_id, args.row_group_rows)
+            size = write_blocks(blocks, output)
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(output).metadata
+            print(f"✓ Wrote {output}: {metadata.num_rows} rows in {metadata.num_row_groups} row groups, "
+                  f"{size / 1e6:.1f} MB, patient ids {since_id or 0} < id <= {last_id}")
+            if args.since_last:
+                save_state(args.state, last_id, output, metadata.num_rows)
+                print(f"✓ Next --since-last run starts after id {last_id} ({args.state})")
+    pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Full-text search for the doctor dashboard.
+
+``patient_search`` is an FTS5 table with one row per patient (rowid =
+patients.id) over the patient name, the owner's username, the result and the
+stage.  Triggers on ``patients`` and ``users`` keep it in sync on insert,
+update, delete and username changes.  A search matches every word of the
+query as a prefix ("jo dia" finds "John", "Diabetic") and results are ranked
+by bm25, with name and username hits weighted above result/stage hits.
+Broad searches with more than ``RANK_LIMIT`` matches are listed newest
+first, like the unfiltered dashboard, because scoring every match would cost
+more than the scan the index replaces.
+
+The old ``LIKE '%x%'`` search scanned and joined the whole table twice per
+page.  It remains the fallback: when the SQLite build has no FTS5 the
+migration skips the table, and queries fall back to LIKE whenever the table
+is missing or FTS5 rejects the query.  The fallback skips the match count
+unless asked for it, as that would be a second full scan.  Note that a LIKE
+search also matches text inside words, while the index only matches words by
+their beginning.
+
+If a database with the index is opened by a SQLite build without FTS5, the
+triggers make patient writes fail; ``python patient_search.py drop`` removes
+the index and triggers, ``python patient_search.py rebuild`` recreates them.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+
+from pagination import fetch_page
+
+PATIENT_SEARCH_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(
+        name, username, result, stage,
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+# Weights per column, in the order above; stored in the table so ORDER BY rank uses them
+RANK_SQL = "INSERT INTO patient_search (patient_search, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 1.0)')"
+
+# Only patients whose user exists are indexed, the same rows the dashboard's JOIN returns,
+# so a match count needs no join
+_INDEX_NEW = """
+        INSERT INTO patient_search (rowid, name, username, result, stage)
+        SELECT NEW.id, NEW.name, u.username, NEW.result, NEW.stage FROM users u WHERE u.id = NEW.user_id;
+"""
+
+TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patients BEGIN
+        {_INDEX_NEW}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patients BEGIN
+        DELETE FROM patient_search WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF id, name, user_id, result, stage ON patients
+    BEGIN
+        DELETE FROM patient_search WHERE rowid = OLD.id;
+        {_INDEX_NEW}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_username AFTER UPDATE OF username ON users BEGIN
+        UPDATE patient_search SET username = NEW.username
+        WHERE rowid IN (SELECT id FROM patients WHERE user_id = NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_user_insert AFTER INSERT ON users BEGIN
+        INSERT INTO patient_search (rowid, name, username, result, stage)
+        SELECT id, name, NEW.username, result, stage FROM patients WHERE user_id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_user_delete AFTER DELETE ON users BEGIN
+        DELETE FROM patient_search WHERE rowid IN (SELECT id FROM patients WHERE user_id = OLD.id);
+    END""",
+]
+
+INDEXED_ROWS_SQL = """
+    SELECT p.id, p.name, u.username, p.result, p.stage
+    FROM patients p JOIN users u ON p.user_id = u.id
+"""
+
+# The doctor dashboard's row shape
+PATIENT_COLUMNS = "p.id, u.username, p.name, p.age, p.glucose, p.bmi, p.bp, p.result, p.stage, p.suggestion"
+
+FTS_COUNT_SQL = "/* query: search_count */ SELECT COUNT(*) FROM patient_search WHERE patient_search MATCH ?"
+
+# Keyset pagination (pagination.py) fills in {after} and {order}
+
+# bm25 has to score every match before the first page can be returned
+FTS_RANKED_SQL = f"""
+    /* query: search_ranked */
+    SELECT {PATIENT_COLUMNS}, s.rank
+    FROM patient_search s
+    JOIN patients p ON p.id = s.rowid
+    JOIN users u ON p.user_id = u.id
+    WHERE patient_search MATCH ? AND {{after}}
+    ORDER BY {{order}}
+    LIMIT ?
+"""
+RANKED_KEYS = ("s.rank", "-s.rowid")
+
+# Newest first, read from the index in rowid order and stopped after one page
+FTS_NEWEST_SQL = f"""
+    /* query: search_newest */
+    SELECT {PATIENT_COLUMNS}
+    FROM patient_search s
+    JOIN patients p ON p.id = s.rowid
+    JOIN users u ON p.user_id = u.id
+    WHERE patient_search MATCH ? AND {{after}}
+    ORDER BY {{order}}
+    LIMIT ?
+"""
+
+# Above this many matches (e.g. a stage name) ranking costs more than the LIKE scan it
+# replaces and tells the doctor little, so results are listed newest first instead
+RANK_LIMIT = 1000
+
+LIKE_WHERE = "p.name LIKE ? OR u.username LIKE ? OR p.result LIKE ? OR p.stage LIKE ?"
+
+LIKE_COUNT_SQL = f"""
+    /* query: search_like_count */
+    SELECT COUNT(*) FROM patients p
+    JOIN users u ON p.user_id = u.id
+    WHERE {LIKE_WHERE}
+"""
+
+LIKE_ROWS_SQL = f"""
+    /* query: search_like */
+    SELECT {PATIENT_COLUMNS}
+    FROM patients p
+    JOIN users u ON p.user_id = u.id
+    WHERE ({LIKE_WHERE}) AND {{after}}
+    ORDER BY {{order}}
+    LIMIT ?
+"""
+
+TRIGGER_NAMES = [sql.split()[5] for sql in TRIGGERS_SQL]
+
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def index_exists(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='patient_search'").fetchone() is not None
+
+
+def create_patient_search(conn):
+    """Index, triggers and initial contents; used by the schema migration.  False without FTS5."""
+    if not fts5_available(conn):
+        print("⚠️  SQLite has no FTS5; patient search uses LIKE scans")
+        return False
+    conn.execute(PATIENT_SEARCH_SQL)
+    conn.execute(RANK_SQL)
+    for sql in TRIGGERS_SQL:
+        conn.execute(sql)
+    conn.execute("DELETE FROM patient_search")
+    conn.execute("INSERT INTO patient_search (rowid, name, username, result, stage) " + INDEXED_ROWS_SQL)
+    return True
+
+
+def drop_patient_search(conn):
+    for name in TRIGGER_NAMES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP TABLE IF EXISTS patient_search")
+
+
+def match_query(text):
+    """FTS5 query matching every word of text as a prefix, or None if nothing is searchable
+
+    Each word is quoted, so FTS5 operators and punctuation in user input are
+    taken literally rather than parsed as query syntax.
+    """
+    words = [word for word in text.split() if re.search(r"\w", word)]
+    if not words:
+        return None
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search_patients(conn, text, limit, token=None, exact_count=False):
+    """(total matches, Page of dashboard rows) for a search string
+
+    The index counts matches cheaply.  Without it the count is another full
+    LIKE scan, so it is only run when exact_count is set; total is None otherwise.
+    """
+    query = match_query(text)
+    if query is not None and index_exists(conn):
+        try:
+            total = conn.execute(FTS_COUNT_SQL, (query,)).fetchone()[0]
+            if total <= RANK_LIMIT:
+                page = fetch_page(conn, FTS_RANKED_SQL, [query], RANKED_KEYS,
+                                  lambda row: (row[-1], -row[0]), limit, token, descending=False)
+            else:
+                page = fetch_page(conn, FTS_NEWEST_SQL, [query], ("s.rowid",), lambda row: (row[0],), limit, token)
+            return total, page
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, using LIKE: {e}")
+    pattern = [f'%{text}%'] * 4
+    total = conn.execute(LIKE_COUNT_SQL, pattern).fetchone()[0] if exact_count else None
+    return total, fetch_page(conn, LIKE_ROWS_SQL, pattern, ("p.id",), lambda row: (row[0],), limit, token)
+
+
+def check(conn):
+    """Patient ids whose index row is missing, stale or orphaned"""
+    conn.execute("INSERT INTO patient_search (patient_search) VALUES ('integrity-check')")
+    indexed = "SELECT rowid, name, username, result, stage FROM patient_search"
+    differ = (f"SELECT id FROM ({INDEXED_ROWS_SQL} EXCEPT {indexed}) "
+              f"UNION SELECT rowid FROM ({indexed} EXCEPT {INDEXED_ROWS_SQL})")
+    return [row[0] for row in conn.execute(differ + " ORDER BY 1")]
+
+
+def rebuild(conn):
+    """Recreate the index and triggers from patients in one write transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        drop_patient_search(conn)
+        created = create_patient_search(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if created:
+        conn.execute("INSERT INTO patient_search (patient_search) VALUES ('optimize')")
+        conn.commit()
+    return created
+
+
+def main():
+    from db import DEFAULT_DB_PATH, ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Check, rebuild or drop the patient full-text index")
+    parser.add_argument("command", choices=["check", "rebuild", "drop"])
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", DEFAULT_DB_PATH))
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.db, size=1, profile=os.getenv("DB_PRAGMA_PROFILE", "balanced"))
+    status = 0
+    with pool.connection() as conn:
+        if args.command == "drop":
+            drop_patient_search(conn)
+            conn.commit()
+            print("✓ Dropped patient_search; the doctor search uses LIKE")
+        elif args.command == "rebuild":
+            if rebuild(conn):
+                print(f"✓ Rebuilt patient_search ({conn.execute('SELECT COUNT(*) FROM patient_search').fetchone()[0]} rows)")
+            else:
+                status = 1
+        elif not index_exists(conn):
+            print("❌ patient_search does not exist; run: python patient_search.py rebuild")
+            status = 1
+        else:
+            stale = check(conn)
+            if stale:
+                print(f"❌ {len(stale)} patients differ from the index (e.g. {stale[:10]}); "
+                      "run: python patient_search.py rebuild")
+                status = 1
+            else:
+                print("✓ patient_search matches patients")
+    pool.close_all()
+    if status:
+        raise SystemExit(status)
+
+
+if __name__ == "__main__":
+    main()
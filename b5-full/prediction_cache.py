@@ -0,0 +1,141 @@
+"""
+LRU/TTL cache for /predict results.
+
+Entries are keyed by the canonicalized 8-feature vector plus the version of
+the model that computed them, so a retrained model never serves a result
+computed by the previous one.  The fingerprint is re-checked (by file
+size and mtime) at most every ``check_interval`` seconds; when any artifact
+changes the whole cache is dropped.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ArtifactFingerprint:
+    """Content fingerprint of a set of model files, refreshed when they change on disk"""
+
+    def __init__(self, paths, check_interval=2.0):
+        self.paths = list(paths)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stat = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _stat_all(self):
+        stats = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stats.append((path, st.st_size, st.st_mtime_ns))
+            except OSError:
+                stats.append((path, None, None))
+        return tuple(stats)
+
+    def _digest(self):
+        digest = hashlib.sha256()
+        for path in self.paths:
+            digest.update(path.encode())
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                digest.update(b"missing")
+        return digest.hexdigest()[:12]
+
+    def version(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+        with self._lock:
+            stat = self._stat_all()
+            if stat != self._stat:
+                self._stat = stat
+                self._version = self._digest()
+            self._checked_at = now
+            return self._version
+
+
+class PredictionCache:
+    """Size-bounded LRU cache with per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, version_provider=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.version_provider = version_provider or (lambda: "")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _check_version(self):
+        # Called with the lock held
+        version = self.version_provider()
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get(self, features):
+        if not self.enabled:
+            return None
+        with self._lock:
+            key = (self._check_version(), tuple(features))
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl <= 0 or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, features, value, version):
+        """Store a result under the version of the model that computed it"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # Scored by a model that has since been swapped out: it would never be served
+            if version != self._check_version():
+                return
+            key = (version, tuple(features))
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_version": self._version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,231 @@
+"""
+Compact Random Forest variants under a latency or size budget.
+
+The trained forest (100 trees, depth 10) is the heaviest model in the
+ensemble.  This tool builds smaller variants of it through scikit-learn's
+public API only:
+
+    depth    the forest is refit on train_model.py's training split with a
+             lower max_depth; with the same random_state every tree keeps its
+             seed and bootstrap sample
+    trees    a subset of the fitted trees, chosen greedily on the training
+             split so the sub-forest agrees with the full forest as closely
+             as possible
+
+Each candidate is scored on the same held-out split train_model.py uses and
+timed through the compiled kernel the app serves with.  The most faithful
+candidate (highest training-split agreement with the full forest) that meets
+the budget is written out as a plain RandomForestClassifier, a drop-in
+replacement for diabetes_model_rf.pkl.  When it is written over the
+diabetes_model_rf.pkl of a model directory, that directory's compiled bundle
+is rebuilt so the app never serves the old forest from it.
+
+    python prune_rf.py --max-latency-ms 0.2
+    python prune_rf.py --max-size-kb 500 --publish
+    python prune_rf.py --trees 30 --depth 6 --output diabetes_model_rf.pkl
+"""
+
+import argparse
+import copy
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from compiled_models import SOURCE_ARTIFACTS, CompiledTreeEnsemble, compile_artifacts
+
+TREE_COUNTS = (5, 10, 20, 30, 50, 75, 100)
+DEPTHS = (3, 4, 5, 6, 8, 10)
+LATENCY_CALLS = 300
+
+
+def load_split(data_path="diabetes.csv", scaler=None):
+    """Scaled train/test split identical to train_model.py's, plus the raw held-out rows"""
+    df = pd.read_csv(data_path)
+    X = df.drop("Outcome", axis=1)
+    y = df["Outcome"].to_numpy()
+    X_scaled = scaler.transform(X)
+    X_train, X_test, y_train, y_test, _, raw_test = train_test_split(
+        X_scaled, y, X.to_numpy(dtype=np.float64), test_size=0.2, random_state=42)
+    return (X_train, X_test, y_train, y_test), raw_test
+
+
+def refit_depth(forest, X_train, y_train, max_depth):
+    """The forest refit with max_depth; all other parameters, random_state included, are kept"""
+    return clone(forest).set_params(max_depth=max_depth).fit(X_train, y_train)
+
+
+def prune_forest(forest, tree_indices):
+    """New RandomForestClassifier with only the chosen trees"""
+    pruned = copy.deepcopy(forest)
+    pruned.estimators_ = [pruned.estimators_[i] for i in tree_indices]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+def tree_probabilities(forest, X):
+    """(trees, rows) matrix of P(class 1) from each tree"""
+    return np.array([estimator.predict_proba(X)[:, 1] for estimator in forest.estimators_])
+
+
+def select_trees(probabilities, reference, n_trees):
+    """Greedy forward selection of n_trees whose mean probability best agrees with reference labels
+
+    Ties on agreement are broken by the smaller squared error to the reference
+    labels, so the chosen sub-forest also tracks the full forest's confidence.
+    """
+    chosen, total = [], np.zeros(probabilities.shape[1])
+    remaining = list(range(len(probabilities)))
+    for size in range(1, n_trees + 1):
+        candidates = (total + probabilities[remaining]) / size
+        agreement = ((candidates > 0.5) == reference).mean(axis=1)
+        error = ((candidates - reference) ** 2).mean(axis=1)
+        best = remaining[np.lexsort((error, -agreement))[0]]
+        chosen.append(best)
+        remaining.remove(best)
+        total += probabilities[best]
+    return chosen
+
+
+def artifact_size(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+def single_row_latency(compiled, rows, calls=LATENCY_CALLS):
+    """Median seconds per single-row call through the compiled kernel"""
+    timings = []
+    for i in range(calls):
+        row = rows[i % len(rows)]
+        started = time.perf_counter()
+        compiled.positive_proba(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def evaluate(model, scaler, split, raw_test, reference):
+    X_train, X_test, y_train, y_test = split
+    compiled = CompiledTreeEnsemble.from_sklearn_forest(scaler, model)
+    predictions = model.predict(X_test)
+    return {
+        "trees": len(model.estimators_),
+        "depth": max(e.get_depth() for e in model.estimators_),
+        "nodes": sum(e.tree_.node_count for e in model.estimators_),
+        "accuracy": float((predictions == y_test).mean()),
+        "agreement": float((predictions == reference["test"]).mean()),
+        "train_agreement": float((model.predict(X_train) == reference["train"]).mean()),
+        "latency_ms": single_row_latency(compiled, raw_test) * 1000,
+        "size_kb": artifact_size(model) / 1024,
+    }
+
+
+def candidates(forest, split, tree_counts=TREE_COUNTS, depths=DEPTHS):
+    """Yield (trees, depth, model) for every tree count x depth in the grid"""
+    X_train, _, y_train, _ = split
+    reference = forest.predict(X_train)
+    full_depth = max(e.get_depth() for e in forest.estimators_)
+    for depth in depths:
+        depth = min(depth, full_depth)
+        shallow = forest if depth == full_depth else refit_depth(forest, X_train, y_train, depth)
+        probabilities = tree_probabilities(shallow, X_train)
+        for n_trees in tree_counts:
+            n_trees = min(n_trees, len(shallow.estimators_))
+            indices = select_trees(probabilities, reference, n_trees)
+            yield n_trees, depth, prune_forest(shallow, indices)
+
+
+def fits_budget(result, max_latency_ms=None, max_size_kb=None):
+    return ((max_latency_ms is None or result["latency_ms"] <= max_latency_ms)
+            and (max_size_kb is None or result["size_kb"] <= max_size_kb))
+
+
+def print_row(label, result, full):
+    print(f"{label:<10} {result['trees']:>5} {result['depth']:>5} {result['nodes']:>7} "
+          f"{result['accuracy'] * 100:>7.2f} {(result['accuracy'] - full['accuracy']) * 100:>+7.2f} "
+          f"{result['agreement'] * 100:>7.2f} {result['latency_ms']:>8.3f} {result['size_kb']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compact Random Forest under a latency or size budget")
+    parser.add_argument("--model", default="diabetes_model_rf.pkl")
+    parser.add_argument("--scaler", default="scaler.pkl")
+    parser.add_argument("--data", default="diabetes.csv")
+    parser.add_argument("--max-latency-ms", type=float, help="single-row latency budget for the compiled forest")
+    parser.add_argument("--max-size-kb", type=float, help="size budget for the pickled forest")
+    parser.add_argument("--trees", type=int, help="build exactly this many trees instead of searching")
+    parser.add_argument("--depth", type=int, help="cut trees at this depth instead of searching")
+    parser.add_argument("--output", default="diabetes_model_rf.pruned.pkl")
+    parser.add_argument("--publish", action="store_true",
+                        help="also publish the pruned forest as a new model registry version")
+    parser.add_argument("--registry", default=os.getenv("MODEL_REGISTRY_DIR", "model_registry"))
+    args = parser.parse_args()
+    if not (args.max_latency_ms or args.max_size_kb or args.trees or args.depth):
+        parser.error("give a budget (--max-latency-ms, --max-size-kb) or --trees/--depth")
+
+    forest = joblib.load(args.model)
+    scaler = joblib.load(args.scaler)
+    split, raw_test = load_split(args.data, scaler)
+    reference = {"train": forest.predict(split[0]), "test": forest.predict(split[1])}
+    full = evaluate(forest, scaler, split, raw_test, reference)
+
+    print(f"{'':<10} {'trees':>5} {'depth':>5} {'nodes':>7} {'acc %':>7} {'Δ acc':>7} "
+          f"{'agree %':>7} {'p50 ms':>8} {'KB':>8}")
+    print_row("full", full, full)
+
+    tree_counts = (args.trees,) if args.trees else TREE_COUNTS
+    depths = (args.depth,) if args.depth else DEPTHS
+    best = None
+    for n_trees, depth, model in candidates(forest, split, tree_counts, depths):
+        result = evaluate(model, scaler, split, raw_test, reference)
+        ok = fits_budget(result, args.max_latency_ms, args.max_size_kb)
+        print_row("  ok" if ok else "", result, full)
+        # Most faithful to the full forest first, then the cheaper model
+        if ok and (best is None or (result["train_agreement"], -result["nodes"])
+                   > (best[0]["train_agreement"], -best[0]["nodes"])):
+            best = (result, model)
+
+    if best is None:
+        raise SystemExit("❌ No candidate meets the budget")
+    result, model = best
+    joblib.dump(model, args.output)
+    print(f"\n✓ {result['trees']} trees, depth {result['depth']}: accuracy "
+          f"{result['accuracy'] * 100:.2f}% ({(result['accuracy'] - full['accuracy']) * 100:+.2f} points), "
+          f"{result['agreement'] * 100:.2f}% agreement with the full forest on the held-out split, "
+          f"{result['latency_ms']:.3f} ms vs {full['latency_ms']:.3f} ms, "
+          f"{result['size_kb']:.0f} KB vs {full['size_kb']:.0f} KB")
+    print(f"✓ Saved {args.output}")
+
+    # A compiled bundle next to the replaced forest would keep serving the old one
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    if os.path.basename(args.output) == "diabetes_model_rf.pkl" and all(
+            os.path.exists(os.path.join(output_dir, name)) for name in SOURCE_ARTIFACTS):
+        directory, _ = compile_artifacts(source_dir=output_dir)
+        print(f"✓ Recompiled {directory}")
+
+    if args.publish:
+        from model_registry import ModelRegistry
+        source_dir = os.path.dirname(os.path.abspath(args.model))
+        with tempfile.TemporaryDirectory() as staging:
+            for name in SOURCE_ARTIFACTS:
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(staging, name))
+            shutil.copy2(args.output, os.path.join(staging, "diabetes_model_rf.pkl"))
+            version = ModelRegistry(args.registry).publish(staging, metadata={"rf_pruning": {
+                "trees": result["trees"],
+                "depth": result["depth"],
+                "accuracy": round(result["accuracy"], 4),
+                "accuracy_delta": round(result["accuracy"] - full["accuracy"], 4),
+                "agreement": round(result["agreement"], 4),
+            }})
+        print(f"✓ Published model version {version}")
+
+
+if __name__ == "__main__":
+    main()
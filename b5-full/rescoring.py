@@ -0,0 +1,255 @@
+"""
+Background rescoring of the patients table after a model upgrade.
+
+A job walks ``patients`` in id order, up to the highest id that existed when
+it started, in chunks of ``chunk_size`` rows.  Each chunk is scored with one
+ensemble call and written back with executemany in its own short
+transaction.  The checkpoint (last id done) is committed in that same
+transaction, so an interrupted job resumes exactly where it stopped.
+
+Job state lives in the ``rescoring_jobs`` table (created by migrations.py)
+rather than in memory, so any worker can report progress or pause a job
+started by another worker.  The job throttles itself with a duty cycle: after
+every write it sleeps long enough that it holds the SQLite write lock for at
+most ``duty_cycle`` of the time, leaving the rest for live /predict inserts.
+
+    python rescoring.py [--chunk-size 500] [--duty-cycle 0.25]
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS, PREDICTION_COLUMNS, prediction_values
+from staging import STAGE_RULES, stage_indices
+
+# A running job whose heartbeat is older than this is treated as crashed and can be resumed
+STALE_SECONDS = 60
+
+SELECT_CHUNK_SQL = (f"/* query: rescore_chunk */ SELECT id, {', '.join(FEATURE_COLUMNS)} FROM patients "
+                    "WHERE id > ? AND id <= ? AND (model_version IS NULL OR model_version != ?) "
+                    "ORDER BY id LIMIT ?")
+UPDATE_PATIENT_SQL = ("/* query: rescore_update */ UPDATE patients SET result=?, stage=?, suggestion=?, model_version=?, "
+                      f"{', '.join(c + '=?' for c in PREDICTION_COLUMNS)} WHERE id=?")
+
+
+def score_rows(engine, rows):
+    """UPDATE_PATIENT_SQL parameters for (id, *FEATURE_COLUMNS) rows, scored with one ensemble call"""
+    X = np.array([[np.nan if v is None else v for v in row[1:]] for row in rows], dtype=np.float64)
+    # Rows with missing features keep their old values
+    scorable = np.flatnonzero(np.isfinite(X).all(axis=1))
+    if not len(scorable):
+        return []
+    result = engine.predict(X[scorable])
+    stages = stage_indices(X[scorable, 1], X[scorable, 4], X[scorable, 5])
+    records = []
+    for k, i in enumerate(scorable):
+        row = result.row(k)
+        rule = STAGE_RULES[stages[k]]
+        records.append((row['result'], rule.stage, rule.suggestion, result.model_version,
+                        *prediction_values(row), rows[i][0]))
+    return records
+
+
+class RescoringBusy(RuntimeError):
+    """Raised when another rescoring job is already running"""
+
+    def __init__(self, progress):
+        super().__init__("A rescoring job is already running")
+        self.progress = progress
+
+
+class RescoringJob:
+    """Starts, runs, pauses and reports on rescoring jobs"""
+
+    def __init__(self, connect, engine_provider, chunk_size=500, duty_cycle=0.25, min_pause=0.01):
+        # connect() returns a new sqlite3 connection; engine_provider() the active EnsembleEngine
+        self.connect = connect
+        self.engine_provider = engine_provider
+        self.chunk_size = max(int(chunk_size), 1)
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self.min_pause = min_pause
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _open(self):
+        conn = self.connect()
+        if conn is None:
+            raise sqlite3.OperationalError("Database connection error")
+        return conn
+
+    def _latest(self, conn):
+        return conn.execute("""
+            SELECT id, model_version, status, last_id, max_id, rows_total, rows_done,
+                   active_seconds, heartbeat, started_at, finished_at, error
+            FROM rescoring_jobs ORDER BY id DESC LIMIT 1
+        """).fetchone()
+
+    def prepare(self):
+        """Create a job for the active model version, or pick up an unfinished one; returns its id"""
+        engine = self.engine_provider()
+        if engine is None:
+            raise RuntimeError("Prediction model not available")
+        version = engine.version
+
+        conn = self._open()
+        try:
+            # IMMEDIATE takes the write lock up front, so two workers cannot both start a job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._latest(conn)
+                if job is not None and job[2] == "running" and time.time() - (job[8] or 0) < STALE_SECONDS:
+                    raise RescoringBusy(self._progress_from_row(job))
+                if job is not None and job[2] in ("running", "paused", "failed") and job[1] == version:
+                    conn.execute("UPDATE rescoring_jobs SET status='running', heartbeat=?, error=NULL WHERE id=?",
+                                 (time.time(), job[0]))
+                    job_id = job[0]
+                else:
+                    if job is not None and job[2] in ("running", "paused", "failed"):
+                        conn.execute("UPDATE rescoring_jobs SET status='superseded' WHERE id=?", (job[0],))
+                    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM patients").fetchone()[0]
+                    rows_total = conn.execute(
+                        "SELECT COUNT(*) FROM patients WHERE id <= ? AND (model_version IS NULL OR model_version != ?)",
+                        (max_id, version)).fetchone()[0]
+                    cursor = conn.execute("""
+                        INSERT INTO rescoring_jobs (model_version, status, max_id, rows_total, heartbeat)
+                        VALUES (?, 'running', ?, ?, ?)
+                    """, (version, max_id, rows_total, time.time()))
+                    job_id = cursor.lastrowid
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return job_id
+
+    def start(self):
+        """Start (or resume) a job on a background thread; returns its progress"""
+        job_id = self.prepare()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(job_id,), name="rescoring-job", daemon=True)
+        self._thread.start()
+        return self.progress()
+
+    def stop(self):
+        """Pause the running job (from any worker); it can be resumed with start()"""
+        self._stop.set()
+        conn = self._open()
+        try:
+            with conn:
+                conn.execute("UPDATE rescoring_jobs SET status='paused' WHERE status='running'")
+        finally:
+            conn.close()
+        return self.progress()
+
+    def run(self, job_id):
+        """Process a prepared job in the calling thread until it completes, pauses or fails"""
+        conn = self._open()
+        try:
+            version, last_id, max_id = conn.execute(
+                "SELECT model_version, last_id, max_id FROM rescoring_jobs WHERE id=?", (job_id,)).fetchone()
+            checkpoint = time.perf_counter()
+            while True:
+                status = conn.execute("SELECT status FROM rescoring_jobs WHERE id=?", (job_id,)).fetchone()[0]
+                if status != "running" or self._stop.is_set():
+                    return
+                engine = self.engine_provider()
+                if engine is None or engine.version != version:
+                    # The model changed under us; a new job for the new version takes over
+                    with conn:
+                        conn.execute("UPDATE rescoring_jobs SET status='superseded' WHERE id=?", (job_id,))
+                    return
+
+                rows = conn.execute(SELECT_CHUNK_SQL, (last_id, max_id, version, self.chunk_size)).fetchall()
+                if not rows:
+                    with conn:
+                        conn.execute("""
+                            UPDATE rescoring_jobs SET status='completed', heartbeat=?, finished_at=CURRENT_TIMESTAMP
+                            WHERE id=?
+                        """, (time.time(), job_id))
+                    return
+
+                records = score_rows(engine, rows)
+                write_started = time.perf_counter()
+                with conn:
+                    conn.executemany(UPDATE_PATIENT_SQL, records)
+                    now = time.perf_counter()
+                    conn.execute("""
+                        UPDATE rescoring_jobs
+                        SET last_id=?, rows_done=rows_done+?, active_seconds=active_seconds+?, heartbeat=?
+                        WHERE id=?
+                    """, (rows[-1][0], len(rows), now - checkpoint, time.time(), job_id))
+                write_seconds = time.perf_counter() - write_started
+                checkpoint = now
+                last_id = rows[-1][0]
+
+                # Hold the write lock for at most duty_cycle of the wall time
+                pause = write_seconds * (1 - self.duty_cycle) / self.duty_cycle
+                self._stop.wait(max(pause, self.min_pause))
+        except Exception as e:
+            print(f"Rescoring job {job_id} failed: {e}")
+            with conn:
+                conn.execute("UPDATE rescoring_jobs SET status='failed', error=? WHERE id=?", (str(e), job_id))
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _progress_from_row(job):
+        (job_id, version, status, last_id, max_id, rows_total, rows_done,
+         active_seconds, heartbeat, started_at, finished_at, error) = job
+        rate = rows_done / active_seconds if active_seconds else 0
+        remaining = max(rows_total - rows_done, 0)
+        return {
+            "job_id": job_id,
+            "model_version": version,
+            "status": status,
+            "rows_total": rows_total,
+            "rows_done": rows_done,
+            "percent": round(rows_done / rows_total * 100, 1) if rows_total else 100.0,
+            "last_id": last_id,
+            "max_id": max_id,
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": round(remaining / rate, 1) if rate and status == "running" else None,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "heartbeat_age_seconds": round(time.time() - heartbeat, 1) if heartbeat else None,
+            "error": error,
+        }
+
+    def progress(self):
+        """Progress and ETA of the most recent job, or None if no job was ever started"""
+        conn = self._open()
+        try:
+            job = self._latest(conn)
+        finally:
+            conn.close()
+        return self._progress_from_row(job) if job else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore all patients with the current model version")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--duty-cycle", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Load the models in this process before scoring starts
+    os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+    import app
+
+    app.init_db()
+    job = RescoringJob(app.get_db_connection, app.get_engine, args.chunk_size, args.duty_cycle)
+    job_id = job.prepare()
+    print(f"Rescoring job {job_id}: {job.progress()['rows_total']} rows")
+    job.run(job_id)
+    progress = job.progress()
+    print(f"✓ Job {job_id} {progress['status']}: {progress['rows_done']} rows "
+          f"at {progress['rows_per_second']} rows/s")
+
+
+if __name__ == "__main__":
+    main()
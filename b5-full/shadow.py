@@ -0,0 +1,229 @@
+"""
+Shadow evaluation of a candidate model version on live traffic.
+
+/predict hands a sampled fraction of its validated feature vectors, together
+with the outputs it actually served and the time it spent scoring them, to
+``ShadowEvaluator.submit``.  That call
+only does a ``put_nowait`` on a bounded in-memory queue: when the queue is
+full the sample is dropped and counted, so the request path never waits on
+the shadow worker.
+
+A background worker drains the queue in batches, scores each batch with the
+candidate engine only, and writes one summary row per batch to
+``shadow_results``: how many rows the candidate disagreed on, overall and per
+model, the candidate's time for the batch and the scoring time the sampled
+requests themselves reported for the active engine (cache hits report none).
+The active engine never runs twice for a sample.  The table is created by
+migrations.py.
+
+    SHADOW_MODEL_VERSION=<registry version>   candidate to shadow (unset disables shadowing)
+    SHADOW_SAMPLE_RATE=0.1                    fraction of /predict requests sampled
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from inference import MODEL_NAMES
+
+INSERT_RESULT_SQL = """
+    /* query: shadow_insert */
+    INSERT INTO shadow_results (primary_version, candidate_version, rows, disagreements,
+                                lr_disagreements, rf_disagreements, xgb_disagreements,
+                                probability_delta, primary_seconds, primary_rows, candidate_seconds)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SUMMARY_SQL = """
+    /* query: shadow_summary */
+    SELECT primary_version, candidate_version, SUM(rows), SUM(disagreements),
+           SUM(lr_disagreements), SUM(rf_disagreements), SUM(xgb_disagreements),
+           SUM(probability_delta), SUM(primary_seconds), SUM(primary_rows),
+           SUM(candidate_seconds), MIN(created_at), MAX(created_at)
+    FROM shadow_results
+    GROUP BY primary_version, candidate_version
+    ORDER BY MAX(id) DESC
+"""
+
+
+class ShadowEvaluator:
+    """Samples served predictions and compares them with a candidate model in the background"""
+
+    def __init__(self, connect, candidate_loader, candidate_version=None,
+                 sample_rate=0.1, queue_size=1000, batch_size=64, max_wait=1.0):
+        # connect() returns a new sqlite3 connection;
+        # candidate_loader(version) returns (engine, source) like ModelStore's loader
+        self.connect = connect
+        self.candidate_loader = candidate_loader
+        self.candidate_version = candidate_version
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.queue_size = max(int(queue_size), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.max_wait = max_wait
+        self._queue = queue.Queue(self.queue_size)
+        self._candidate = None
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        # Counters are updated from request threads and the worker
+        self._counters_lock = threading.Lock()
+        self.sampled = 0
+        self.dropped = 0
+        self.scored = 0
+        self.batches = 0
+        self.error = None
+        self.candidate_error = None
+
+    @property
+    def enabled(self):
+        return bool(self.candidate_version) and self.sample_rate > 0
+
+    def submit(self, features, served, seconds=None):
+        """Maybe queue one served prediction for shadow scoring; never blocks
+
+        served is the row dict /predict returned (votes, probabilities, model_version);
+        seconds is the time the request spent scoring it, None when it was not scored.
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((features, served['votes'], served['probabilities'],
+                                    served['model_version'], seconds))
+        except queue.Full:
+            with self._counters_lock:
+                self.dropped += 1
+            return False
+        with self._counters_lock:
+            self.sampled += 1
+        return True
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+                return
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue(self.queue_size)
+            self._worker = threading.Thread(target=self._run, name="shadow-evaluator", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = self._collect()
+            try:
+                if conn is None:
+                    conn = self.connect()
+                    if conn is None:
+                        raise RuntimeError("Database not available")
+                self.process(conn, batch)
+                self.error = None
+            except Exception as e:
+                # Shadowing is best effort: record the error and keep draining the queue
+                self.error = str(e)
+                if conn is not None:
+                    conn.close()
+                    conn = None
+
+    def candidate(self):
+        """Candidate engine, loaded on first use in the worker thread
+
+        A failed load is kept in candidate_error and retried with the next
+        batch; the batch itself is discarded, never scored by another model.
+        """
+        if self._candidate is None or self._candidate.version != self.candidate_version:
+            try:
+                engine, _ = self.candidate_loader(self.candidate_version)
+            except Exception as e:
+                self.candidate_error = f"{type(e).__name__}: {e}"
+                raise
+            engine.version = self.candidate_version
+            self._candidate = engine
+            self.candidate_error = None
+        return self._candidate
+
+    def process(self, conn, batch):
+        """Score one batch with the candidate and write its summary row"""
+        X = np.vstack([features for features, _, _, _, _ in batch])
+        served_votes = np.array([votes for _, votes, _, _, _ in batch], dtype=int)
+        served_probabilities = np.array([probabilities for _, _, probabilities, _, _ in batch], dtype=np.float64)
+        served_seconds = [seconds for _, _, _, _, seconds in batch if seconds is not None]
+
+        candidate = self.candidate()
+        started = time.perf_counter()
+        result = candidate.predict(X)
+        candidate_seconds = time.perf_counter() - started
+
+        served_classes = (served_votes.sum(axis=1) >= 2).astype(int)
+        model_disagreements = (result.votes != served_votes).sum(axis=0)
+        probability_delta = np.abs(result.probabilities.mean(axis=1) - served_probabilities.mean(axis=1)).sum()
+        primary_version = batch[-1][3]
+        with conn:
+            conn.execute(INSERT_RESULT_SQL, (
+                primary_version, self.candidate_version, len(batch),
+                int((result.classes != served_classes).sum()), *(int(n) for n in model_disagreements),
+                float(probability_delta), sum(served_seconds) if served_seconds else None,
+                len(served_seconds) or None, candidate_seconds))
+        with self._counters_lock:
+            self.scored += len(batch)
+            self.batches += 1
+
+    def summary(self, conn):
+        """Disagreement and latency per (active, candidate) version pair, newest first"""
+        pairs = []
+        for (primary_version, candidate_version, rows, disagreements, lr, rf, xgb, delta,
+             primary_seconds, primary_rows, candidate_seconds, first, last) in conn.execute(SUMMARY_SQL):
+            pairs.append({
+                "primary_version": primary_version,
+                "candidate_version": candidate_version,
+                "rows": rows,
+                "disagreement_rate": round(disagreements / rows, 4),
+                "model_disagreement_rate": {name: round(n / rows, 4) for name, n in zip(MODEL_NAMES, (lr, rf, xgb))},
+                "mean_probability_delta": round(delta / rows, 3),
+                "primary_ms_per_row": round(primary_seconds / primary_rows * 1000, 4) if primary_rows else None,
+                "candidate_ms_per_row": round(candidate_seconds / rows * 1000, 4),
+                "first_seen": first,
+                "last_seen": last,
+            })
+        return pairs
+
+    def stats(self):
+        """This worker's sampling counters"""
+        with self._counters_lock:
+            sampled, dropped, scored, batches = self.sampled, self.dropped, self.scored, self.batches
+        return {
+            "enabled": self.enabled,
+            "candidate_version": self.candidate_version,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "sampled": sampled,
+            "dropped": dropped,
+            "scored": scored,
+            "batches": batches,
+            "candidate_loaded": self._candidate is not None and self._candidate.version == self.candidate_version,
+            "candidate_error": self.candidate_error,
+            "error": self.error,
+        }
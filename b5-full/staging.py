@@ -0,0 +1,97 @@
+"""
+Table-driven clinical staging (Normal / Pre-Diabetic / Type 1 / Type 2).
+
+The stage rules are data: each rule lists its conditions as
+(column, operator, value) comparisons.  Comparisons within a clause are
+ANDed, clauses are ORed, and the first matching rule wins, the same as the
+if/elif chain this replaces.
+
+``stage_indices`` turns every rule into a boolean mask over whole arrays and
+picks the first matching rule per row with ``np.select``.  ``classify_stage``
+runs the same function on one-element arrays, so single predictions, batches
+and rescoring share one implementation.
+"""
+
+import operator
+from collections import namedtuple
+
+import numpy as np
+
+StageRule = namedtuple("StageRule", "stage clauses suggestion_keys suggestion")
+
+# First match wins; a rule with an empty clause matches everything
+STAGE_RULES = [
+    StageRule(
+        "Normal",
+        [[("glucose", "<", 110), ("bmi", "<", 25)]],
+        ["rec_maintain_diet", "rec_exercise_30", "rec_annual_checkup"],
+        "✅ Maintain healthy diet\n✅ Exercise 30 min daily\n✅ Annual checkup",
+    ),
+    StageRule(
+        "Pre-Diabetic",
+        [[("glucose", ">=", 110), ("glucose", "<=", 140)], [("bmi", ">=", 25)]],
+        ["rec_reduce_sugar", "rec_exercise_5", "rec_monitor_3"],
+        "⚠️ Reduce sugar\n⚠️ Exercise 5 days/week\n⚠️ Monitor glucose 3 months",
+    ),
+    StageRule(
+        "Type 1 Diabetes",
+        [[("glucose", ">=", 140), ("insulin", "<", 30)]],
+        ["rec_consult_insulin", "rec_monitor_glucose", "rec_balanced_meals"],
+        "🚨 Consult doctor for insulin\n🚨 Blood glucose monitoring\n🚨 Balanced meals",
+    ),
+    StageRule(
+        "Type 2 Diabetes",
+        [[]],
+        ["rec_medication", "rec_weight", "rec_consult"],
+        "🚨 Strict medication & diet\n🚨 Weight management\n🚨 Consult doctor",
+    ),
+]
+
+STAGE_NAMES = [rule.stage for rule in STAGE_RULES]
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+}
+
+
+# The columns the rules compare, in the argument order of stage_indices and classify_stage
+STAGE_COLUMNS = ("glucose", "insulin", "bmi")
+
+
+def _rule_mask(rule, columns, n):
+    mask = np.zeros(n, dtype=bool)
+    for clause in rule.clauses:
+        clause_mask = np.ones(n, dtype=bool)
+        for column, op, value in clause:
+            clause_mask &= OPERATORS[op](columns[column], value)
+        mask |= clause_mask
+    return mask
+
+
+def stage_indices(glucose, insulin, bmi):
+    """Index into STAGE_RULES of the first matching rule for every row"""
+    columns = {column: np.asarray(values, dtype=np.float64)
+               for column, values in zip(STAGE_COLUMNS, (glucose, insulin, bmi))}
+    n = columns["glucose"].shape[0]
+    with np.errstate(invalid="ignore"):
+        masks = [_rule_mask(rule, columns, n) for rule in STAGE_RULES]
+    return np.select(masks, np.arange(len(STAGE_RULES)), default=len(STAGE_RULES) - 1)
+
+
+def classify_stages(glucose, insulin, bmi):
+    """(stage, suggestion_keys, suggestion) for every row of the given arrays"""
+    return [stage_outputs(k) for k in stage_indices(glucose, insulin, bmi)]
+
+
+def stage_outputs(index):
+    rule = STAGE_RULES[index]
+    return rule.stage, list(rule.suggestion_keys), rule.suggestion
+
+
+def classify_stage(glucose, insulin, bmi):
+    """Clinical stage, suggestion translation keys and suggestion text for one patient"""
+    return stage_outputs(stage_indices([glucose], [insulin], [bmi])[0])
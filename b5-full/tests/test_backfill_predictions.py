@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+# Add parent directory to path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from staging import classify_stage
+
+
+class BackfillPredictionsTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not os.path.exists(os.path.join(PROJECT_DIR, "diabetes_model_rf.pkl")):
+            raise unittest.SkipTest("Model artifacts not found; run train_model.py first")
+        import app
+        import backfill_predictions
+        cls.app = app
+        cls.backfill = staticmethod(backfill_predictions.backfill)
+        cls.engine = app.get_engine()
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(f"""
+            CREATE TABLE patients (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, name TEXT,
+                age INTEGER, pregnancies INTEGER, glucose REAL, bp REAL, skin REAL, insulin REAL,
+                bmi REAL, dpf REAL, result TEXT, stage TEXT, suggestion TEXT, model_version TEXT,
+                {', '.join(c + ' REAL' for c in self.app.PREDICTION_COLUMNS)})
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_backfills_only_missing_rows_from_full_features(self):
+        rows = [(1, "A", 50, 6, 148, 72, 35, 0, 33.6, 0.627),
+                (1, "B", 31, 1, 85, 66, 29, 0, 26.6, 0.351),
+                (1, "C", 32, 8, 183, 64, 0, 0, 23.3, 0.672)]
+        self.conn.executemany("""INSERT INTO patients (user_id,name,age,pregnancies,glucose,bp,skin,insulin,bmi,dpf)
+                                 VALUES (?,?,?,?,?,?,?,?,?,?)""", rows)
+        self.conn.execute("UPDATE patients SET agreement=3, model_version='old' WHERE name='C'")
+
+        self.assertEqual(self.backfill(self.conn, self.engine, batch_size=1), 2)
+        stored = self.conn.execute(
+            f"SELECT {', '.join(self.app.PREDICTION_COLUMNS)}, model_version FROM patients WHERE name='A'").fetchone()
+        expected = self.engine.predict_one([6, 148, 72, 35, 0, 33.6, 0.627, 50])
+        self.assertEqual(list(stored[:3]), expected['votes'])
+        self.assertAlmostEqual(stored[3], expected['probabilities'][0])
+        self.assertEqual(stored[-1], self.engine.version)
+        self.assertEqual(self.conn.execute("SELECT model_version FROM patients WHERE name='C'").fetchone()[0], "old")
+        # Nothing left to do on a second run
+        self.assertEqual(self.backfill(self.conn, self.engine), 0)
+
+    def test_backfilled_row_is_rescored_as_a_whole(self):
+        # Saved by an older model, before per-model outputs were stored
+        self.conn.execute("""INSERT INTO patients (user_id,name,age,pregnancies,glucose,bp,skin,insulin,bmi,dpf,
+                             result,stage,suggestion,model_version)
+                             VALUES (1,'D',50,6,148,72,35,0,33.6,0.627,'stale','stale','stale','other-version')""")
+
+        self.assertEqual(self.backfill(self.conn, self.engine), 1)
+        result, stage, suggestion, agreement, version = self.conn.execute(
+            "SELECT result, stage, suggestion, agreement, model_version FROM patients").fetchone()
+        expected = self.engine.predict_one([6, 148, 72, 35, 0, 33.6, 0.627, 50])
+        self.assertEqual(result, expected['result'])
+        expected_stage, _, expected_suggestion = classify_stage(148, 0, 33.6)
+        self.assertEqual((stage, suggestion), (expected_stage, expected_suggestion))
+        self.assertEqual(agreement, expected['agreement'])
+        self.assertEqual(version, self.engine.version)
+
+
+if __name__ == '__main__':
+    unittest.main()
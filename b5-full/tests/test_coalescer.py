@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescer import PredictionCoalescer
+
+
+class RowsResult:
+    def __init__(self, X):
+        self.X = X
+
+    def row(self, k):
+        return self.X[k].tolist()
+
+
+class FakeEngine:
+    """Returns each row's own features; the first call can be held until released"""
+
+    def __init__(self, error=None):
+        self.batch_sizes = []
+        self.error = error
+        self.hold = threading.Event()
+        self.hold.set()
+        self.entered = threading.Event()
+
+    def predict(self, X):
+        self.entered.set()
+        self.hold.wait(5)
+        self.batch_sizes.append(len(X))
+        if self.error:
+            raise self.error
+        return RowsResult(X)
+
+
+class CoalescerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.results = {}
+
+    def call(self, coalescer, value):
+        try:
+            self.results[value] = coalescer.predict_one([value, 0.0], timeout=5)
+        except Exception as e:
+            self.results[value] = e
+
+    def start(self, coalescer, values):
+        threads = [threading.Thread(target=self.call, args=(coalescer, v)) for v in values]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def wait_for_queue(self, coalescer, depth):
+        deadline = time.time() + 5
+        while coalescer.stats()["queue_depth"] < depth and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(coalescer.stats()["queue_depth"], depth)
+
+    def run_behind_busy_engine(self, coalescer, engine, values):
+        # The first request occupies the engine while the others queue up behind it
+        engine.hold.clear()
+        threads = self.start(coalescer, [0])
+        engine.entered.wait(5)
+        threads += self.start(coalescer, values)
+        self.wait_for_queue(coalescer, len(values))
+        engine.hold.set()
+        for thread in threads:
+            thread.join(5)
+
+    def test_queued_requests_share_one_batch_and_get_their_own_rows(self):
+        engine = FakeEngine()
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=1, max_batch=32)
+        self.run_behind_busy_engine(coalescer, engine, [1, 2, 3, 4, 5])
+
+        self.assertEqual(engine.batch_sizes, [1, 5])
+        self.assertEqual(self.results, {v: [float(v), 0.0] for v in range(6)})
+        stats = coalescer.stats()
+        self.assertEqual((stats["batches"], stats["rows"], stats["max_queue_depth"]), (2, 6, 5))
+        self.assertEqual(stats["batch_size_histogram"]["1"], 1)
+        self.assertEqual(stats["batch_size_histogram"]["8"], 1)
+
+    def test_engine_error_reaches_every_waiter(self):
+        engine = FakeEngine(error=ValueError("bad model"))
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=1)
+        self.run_behind_busy_engine(coalescer, engine, [1, 2, 3])
+
+        self.assertEqual(sorted(self.results), [0, 1, 2, 3])
+        for error in self.results.values():
+            self.assertIsInstance(error, ValueError)
+        # A missing engine fails the request instead of hanging it
+        with self.assertRaises(RuntimeError):
+            PredictionCoalescer(lambda: None).predict_one([1.0, 0.0], timeout=5)
+
+    def test_max_batch_splits_the_queue(self):
+        engine = FakeEngine()
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=1, max_batch=2)
+        self.run_behind_busy_engine(coalescer, engine, [1, 2, 3, 4, 5])
+
+        self.assertEqual(engine.batch_sizes, [1, 2, 2, 1])
+        self.assertEqual(len(self.results), 6)
+
+    def test_lone_request_skips_the_wait_window(self):
+        engine = FakeEngine()
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=2000)
+        started = time.perf_counter()
+        self.assertEqual(coalescer.predict_one([7.0, 0.0]), [7.0, 0.0])
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_queued_batch_waits_for_late_requests(self):
+        engine = FakeEngine()
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=1000, max_batch=32)
+        engine.hold.clear()
+        threads = self.start(coalescer, [0])
+        engine.entered.wait(5)
+        threads += self.start(coalescer, [1, 2])
+        self.wait_for_queue(coalescer, 2)
+        engine.hold.set()
+        # Arrives inside the window opened for the two queued rows
+        time.sleep(0.1)
+        threads += self.start(coalescer, [3])
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(engine.batch_sizes, [1, 3])
+        self.assertEqual(len(self.results), 4)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork()")
+    def test_forked_child_starts_its_own_worker(self):
+        engine = FakeEngine()
+        coalescer = PredictionCoalescer(lambda: engine, max_wait_ms=1)
+        self.assertEqual(coalescer.predict_one([1.0, 0.0]), [1.0, 0.0])
+        parent_worker = coalescer._worker
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                ok = coalescer.predict_one([2.0, 0.0], timeout=5) == [2.0, 0.0]
+                ok = ok and coalescer._worker is not parent_worker and coalescer._worker_pid == os.getpid()
+            except BaseException:
+                ok = False
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIs(coalescer._worker, parent_worker)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import os
+import sys
+import warnings
+
+import numpy as np
+
+# Add parent directory to path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from compiled_models import CompiledTreeEnsemble, FusedLogisticRegression
+
+warnings.filterwarnings("ignore")
+
+
+def load_features():
+    data = np.genfromtxt(os.path.join(PROJECT_DIR, "diabetes.csv"), delimiter=",", skip_header=1)
+    return data[:, :8]
+
+
+class FusedLogisticRegressionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import joblib
+            cls.scaler = joblib.load(os.path.join(PROJECT_DIR, "scaler.pkl"))
+            cls.model_lr = joblib.load(os.path.join(PROJECT_DIR, "diabetes_model_lr.pkl"))
+        except (ImportError, FileNotFoundError) as e:
+            raise unittest.SkipTest(f"Model artifacts not available: {e}")
+        cls.fused = FusedLogisticRegression.from_sklearn(cls.scaler, cls.model_lr)
+        cls.X = load_features()
+
+    def test_matches_pickled_model(self):
+        X_scaled = self.scaler.transform(self.X)
+        np.testing.assert_allclose(self.fused.predict_proba(self.X),
+                                   self.model_lr.predict_proba(X_scaled), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(self.fused.decision_function(self.X),
+                                   self.model_lr.decision_function(X_scaled), rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(self.fused.predict(self.X), self.model_lr.predict(X_scaled))
+
+    def test_extreme_inputs_do_not_overflow(self):
+        X = np.array([[20, 400, 200, 100, 900, 70, 3, 120],
+                      [0, 0, 40, 0, 0, 10, 0, 1]], dtype=float) * 100
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            proba = self.fused.predict_proba(X)
+        self.assertTrue(np.all(np.isfinite(proba)))
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+class CompiledTreeEnsembleTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import joblib
+            cls.scaler = joblib.load(os.path.join(PROJECT_DIR, "scaler.pkl"))
+            cls.model_lr = joblib.load(os.path.join(PROJECT_DIR, "diabetes_model_lr.pkl"))
+            cls.model_rf = joblib.load(os.path.join(PROJECT_DIR, "diabetes_model_rf.pkl"))
+            cls.model_xgb = joblib.load(os.path.join(PROJECT_DIR, "diabetes_model_xgb.pkl"))
+        except (ImportError, FileNotFoundError) as e:
+            raise unittest.SkipTest(f"Model artifacts not available: {e}")
+
+        # Dataset rows plus random rows across the whole valid input range
+        rng = np.random.default_rng(42)
+        n = 2000
+        random_rows = np.column_stack([
+            rng.integers(0, 21, n), rng.uniform(0, 400, n), rng.uniform(40, 200, n),
+            rng.uniform(0, 100, n), rng.uniform(0, 900, n), rng.uniform(10, 70, n),
+            rng.uniform(0, 3, n), rng.integers(1, 121, n),
+        ])
+        cls.X = np.vstack([load_features(), random_rows])
+        cls.X_scaled = cls.scaler.transform(cls.X)
+
+    def assert_matches(self, compiled, model, atol):
+        np.testing.assert_allclose(compiled.predict_proba(self.X),
+                                   model.predict_proba(self.X_scaled), atol=atol)
+        np.testing.assert_array_equal(compiled.predict(self.X), model.predict(self.X_scaled))
+
+    def test_random_forest_matches_pickled_model(self):
+        compiled = CompiledTreeEnsemble.from_sklearn_forest(self.scaler, self.model_rf)
+        self.assertEqual(compiled.n_trees, len(self.model_rf.estimators_))
+        self.assert_matches(compiled, self.model_rf, atol=1e-12)
+
+    def test_xgboost_matches_pickled_model(self):
+        compiled = CompiledTreeEnsemble.from_xgboost(self.scaler, self.model_xgb)
+        # XGBoost accumulates leaf values in float32
+        self.assert_matches(compiled, self.model_xgb, atol=1e-5)
+
+    def test_bundle_round_trip_is_memory_mapped(self):
+        import tempfile
+        from compiled_models import load_bundle, save_bundle
+        models = {
+            "lr": FusedLogisticRegression.from_sklearn(self.scaler, self.model_lr),
+            "xgb": CompiledTreeEnsemble.from_xgboost(self.scaler, self.model_xgb),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            save_bundle(tmp, models, {"scaler.pkl": "abc"})
+            loaded, manifest = load_bundle(tmp, mmap=True)
+            self.assertEqual(manifest["sources"], {"scaler.pkl": "abc"})
+            # Walk tables are used straight from the mapped files, without a private copy
+            self.assertIsInstance(loaded["xgb"].threshold.base, np.memmap)
+            self.assertIsInstance(loaded["xgb"].children.base, np.memmap)
+            for name in models:
+                np.testing.assert_array_equal(loaded[name].predict_proba(self.X[:50]),
+                                              models[name].predict_proba(self.X[:50]))
+            del loaded
+
+if __name__ == '__main__':
+    unittest.main()
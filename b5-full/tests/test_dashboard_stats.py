@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard_stats import check, read_dashboard_stats, rebuild
+from migrations import migrate
+
+
+class DashboardStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "app.db"))
+        migrate(self.conn)
+        self.conn.executemany("INSERT INTO users (username, role) VALUES (?, ?)",
+                              [("ana", "patient"), ("ben", "patient"), ("dr", "doctor")])
+        self.conn.executemany(
+            "INSERT INTO patients (user_id, name, glucose, bmi, result, stage) VALUES (?, ?, ?, ?, ?, ?)",
+            [(1, "a1", 100, 22.0, "Not Diabetic", "Normal"),
+             (1, "a2", 130, 27.5, "Diabetic", "Pre-Diabetic"),
+             (2, "b1", 180, 33.0, "Diabetic", "Type 2 Diabetes"),
+             (2, "b2", None, 30.0, "Diabetic", "Type 2 Diabetes")])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_triggers_track_inserts(self):
+        stats = read_dashboard_stats(self.conn)
+        self.assertEqual(stats["total_patients"], 4)
+        self.assertEqual(stats["results"], {"Diabetic": 3, "Not Diabetic": 1})
+        self.assertEqual(stats["stages"], {"Normal": 1, "Pre-Diabetic": 1, "Type 1 Diabetes": 0,
+                                           "Type 2 Diabetes": 2})
+        # Same as AVG(): NULL glucose is left out
+        self.assertAlmostEqual(stats["avg_glucose"], (100 + 130 + 180) / 3)
+        self.assertAlmostEqual(stats["avg_bmi"], (22.0 + 27.5 + 33.0 + 30.0) / 4)
+        self.assertEqual((stats["total_users"], stats["roles"]), (3, {"patient": 2, "doctor": 1}))
+        self.assertEqual(check(self.conn), {})
+
+    def test_triggers_track_updates_and_user_deletion(self):
+        self.conn.execute("UPDATE patients SET result='Not Diabetic', stage='Normal', glucose=95 WHERE name='a2'")
+        self.conn.execute("DELETE FROM patients WHERE user_id=2")
+        self.conn.execute("DELETE FROM users WHERE id=2")
+        self.conn.commit()
+        stats = read_dashboard_stats(self.conn)
+        self.assertEqual(stats["total_patients"], 2)
+        self.assertEqual(stats["results"], {"Not Diabetic": 2})
+        self.assertEqual(stats["stages"]["Type 2 Diabetes"], 0)
+        self.assertAlmostEqual(stats["avg_glucose"], (100 + 95) / 2)
+        self.assertEqual(stats["roles"], {"patient": 1, "doctor": 1})
+        self.assertEqual(check(self.conn), {})
+
+    def test_rebuild_repairs_drift(self):
+        self.conn.execute("UPDATE dashboard_stats SET count = count + 5 WHERE kind='result' AND key='Diabetic'")
+        self.conn.execute("DELETE FROM dashboard_stats WHERE kind='role'")
+        self.conn.commit()
+        drift = check(self.conn)
+        self.assertEqual(drift[("result", "Diabetic")][1][0], 3)
+        self.assertIn(("role", "doctor"), drift)
+        rebuild(self.conn)
+        self.assertEqual(check(self.conn), {})
+        self.assertEqual(read_dashboard_stats(self.conn)["results"]["Diabetic"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
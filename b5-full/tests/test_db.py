@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import PRAGMA_PROFILES, ConnectionPool, effective_pragmas
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp.name, "test.db"), size=2)
+        with self.pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def test_close_returns_connection_for_reuse(self):
+        first = self.pool.acquire()
+        self.assertIsInstance(first.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+        first.close()
+        second = self.pool.acquire()
+        self.assertIs(second, first)
+        second.close()
+        stats = self.pool.stats()
+        self.assertEqual((stats["opened"], stats["in_use"], stats["idle"]), (1, 0, 1))
+        self.assertEqual(stats["reused"], 2)
+
+    def test_release_rolls_back_and_caps_idle(self):
+        conns = [self.pool.acquire() for _ in range(3)]
+        conns[0].execute("INSERT INTO t VALUES (1)")
+        self.assertEqual(self.pool.stats()["peak_in_use"], 3)
+        for conn in conns:
+            conn.close()
+        stats = self.pool.stats()
+        self.assertEqual((stats["idle"], stats["closed"]), (2, 1))
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+        # Releasing twice is harmless
+        self.pool.release(conns[0])
+        self.assertEqual(self.pool.stats()["idle"], 2)
+
+
+class PragmaProfileTestCase(unittest.TestCase):
+    def test_profiles_are_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for profile, expected in (("safe", "FULL"), ("balanced", "NORMAL"), ("fast", "OFF")):
+                pool = ConnectionPool(os.path.join(directory, f"{profile}.db"), profile=profile)
+                settings = pool.settings()
+                self.assertEqual(settings["journal_mode"], "wal")
+                self.assertEqual(settings["synchronous"], expected)
+                self.assertEqual(settings["cache_size"], PRAGMA_PROFILES[profile]["cache_size"])
+                self.assertEqual(settings["busy_timeout"], PRAGMA_PROFILES[profile]["busy_timeout"])
+                pool.close_all()
+
+    def test_overrides_and_unknown_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pool = ConnectionPool(os.path.join(directory, "t.db"), pragmas={"temp_store": "FILE"})
+            with pool.connection() as conn:
+                self.assertEqual(effective_pragmas(conn, ["temp_store", "synchronous"]),
+                                 {"temp_store": "FILE", "synchronous": "NORMAL"})
+            pool.close_all()
+        with self.assertRaises(ValueError):
+            ConnectionPool(profile="reckless")
+
+
+class RequestConnectionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import app as app_module
+        cls.app_module = app_module
+
+    def test_one_connection_per_app_context(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pool = ConnectionPool(os.path.join(directory, "app.db"))
+            with patch.object(self.app_module, "db_pool", pool):
+                with self.app_module.app.app_context():
+                    conn = self.app_module.get_db_connection()
+                    conn.close()
+                    self.assertIs(self.app_module.get_db_connection(), conn)
+                    self.assertEqual(pool.stats()["in_use"], 1)
+                self.assertEqual(pool.stats()["in_use"], 0)
+                self.assertEqual(pool.stats()["idle"], 1)
+
+                # Outside a request every caller gets its own connection
+                other = self.app_module.get_db_connection()
+                self.assertIs(other, conn)
+                self.assertIsNot(self.app_module.get_db_connection(), other)
+            pool.close_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import BatchFormatError, rows_from_csv, rows_from_json, validate_feature_matrix
+
+
+class BatchFeaturesTestCase(unittest.TestCase):
+    def test_json_objects_and_arrays(self):
+        X, names = rows_from_json([
+            {"name": "Alice", "pregnancies": 1, "glucose": 120, "blood_pressure": 70, "skin": 20,
+             "insulin": 79, "bmi": 25.0, "dpf": 0.5, "age": 33},
+            [2, 90, 70, 20, 80, 22, 0.3, 25],
+        ])
+        self.assertEqual(X.shape, (2, 8))
+        self.assertEqual(names, ["Alice", None])
+        np.testing.assert_array_equal(X[1], [2, 90, 70, 20, 80, 22, 0.3, 25])
+
+    def test_csv_with_dataset_headers(self):
+        X, names = rows_from_csv(
+            "Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age\n"
+            "6,148,72,35,0,33.6,0.627,50\n"
+        )
+        np.testing.assert_array_equal(X[0], [6, 148, 72, 35, 0, 33.6, 0.627, 50])
+        self.assertEqual(names, [None])
+
+    def test_csv_missing_column(self):
+        with self.assertRaises(BatchFormatError):
+            rows_from_csv("glucose,bmi\n120,25\n")
+
+    def test_columnar_validation(self):
+        X = np.array([
+            [1, 120, 70, 20, 79, 25.0, 0.5, 33],
+            [1.5, 120, 20, 20, 79, 25.0, 0.5, 33],
+            [1, np.nan, 70, 20, 79, 25.0, 0.5, 33],
+        ])
+        valid, errors = validate_feature_matrix(X)
+        self.assertEqual(valid.tolist(), [True, False, False])
+        self.assertEqual(errors[0], [])
+        self.assertIn("Blood Pressure must be between 40 and 200 mmHg", errors[1])
+        self.assertIn("Pregnancies must be between 0 and 20", errors[1])
+        self.assertEqual(errors[2], ["Glucose must be between 0 and 400 mg/dL"])
+
+
+if __name__ == '__main__':
+    unittest.main()
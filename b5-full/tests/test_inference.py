@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import warnings
+
+import numpy as np
+
+# Add parent directory to path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from inference import EnsembleEngine, FEATURE_COLUMNS, PREDICTION_COLUMNS, prediction_values, stored_prediction
+
+warnings.filterwarnings("ignore")
+
+
+def load_artifacts():
+    import joblib
+    return [joblib.load(os.path.join(PROJECT_DIR, name)) for name in
+            ("scaler.pkl", "diabetes_model_lr.pkl", "diabetes_model_rf.pkl", "diabetes_model_xgb.pkl")]
+
+
+def load_features():
+    data = np.genfromtxt(os.path.join(PROJECT_DIR, "diabetes.csv"), delimiter=",", skip_header=1)
+    return data[:, :len(FEATURE_COLUMNS)]
+
+
+class EnsembleEngineTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.scaler, cls.model_lr, cls.model_rf, cls.model_xgb = load_artifacts()
+        except (ImportError, FileNotFoundError) as e:
+            raise unittest.SkipTest(f"Model artifacts not available: {e}")
+        cls.engine = EnsembleEngine(cls.scaler, cls.model_lr, cls.model_rf, cls.model_xgb)
+        cls.X = load_features()
+
+    def test_matches_per_model_calls(self):
+        X = self.X[:200]
+        result = self.engine.predict(X)
+        X_scaled = self.scaler.transform(X)
+
+        for j, model in enumerate([self.model_lr, self.model_rf, self.model_xgb]):
+            np.testing.assert_array_equal(result.votes[:, j], model.predict(X_scaled))
+            # Compiled kernels agree with the libraries to float32 precision (in percent)
+            np.testing.assert_allclose(result.probabilities[:, j],
+                                       model.predict_proba(X_scaled)[:, 1] * 100, atol=1e-4)
+
+        expected = (result.votes.sum(axis=1) >= 2).astype(int)
+        np.testing.assert_array_equal(result.classes, expected)
+
+    def test_predict_one_row_shape(self):
+        row = self.engine.predict_one(self.X[0].tolist())
+        self.assertIn(row['result'], ("Diabetic", "Not Diabetic"))
+        self.assertEqual(set(row['model_predictions']), {"lr", "rf", "xgb"})
+        self.assertEqual(row['agreement'], sum(row['votes']))
+        self.assertIn(row['agreement_key'], ("agree_all", "agree_majority"))
+
+    def test_rejects_wrong_width(self):
+        with self.assertRaises(ValueError):
+            self.engine.predict(np.zeros((2, 5)))
+
+    def test_stored_prediction_round_trip(self):
+        row = self.engine.predict_one(self.X[3].tolist())
+        values = prediction_values(row)
+        self.assertEqual(len(values), len(PREDICTION_COLUMNS))
+        stored = stored_prediction(values)
+        for key in ('votes', 'probabilities', 'agreement', 'agreement_key', 'agreement_text'):
+            self.assertEqual(stored[key], row[key])
+        self.assertIsNone(stored_prediction((None,) * len(PREDICTION_COLUMNS)))
+
+
+if __name__ == '__main__':
+    unittest.main()
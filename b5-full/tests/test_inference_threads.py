@@ -0,0 +1,39 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from inference_threads import parse_cpu_list, pin_cpus, set_model_threads
+
+
+class InferenceThreadsTestCase(unittest.TestCase):
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list("0-3,6"), {0, 1, 2, 3, 6})
+        self.assertEqual(parse_cpu_list(" 2 , "), {2})
+        self.assertEqual(parse_cpu_list(""), set())
+
+    def test_set_model_threads_resets_training_n_jobs(self):
+        X = np.random.RandomState(0).rand(20, 3)
+        model = RandomForestClassifier(n_estimators=3, n_jobs=-1, random_state=0).fit(X, X[:, 0] > 0.5)
+        set_model_threads(model, 1)
+        self.assertEqual(model.n_jobs, 1)
+        set_model_threads(None, 1)
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "CPU affinity not supported")
+    def test_pin_cpus(self):
+        available = sorted(os.sched_getaffinity(0))
+        try:
+            self.assertIsNone(pin_cpus(""))
+            self.assertIsNone(pin_cpus("worker"))
+            self.assertEqual(pin_cpus("worker", worker_index=len(available)), [available[0]])
+            self.assertEqual(pin_cpus(str(available[-1])), [available[-1]])
+        finally:
+            os.sched_setaffinity(0, available)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from prometheus_client import REGISTRY
+
+import metrics
+from metrics import DB_QUERY_SECONDS, MAX_QUERY_LABELS, TimedConnection, exposition, query_label, query_timer
+from metrics import record_predictions
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_query_labels(self):
+        self.assertEqual(query_label("SELECT p.id FROM patients p JOIN users u ON p.user_id = u.id"),
+                         "select patients")
+        self.assertEqual(query_label("\n  INSERT INTO patients (a) VALUES (?)"), "insert patients")
+        self.assertEqual(query_label("INSERT OR IGNORE INTO users VALUES (?)"), "insert users")
+        self.assertEqual(query_label("UPDATE users SET x=1"), "update users")
+        self.assertEqual(query_label("delete from admin_logs"), "delete admin_logs")
+        self.assertEqual(query_label("PRAGMA table_info(patients)"), "pragma")
+
+    def test_named_queries(self):
+        self.assertEqual(query_label("/* query: doctor_dashboard_page */ SELECT p.id FROM patients p"),
+                         "doctor_dashboard_page")
+        self.assertEqual(query_label("\n    /* query: user_stats_trend */\n    SELECT glucose FROM patients"),
+                         "user_stats_trend")
+        # Only a leading comment names the statement
+        self.assertEqual(query_label("SELECT 1 FROM users /* query: sneaky */"), "select users")
+
+        from patient_export import ExportOptions, build_query
+        from patient_search import FTS_COUNT_SQL, FTS_NEWEST_SQL, FTS_RANKED_SQL, LIKE_COUNT_SQL, LIKE_ROWS_SQL
+        from user_stats import TREND_SQL
+        export_sql, _ = build_query(ExportOptions(["id"], [], None, None, False))
+        names = [query_label(sql) for sql in (FTS_COUNT_SQL, FTS_RANKED_SQL, FTS_NEWEST_SQL, LIKE_COUNT_SQL,
+                                              LIKE_ROWS_SQL, TREND_SQL, export_sql)]
+        self.assertEqual(names, ["search_count", "search_ranked", "search_newest", "search_like_count",
+                                 "search_like", "user_stats_trend", "export_csv"])
+
+    def test_label_values_are_bounded(self):
+        full = {f"query_{i}" for i in range(MAX_QUERY_LABELS)}
+        with mock.patch.object(metrics, "_query_labels", full), mock.patch.object(metrics, "_query_timers", {}):
+            self.assertIs(query_timer("/* query: one_too_many */ SELECT 1"), DB_QUERY_SECONDS.labels(query="other"))
+            self.assertIs(query_timer("/* query: query_7 */ SELECT 1"), DB_QUERY_SECONDS.labels(query="query_7"))
+            self.assertEqual(len(full), MAX_QUERY_LABELS)
+
+    def test_timed_connection_records_queries(self):
+        before = sample("diabetes_db_query_seconds_count", query="insert t")
+        conn = sqlite3.connect(":memory:", factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE t (x)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        conn.cursor().execute("INSERT INTO t VALUES (?)", (3,))
+        self.assertEqual(conn.execute("SELECT x FROM t ORDER BY x").fetchall()[2]["x"], 3)
+        conn.close()
+        self.assertEqual(sample("diabetes_db_query_seconds_count", query="insert t") - before, 2)
+
+    def test_prediction_counter_and_exposition(self):
+        before = sample("diabetes_predictions_total", result="Diabetic", stage="Type 2 Diabetes", source="batch")
+        record_predictions([{"result": "Diabetic", "stage": "Type 2 Diabetes"}] * 3
+                           + [{"result": "Not Diabetic", "stage": "Normal"}], source="batch")
+        after = sample("diabetes_predictions_total", result="Diabetic", stage="Type 2 Diabetes", source="batch")
+        self.assertEqual(after - before, 3)
+        body, content_type = exposition()
+        self.assertIn(b"diabetes_model_inference_seconds", body)
+        self.assertTrue(content_type.startswith("text/plain"))
+
+    def test_multiprocess_aggregation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory)
+            worker = ("import sys; sys.path.insert(0, %r); from metrics import record_predictions; "
+                      "record_predictions([{'result': 'Diabetic', 'stage': 'Normal'}] * 2, source='form')"
+                      % PROJECT_DIR)
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+            scrape = ("import sys; sys.path.insert(0, %r); from metrics import exposition; "
+                      "sys.stdout.write(exposition()[0].decode())" % PROJECT_DIR)
+            output = subprocess.run([sys.executable, "-c", scrape], env=env, check=True,
+                                    capture_output=True, text=True).stdout
+        self.assertIn('diabetes_predictions_total{result="Diabetic",source="form",stage="Normal"} 4.0', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
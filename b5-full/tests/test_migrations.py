@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import LATEST_VERSION, MIGRATIONS, Migration, current_version, migrate
+
+HISTORY_SQL = ("SELECT id, glucose FROM patients WHERE user_id=? ORDER BY created_at DESC")
+
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "app.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def test_fresh_database(self):
+        conn = self.connect()
+        self.assertEqual(migrate(conn), [m.version for m in MIGRATIONS])
+        self.assertEqual(current_version(conn), LATEST_VERSION)
+        self.assertEqual(migrate(conn), [])
+
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(patients)")}
+        self.assertTrue({"model_version", "rf_probability", "agreement"} <= columns)
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + HISTORY_SQL, (1,)))
+        self.assertIn("idx_patients_user_created", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM users WHERE reset_token=? AND reset_expires > ?", ("t", "x")))
+        self.assertIn("idx_users_reset_token", plan)
+        self.assertIsNotNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone())
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        self.assertTrue({"rescoring_jobs", "shadow_results"} <= tables)
+        conn.close()
+
+    def test_upgrades_legacy_database_in_place(self):
+        conn = self.connect()
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, "
+                     "email TEXT UNIQUE, password TEXT, role TEXT, is_verified INTEGER DEFAULT 0, "
+                     "verification_token TEXT, reset_token TEXT, reset_expires DATETIME, "
+                     "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, name TEXT, "
+                     "age INTEGER, pregnancies INTEGER, glucose REAL, bp REAL, skin REAL, insulin REAL, bmi REAL, "
+                     "dpf REAL, result TEXT, stage TEXT, suggestion TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO users (username, email) VALUES ('ana', 'ana@example.com')")
+        conn.execute("INSERT INTO patients (user_id, name, glucose) VALUES (1, 'Ana', 120)")
+        # Created at runtime by earlier versions of rescoring.py
+        conn.execute("CREATE TABLE rescoring_jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, model_version TEXT, "
+                     "status TEXT, last_id INTEGER DEFAULT 0, max_id INTEGER, rows_total INTEGER, "
+                     "rows_done INTEGER DEFAULT 0, active_seconds REAL DEFAULT 0, heartbeat REAL, "
+                     "started_at DATETIME DEFAULT CURRENT_TIMESTAMP, finished_at DATETIME, error TEXT)")
+        conn.execute("INSERT INTO rescoring_jobs (model_version, status) VALUES ('v1', 'done')")
+        conn.commit()
+
+        self.assertEqual(migrate(conn), [m.version for m in MIGRATIONS])
+        self.assertEqual(conn.execute("SELECT name, glucose, agreement FROM patients").fetchall(),
+                         [("Ana", 120.0, None)])
+        self.assertEqual(conn.execute("SELECT count, glucose_sum FROM dashboard_stats "
+                                      "WHERE kind='patients'").fetchone(), (1, 120.0))
+        self.assertEqual(conn.execute("SELECT model_version, status FROM rescoring_jobs").fetchall(), [("v1", "done")])
+        conn.close()
+
+    def test_failed_migration_rolls_back(self):
+        conn = self.connect()
+        broken = MIGRATIONS + [Migration(LATEST_VERSION + 1, "broken", [
+            "CREATE TABLE half_done (x INTEGER)",
+            "CREATE INDEX idx_missing ON no_such_table(x)",
+        ])]
+        with self.assertRaises(sqlite3.OperationalError):
+            migrate(conn, broken)
+        self.assertEqual(current_version(conn), LATEST_VERSION)
+        self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name='half_done'").fetchone())
+        conn.close()
+
+    def test_concurrent_workers_apply_each_migration_once(self):
+        applied, errors = [], []
+
+        def worker():
+            conn = self.connect()
+            try:
+                applied.extend(migrate(conn))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(applied), [m.version for m in MIGRATIONS])
+
+
+if __name__ == '__main__':
+    unittest.main()
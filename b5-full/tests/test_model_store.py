@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_registry import ModelRegistry
+from model_store import ModelStore, WARMUP_ROWS, load_engine
+
+
+class FakeEngine:
+    def __init__(self):
+        self.scaler = None
+        self.models = []
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(np.asarray(X).shape)
+
+
+class ModelStoreTestCase(unittest.TestCase):
+    def test_background_load_runs_warmup(self):
+        engine = FakeEngine()
+        release = threading.Event()
+
+        def loader(version):
+            release.wait(5)
+            return engine, "fake"
+
+        store = ModelStore(loader)
+        store.start()
+        self.assertFalse(store.ready)
+        self.assertTrue(store.loading)
+        self.assertIsNone(store.get_engine(timeout=0))
+
+        release.set()
+        self.assertIs(store.get_engine(timeout=5), engine)
+        self.assertTrue(store.ready)
+        self.assertEqual(engine.calls[0], WARMUP_ROWS.shape)
+        status = store.status()
+        self.assertEqual(status["source"], "fake")
+        self.assertIsNotNone(status["warmup_ms"])
+
+    def test_lazy_load_on_first_use(self):
+        calls = []
+        store = ModelStore(lambda version: calls.append(1) or (FakeEngine(), "fake"))
+        self.assertEqual(calls, [])
+        self.assertIsNotNone(store.get_engine(timeout=5))
+        store.get_engine(timeout=5)
+        self.assertEqual(calls, [1])
+
+    def test_missing_file_is_reported(self):
+        def loader(version):
+            raise FileNotFoundError(2, "No such file", "diabetes_model_rf.pkl")
+
+        store = ModelStore(loader)
+        store.load()
+        self.assertIsNone(store.get_engine(timeout=0))
+        status = store.status()
+        self.assertFalse(status["ready"])
+        self.assertIn("diabetes_model_rf.pkl", status["error"])
+
+    def test_swap_to_new_version_keeps_old_engine_for_holders(self):
+        current = ["v1"]
+        store = ModelStore(lambda version: (FakeEngine(), "fake"), version_provider=lambda: current[0])
+        store.load()
+        old = store.get_engine(timeout=0)
+        self.assertEqual((store.version, old.version), ("v1", "v1"))
+        self.assertFalse(store.check_for_update())
+
+        current[0] = "v2"
+        self.assertTrue(store.check_for_update())
+        self.assertEqual(store.version, "v2")
+        self.assertIsNot(store.get_engine(timeout=0), old)
+        self.assertEqual(old.version, "v1")
+        self.assertEqual(store.status()["swaps"], 1)
+
+    def test_failed_version_keeps_serving_previous(self):
+        current = ["v1"]
+
+        def loader(version):
+            if version == "broken":
+                raise ValueError("corrupt bundle")
+            return FakeEngine(), "fake"
+
+        store = ModelStore(loader, version_provider=lambda: current[0])
+        store.load()
+        current[0] = "broken"
+        self.assertFalse(store.check_for_update())
+        self.assertEqual(store.version, "v1")
+        self.assertTrue(store.ready)
+        self.assertIn("corrupt bundle", store.status()["error"])
+        # Not retried on every poll
+        self.assertFalse(store.check_for_update())
+
+
+class ModelRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if not os.path.exists(os.path.join(project_dir, "diabetes_model_rf.pkl")):
+            raise unittest.SkipTest("Model artifacts not found; run train_model.py first")
+        self.project_dir = project_dir
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(os.path.join(self.tmp.name, "registry"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_publish_activate_and_load(self):
+        self.assertIsNone(self.registry.current_version())
+        v1 = self.registry.publish(self.project_dir, version="v1", metadata={"note": "first"})
+        v2 = self.registry.publish(self.project_dir, version="v2", activate=False)
+        self.assertEqual(self.registry.versions(), [v1, v2])
+        self.assertEqual(self.registry.current_version(), "v1")
+        self.assertEqual(self.registry.metadata("v1")["note"], "first")
+        with self.assertRaises(ValueError):
+            self.registry.publish(self.project_dir, version="v1")
+        with self.assertRaises(ValueError):
+            self.registry.activate("v3")
+
+        store = ModelStore(lambda version: load_engine(directory=self.registry.version_dir(version)),
+                           version_provider=self.registry.current_version)
+        store.load()
+        self.assertEqual(store.source, "compiled bundle, memory-mapped")
+        self.assertEqual(store.engine.predict(WARMUP_ROWS).row(0)["model_version"], "v1")
+
+        self.registry.activate("v2")
+        self.assertTrue(store.check_for_update())
+        self.assertEqual(store.engine.predict(WARMUP_ROWS).row(0)["model_version"], "v2")
+
+
+class ReadyzTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import app as app_module
+        cls.app_module = app_module
+
+    def _db(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY)")
+        return conn
+
+    def test_not_ready_when_models_missing(self):
+        store = ModelStore(lambda version: (_ for _ in ()).throw(FileNotFoundError(2, "missing", "scaler.pkl")))
+        store.load()
+        with patch.object(self.app_module, "model_store", store), \
+                patch.object(self.app_module, "get_db_connection", self._db):
+            response = self.app_module.app.test_client().get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        body = response.get_json()
+        self.assertFalse(body["checks"]["models"]["ready"])
+        self.assertIn("scaler.pkl", body["checks"]["models"]["error"])
+        self.assertTrue(body["checks"]["database"]["ready"])
+
+    def test_ready(self):
+        store = ModelStore(lambda version: (FakeEngine(), "fake"))
+        store.load()
+        with patch.object(self.app_module, "model_store", store), \
+                patch.object(self.app_module, "get_db_connection", self._db):
+            response = self.app_module.app.test_client().get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "ready")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pagination import decode_token, encode_token, fetch_page
+
+ROWS_SQL = """
+    SELECT id, created_at FROM patients
+    WHERE user_id=? AND {after}
+    ORDER BY {order}
+    LIMIT ?
+"""
+KEYS = ("created_at", "id")
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, user_id INTEGER, created_at TEXT)")
+        self.conn.execute("CREATE INDEX idx_patients_user_created ON patients(user_id, created_at)")
+        # Ids 1..12 for user 1; created_at ties on pairs of rows, so the id breaks them
+        self.conn.executemany("INSERT INTO patients (id, user_id, created_at) VALUES (?, ?, ?)",
+                              [(i, 1, f"2024-01-{(i + 1) // 2:02d}") for i in range(1, 13)] + [(13, 2, "2024-02-01")])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def page(self, token=None, limit=5):
+        return fetch_page(self.conn, ROWS_SQL, [1], KEYS, lambda row: (row[1], row[0]), limit, token)
+
+    def test_walks_forward_and_back(self):
+        first = self.page()
+        self.assertEqual([row[0] for row in first.rows], [12, 11, 10, 9, 8])
+        self.assertIsNone(first.prev_token)
+        second = self.page(first.next_token)
+        self.assertEqual(([row[0] for row in second.rows], second.page), ([7, 6, 5, 4, 3], 2))
+        last = self.page(second.next_token)
+        self.assertEqual(([row[0] for row in last.rows], last.page), ([2, 1], 3))
+        self.assertIsNone(last.next_token)
+
+        back = self.page(last.prev_token)
+        self.assertEqual(([row[0] for row in back.rows], back.page), ([7, 6, 5, 4, 3], 2))
+        front = self.page(back.prev_token)
+        self.assertEqual([row[0] for row in front.rows], [12, 11, 10, 9, 8])
+        self.assertIsNone(front.prev_token)
+        self.assertIsNotNone(front.next_token)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.page()
+        self.conn.execute("INSERT INTO patients (id, user_id, created_at) VALUES (20, 1, '2024-03-01')")
+        self.assertEqual([row[0] for row in self.page(first.next_token).rows], [7, 6, 5, 4, 3])
+        # Going back now reaches the new row too
+        back = self.page(self.page(first.next_token).prev_token)
+        self.assertEqual([row[0] for row in back.rows], [12, 11, 10, 9, 8])
+        self.assertIsNotNone(back.prev_token)
+
+    def test_bad_tokens_start_over(self):
+        for token in ("", "not-a-token", "e30", encode_token("next", [1], 2), encode_token("sideways", ["x", 1], 2),
+                      encode_token("next", [["nested"], 1], 2)):
+            self.assertEqual([row[0] for row in self.page(token).rows][:1], [12], token)
+        self.assertEqual(decode_token(encode_token("prev", ["2024-01-01", 3], 0), 2), ("prev", ["2024-01-01", 3], 1))
+
+    def test_uses_the_index(self):
+        plan = " ".join(row[3] for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN " + ROWS_SQL.format(after="(created_at, id) < (?, ?)", order="created_at DESC, id DESC"),
+            (1, "2024-01-03", 5, 5)))
+        self.assertIn("idx_patients_user_created", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+from werkzeug.datastructures import MultiDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from patient_export import (EXPORT_COLUMNS, ExportError, columnar_available, export_csv, export_parquet,
+                            parse_options)
+
+
+class PatientExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "app.db"))
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO users (username, role) VALUES ('ana', 'patient')")
+        self.conn.executemany(
+            "INSERT INTO patients (user_id, name, glucose, stage, created_at) VALUES (1, ?, ?, ?, ?)",
+            [(f"p{i}", 100 + i, ["Normal", "Pre-Diabetic", "Type 2 Diabetes"][i % 3], f"2024-01-{i % 28 + 1:02d} 09:30:00")
+             for i in range(2500)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def export(self, chunk_size=1000, **args):
+        options = parse_options(MultiDict(args))
+        data = b"".join(export_csv(self.conn, options, chunk_size))
+        if options.gzip:
+            data = gzip.decompress(data)
+        return list(csv.reader(io.StringIO(data.decode())))
+
+    def test_full_export_matches_the_old_format(self):
+        rows = self.export(chunk_size=300)
+        self.assertEqual(rows[0], [column.header for column in EXPORT_COLUMNS.values()])
+        self.assertEqual(len(rows), 2501)
+        self.assertEqual(rows[1][:3], ["1", "ana", "p0"])
+        # Dates lose their time part
+        self.assertEqual(rows[1][-1], "2024-01-01")
+        self.assertEqual([row[0] for row in rows[1:]], [str(i) for i in range(1, 2501)])
+
+    def test_filters_columns_and_gzip(self):
+        rows = self.export(columns="name,created_at", stage=["Normal", "Type 2 Diabetes"],
+                           **{"from": "2024-01-02", "to": "2024-01-03"}, gzip="1")
+        self.assertEqual(rows[0], ["Patient Name", "Date"])
+        expected = [f"p{i}" for i in range(2500) if i % 3 != 1 and i % 28 + 1 in (2, 3)]
+        self.assertEqual([row[0] for row in rows[1:]], expected)
+        self.assertEqual({row[1] for row in rows[1:]}, {"2024-01-02", "2024-01-03"})
+        self.assertEqual(len(self.export(stage="Normal,Pre-Diabetic")), 1 + 2500 - 833)
+
+    def test_rejects_bad_parameters(self):
+        for args in ({"columns": "id,password"}, {"from": "01/02/2024"}, {"from": "2024-02-01", "to": "2024-01-01"}):
+            with self.assertRaises(ExportError):
+                parse_options(MultiDict(args))
+
+    def test_reads_in_chunks(self):
+        options = parse_options(MultiDict({"columns": "id"}))
+        blocks = export_csv(self.conn, options, chunk_size=1000)
+        # Header and the first chunk, then one block per further chunk
+        self.assertEqual([block.count(b"\n") for block in blocks], [1001, 1000, 500])
+
+    def read_parquet(self, since_id=None, row_group_rows=1000, **args):
+        import pyarrow.parquet as pq
+
+        blocks, last_id = export_parquet(self.conn, parse_options(MultiDict(args)), since_id, row_group_rows)
+        return pq.ParquetFile(io.BytesIO(b"".join(blocks))), last_id
+
+    @unittest.skipUnless(columnar_available(), "pyarrow is not installed")
+    def test_parquet_is_typed_and_split_into_row_groups(self):
+        import pyarrow as pa
+
+        self.conn.execute("UPDATE patients SET glucose = '123', age = 41 WHERE id = 1")
+        parquet, last_id = self.read_parquet()
+        self.assertEqual(last_id, 2500)
+        self.assertEqual(parquet.metadata.num_rows, 2500)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertNotIn("name", table.column_names)
+        self.assertEqual(table.schema.field("glucose").type, pa.float64())
+        self.assertEqual(table.schema.field("age").type, pa.int32())
+        self.assertEqual(table.schema.field("created_at").type, pa.timestamp("ms", tz="UTC"))
+        first = table.slice(0, 1).to_pylist()[0]
+        self.assertEqual((first["id"], first["glucose"], first["age"], first["stage"]), (1, 123.0, 41, "Normal"))
+        self.assertEqual(first["created_at"].strftime("%Y-%m-%d %H:%M:%S"), "2024-01-01 09:30:00")
+
+    @unittest.skipUnless(columnar_available(), "pyarrow is not installed")
+    def test_parquet_incremental_and_filtered(self):
+        parquet, last_id = self.read_parquet(since_id=2400)
+        self.assertEqual(parquet.read().column("id").to_pylist(), list(range(2401, 2501)))
+        self.conn.execute("INSERT INTO patients (user_id, name, stage) VALUES (1, 'new', 'Normal')")
+        parquet, last_id = self.read_parquet(since_id=last_id)
+        self.assertEqual((parquet.read().column("id").to_pylist(), last_id), ([2501], 2501))
+        # Nothing new is still a valid, empty file
+        parquet, same_id = self.read_parquet(since_id=last_id)
+        self.assertEqual((parquet.metadata.num_rows, same_id), (0, 2501))
+
+        parquet, _ = self.read_parquet(stage="Pre-Diabetic", **{"from": "2024-01-02", "to": "2024-01-02"})
+        self.assertEqual(parquet.read().column("id").to_pylist(),
+                         [i + 1 for i in range(2500) if i % 3 == 1 and i % 28 == 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import patient_search
+from migrations import migrate
+from patient_search import check, drop_patient_search, index_exists, match_query, rebuild, search_patients
+
+
+class PatientSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "app.db"))
+        migrate(self.conn)
+        self.conn.executemany("INSERT INTO users (username, role) VALUES (?, ?)", [("jdoe", "patient"), ("mary", "patient")])
+        self.conn.executemany(
+            "INSERT INTO patients (user_id, name, result, stage) VALUES (?, ?, ?, ?)",
+            [(1, "John Doe", "Diabetic", "Type 2 Diabetes"),
+             (1, "Johanna Roe", "Not Diabetic", "Normal"),
+             (2, "Maria José", "Diabetic", "Pre-Diabetic"),
+             (2, "Peter Type", "Not Diabetic", "Normal")])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def names(self, text, limit=10, token=None):
+        total, page = search_patients(self.conn, text, limit, token, exact_count=True)
+        return total, [row[2] for row in page.rows]
+
+    def test_match_query_quotes_user_input(self):
+        self.assertEqual(match_query('jo  "type 2'), '"jo"* """type"* "2"*')
+        self.assertEqual(match_query("OR NEAR("), '"OR"* "NEAR("*')
+        self.assertIsNone(match_query(" % "))
+
+    def test_prefix_search_and_ranking(self):
+        self.assertEqual(self.names("joh"), (2, ["Johanna Roe", "John Doe"]))
+        self.assertEqual(self.names("jose"), (1, ["Maria José"]))
+        self.assertEqual(self.names("JDO"), (2, ["Johanna Roe", "John Doe"]))
+        # A name hit outranks stage hits
+        total, names = self.names("type")
+        self.assertEqual((total, names[0]), (2, "Peter Type"))
+        self.assertEqual(self.names("type 2 diab"), (1, ["John Doe"]))
+        first = search_patients(self.conn, "joh", 1)[1]
+        self.assertEqual(self.names("joh", limit=1, token=first.next_token)[1], ["John Doe"])
+
+    def test_broad_searches_list_newest_first(self):
+        with patch.object(patient_search, "RANK_LIMIT", 1):
+            self.assertEqual(self.names("type"), (2, ["Peter Type", "John Doe"]))
+            first = search_patients(self.conn, "diab", 1)[1]
+            self.assertEqual(self.names("diab", limit=2, token=first.next_token), (4, ["Maria José", "Johanna Roe"]))
+
+    def test_index_follows_writes(self):
+        self.conn.execute("UPDATE patients SET stage='Normal', result='Not Diabetic' WHERE name='John Doe'")
+        self.conn.execute("DELETE FROM patients WHERE name='Johanna Roe'")
+        self.conn.execute("UPDATE users SET username='jsmith' WHERE id=1")
+        # Patients whose user is gone drop out, as they do from the dashboard's JOIN
+        self.conn.execute("DELETE FROM users WHERE id=2")
+        self.conn.commit()
+        self.assertEqual(self.names("type 2")[0], 0)
+        self.assertEqual(self.names("joh"), (1, ["John Doe"]))
+        self.assertEqual(self.names("jsmi"), (1, ["John Doe"]))
+        self.assertEqual(self.names("maria")[0], 0)
+        self.conn.execute("INSERT INTO users (id, username) VALUES (2, 'mary')")
+        self.assertEqual(self.names("maria"), (1, ["Maria José"]))
+        self.assertEqual(check(self.conn), [])
+
+    def test_falls_back_to_like(self):
+        # Inside words only LIKE matches
+        self.assertEqual(self.names("oh")[0], 0)
+        drop_patient_search(self.conn)
+        self.assertFalse(index_exists(self.conn))
+        self.assertEqual(self.names("oh"), (2, ["Johanna Roe", "John Doe"]))
+        # Without the index the count is a second scan, so it is only run on request
+        self.assertIsNone(search_patients(self.conn, "oh", 10)[0])
+        self.conn.execute("INSERT INTO patients (user_id, name) VALUES (2, 'Late Entry')")
+        self.conn.commit()
+
+        with patch.object(patient_search, "fts5_available", return_value=False), patch("builtins.print"):
+            self.assertFalse(rebuild(self.conn))
+        self.assertEqual(self.names("late")[0], 1)
+
+        self.assertTrue(rebuild(self.conn))
+        self.assertEqual(self.names("late")[0], 1)
+        self.assertEqual(check(self.conn), [])
+
+    def test_check_finds_stale_rows(self):
+        self.conn.execute("DELETE FROM patient_search WHERE rowid=3")
+        self.conn.execute("UPDATE patient_search SET name='Someone Else' WHERE rowid=1")
+        self.assertEqual(check(self.conn), [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
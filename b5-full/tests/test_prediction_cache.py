@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import canonicalize_features
+from prediction_cache import ArtifactFingerprint, PredictionCache
+
+
+class PredictionCacheTestCase(unittest.TestCase):
+    def test_hit_miss_and_lru_eviction(self):
+        cache = PredictionCache(max_entries=2)
+        self.assertIsNone(cache.get([1, 2]))
+        cache.put([1, 2], "a", "")
+        cache.put([3, 4], "b", "")
+        self.assertEqual(cache.get([1, 2]), "a")
+        cache.put([5, 6], "c", "")  # evicts [3, 4], the least recently used
+        self.assertIsNone(cache.get([3, 4]))
+        self.assertEqual(cache.get([1, 2]), "a")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 2, 1))
+
+    def test_ttl_expiry(self):
+        cache = PredictionCache(max_entries=10, ttl_seconds=0.05)
+        cache.put([1], "a", "")
+        self.assertEqual(cache.get([1]), "a")
+        time.sleep(0.06)
+        self.assertIsNone(cache.get([1]))
+
+    def test_model_version_change_invalidates(self):
+        version = {"value": "v1"}
+        cache = PredictionCache(max_entries=10, version_provider=lambda: version["value"])
+        cache.put([1], "a", "v1")
+        version["value"] = "v2"
+        self.assertIsNone(cache.get([1]))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_result_from_a_swapped_out_model_is_not_cached(self):
+        version = {"value": "v1"}
+        cache = PredictionCache(max_entries=10, version_provider=lambda: version["value"])
+        self.assertIsNone(cache.get([1]))
+        # The model is hot-swapped while the request that missed is still scoring with v1
+        version["value"] = "v2"
+        cache.put([1], "scored by v1", "v1")
+        self.assertIsNone(cache.get([1]))
+        cache.put([1], "scored by v2", "v2")
+        self.assertEqual(cache.get([1]), "scored by v2")
+
+    def test_disabled_cache(self):
+        cache = PredictionCache(max_entries=0)
+        cache.put([1], "a", "")
+        self.assertIsNone(cache.get([1]))
+
+    def test_fingerprint_tracks_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.pkl")
+            with open(path, "wb") as f:
+                f.write(b"one")
+            fingerprint = ArtifactFingerprint([path], check_interval=0)
+            first = fingerprint.version()
+            with open(path, "wb") as f:
+                f.write(b"two!")
+            self.assertNotEqual(fingerprint.version(), first)
+
+    def test_canonical_features_round_to_form_precision(self):
+        self.assertEqual(canonicalize_features([1, 120.04, 70, 20, 79, 25.04, 0.504, 33.0]),
+                         [1, 120.0, 70.0, 20.0, 79.0, 25.0, 0.5, 33])
+
+
+if __name__ == '__main__':
+    unittest.main()
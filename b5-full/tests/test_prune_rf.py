@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_models import CompiledTreeEnsemble
+from prune_rf import prune_forest, refit_depth, select_trees, tree_probabilities
+
+
+class PruneForestTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(0)
+        cls.X = rng.normal(size=(400, 8))
+        cls.y = (cls.X[:, 0] + cls.X[:, 1] * cls.X[:, 2] + rng.normal(scale=0.5, size=400) > 0).astype(int)
+        cls.forest = RandomForestClassifier(n_estimators=12, max_depth=8, random_state=0).fit(cls.X, cls.y)
+
+    def test_depth_refit_keeps_every_tree_seed(self):
+        shallow = refit_depth(self.forest, self.X, self.y, 3)
+        self.assertEqual(len(shallow.estimators_), 12)
+        self.assertLessEqual(max(e.get_depth() for e in shallow.estimators_), 3)
+        self.assertEqual([e.random_state for e in shallow.estimators_],
+                         [e.random_state for e in self.forest.estimators_])
+        # The original forest is left as it was
+        self.assertEqual(self.forest.max_depth, 8)
+        self.assertGreater(max(e.get_depth() for e in self.forest.estimators_), 3)
+
+    def test_pruned_forest_is_a_drop_in_forest(self):
+        indices = [3, 0, 7]
+        pruned = prune_forest(self.forest, indices)
+        self.assertIsInstance(pruned, RandomForestClassifier)
+        self.assertEqual(pruned.n_estimators, 3)
+        self.assertEqual(len(self.forest.estimators_), 12)
+        expected = tree_probabilities(self.forest, self.X)[indices].mean(axis=0)
+        np.testing.assert_allclose(pruned.predict_proba(self.X)[:, 1], expected)
+        compiled = CompiledTreeEnsemble.from_sklearn_forest(None, pruned)
+        np.testing.assert_allclose(compiled.positive_proba(self.X), expected)
+
+    def test_select_trees_tracks_the_full_forest(self):
+        reference = self.forest.predict(self.X)
+        probabilities = tree_probabilities(self.forest, self.X)
+        np.testing.assert_allclose(probabilities.mean(axis=0), self.forest.predict_proba(self.X)[:, 1])
+        chosen = select_trees(probabilities, reference, 5)
+        self.assertEqual(len(set(chosen)), 5)
+        agreement = ((probabilities[chosen].mean(axis=0) > 0.5) == reference).mean()
+        self.assertGreaterEqual(agreement, ((probabilities[0] > 0.5) == reference).mean())
+
+
+if __name__ == '__main__':
+    unittest.main()
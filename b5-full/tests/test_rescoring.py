@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add parent directory to path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from inference import FEATURE_COLUMNS, PREDICTION_COLUMNS
+from migrations import migrate
+from rescoring import RescoringBusy, RescoringJob
+
+
+class CountingEngine:
+    """Wraps an EnsembleEngine, counting scored rows and optionally pausing the job"""
+
+    def __init__(self, engine, version):
+        self.engine = engine
+        self.version = version
+        self.rows = 0
+        self.on_predict = None
+
+    def predict(self, X):
+        self.rows += len(X)
+        result = self.engine.predict(X)
+        result.model_version = self.version
+        if self.on_predict:
+            self.on_predict()
+        return result
+
+
+class RescoringJobTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not os.path.exists(os.path.join(PROJECT_DIR, "diabetes_model_rf.pkl")):
+            raise unittest.SkipTest("Model artifacts not found; run train_model.py first")
+        from model_store import load_engine
+        cls.base_engine, _ = load_engine(directory=PROJECT_DIR)
+        data = np.genfromtxt(os.path.join(PROJECT_DIR, "diabetes.csv"), delimiter=",", skip_header=1)
+        cls.X = data[:23, :len(FEATURE_COLUMNS)]
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        conn = self.connect()
+        migrate(conn, analyze=False)
+        with conn:
+            conn.executemany(f"""
+                INSERT INTO patients (user_id, name, {', '.join(FEATURE_COLUMNS)}, result, stage, model_version)
+                VALUES (1, 'P', ?, ?, ?, ?, ?, ?, ?, ?, 'old', 'old', 'v1')
+            """, self.X.tolist())
+        conn.close()
+        self.engine = CountingEngine(self.base_engine, "v2")
+        self.job = RescoringJob(self.connect, lambda: self.engine, chunk_size=5, min_pause=0)
+
+    def tearDown(self):
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def fetch(self, sql):
+        conn = self.connect()
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_rescores_every_row_with_one_call_per_chunk(self):
+        job_id = self.job.prepare()
+        self.job.run(job_id)
+        progress = self.job.progress()
+        self.assertEqual(progress["status"], "completed")
+        self.assertEqual((progress["rows_total"], progress["rows_done"]), (23, 23))
+        self.assertEqual(self.engine.rows, 23)
+
+        expected = self.base_engine.predict(self.X)
+        stored = self.fetch(f"SELECT result, model_version, {', '.join(PREDICTION_COLUMNS)} FROM patients ORDER BY id")
+        for i, row in enumerate(stored):
+            self.assertEqual(row[0], expected.row(i)['result'])
+            self.assertEqual(row[1], "v2")
+            self.assertEqual(list(row[2:5]), expected.row(i)['votes'])
+        self.assertNotIn("old", {r[0] for r in self.fetch("SELECT stage FROM patients")})
+
+    def test_pause_and_resume_without_rescoring_done_rows(self):
+        self.engine.on_predict = lambda: self.job.stop() if self.engine.rows >= 10 else None
+        job_id = self.job.prepare()
+        self.job.run(job_id)
+        progress = self.job.progress()
+        self.assertEqual(progress["status"], "paused")
+        self.assertEqual(progress["rows_done"], 10)
+
+        self.engine.on_predict = None
+        self.job._stop.clear()
+        self.assertEqual(self.job.prepare(), job_id)
+        self.job.run(job_id)
+        self.assertEqual(self.job.progress()["status"], "completed")
+        self.assertEqual(self.engine.rows, 23)
+
+    def test_second_start_is_refused_while_running(self):
+        self.job.prepare()
+        with self.assertRaises(RescoringBusy):
+            self.job.prepare()
+
+    def test_model_change_supersedes_job(self):
+        job_id = self.job.prepare()
+        self.engine.on_predict = lambda: setattr(self.engine, "version", "v3")
+        self.job.run(job_id)
+        self.assertEqual(self.job.progress()["status"], "superseded")
+        # A new job for v3 picks up every row, including those v2 already did
+        new_id = self.job.prepare()
+        self.assertNotEqual(new_id, job_id)
+        self.assertEqual(self.job.progress()["rows_total"], 23)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import EnsembleResult
+from migrations import migrate
+from shadow import ShadowEvaluator
+
+
+class FakeEngine:
+    """Votes diabetic on every model when glucose is above the threshold"""
+
+    def __init__(self, threshold, version):
+        self.threshold = threshold
+        self.version = version
+
+    def predict(self, X):
+        votes = np.repeat((np.asarray(X)[:, 1:2] > self.threshold).astype(int), 3, axis=1)
+        return EnsembleResult(votes, votes * 90.0 + 5.0, self.version)
+
+
+def served(features, engine):
+    return engine.predict(np.array([features])).row(0)
+
+
+class ShadowEvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "shadow.db")
+        conn = self.connect()
+        migrate(conn, analyze=False)
+        conn.close()
+        self.primary = FakeEngine(140, "v1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def evaluator(self, **kwargs):
+        loader = lambda version: (FakeEngine(120, version), "fake")
+        return ShadowEvaluator(self.connect, loader, candidate_version="v2", **kwargs)
+
+    def test_batches_are_scored_and_summarised(self):
+        shadow = self.evaluator(sample_rate=1.0, batch_size=4, max_wait=0.05)
+        # The last two requests were served from the cache, so they report no scoring time
+        for glucose, seconds in ((100, 0.004), (130, 0.002), (130, 0.002), (150, 0.004), (110, None), (160, None)):
+            features = [1, glucose, 70, 20, 80, 25.0, 0.3, 30]
+            self.assertTrue(shadow.submit(features, served(features, self.primary), seconds))
+        deadline = time.time() + 5
+        while shadow.scored < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(shadow.scored, 6)
+        self.assertIsNone(shadow.error)
+
+        conn = self.connect()
+        summary = shadow.summary(conn)
+        conn.close()
+        self.assertEqual(len(summary), 1)
+        self.assertEqual((summary[0]["primary_version"], summary[0]["candidate_version"]), ("v1", "v2"))
+        self.assertEqual(summary[0]["rows"], 6)
+        # Candidate calls glucose 130 diabetic, the active model does not
+        self.assertEqual(summary[0]["disagreement_rate"], round(2 / 6, 4))
+        self.assertEqual(summary[0]["model_disagreement_rate"]["rf"], round(2 / 6, 4))
+        # Averaged over the requests that were actually scored
+        self.assertEqual(summary[0]["primary_ms_per_row"], 3.0)
+        self.assertIsNotNone(summary[0]["candidate_ms_per_row"])
+
+    def test_submit_drops_instead_of_blocking(self):
+        release = threading.Event()
+
+        def slow_loader(version):
+            release.wait(5)
+            return FakeEngine(120, version), "fake"
+
+        shadow = self.evaluator(sample_rate=1.0, queue_size=2, batch_size=1)
+        shadow.candidate_loader = slow_loader
+        features = [1, 130, 70, 20, 80, 25.0, 0.3, 30]
+        row = served(features, self.primary)
+        started = time.perf_counter()
+        results = [shadow.submit(features, row) for _ in range(20)]
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreater(shadow.dropped, 0)
+        self.assertEqual(shadow.sampled + shadow.dropped, 20)
+        self.assertEqual(results.count(True), shadow.sampled)
+        release.set()
+        # Let the worker finish writing before the database is removed
+        deadline = time.time() + 5
+        while shadow.scored < shadow.sampled and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_unknown_candidate_version_is_reported_not_replaced(self):
+        def loader(version):
+            raise FileNotFoundError(f"Model version {version!r} is not in the registry")
+
+        shadow = ShadowEvaluator(self.connect, loader, candidate_version="v-typo",
+                                 sample_rate=1.0, batch_size=1, max_wait=0.01)
+        features = [1, 130, 70, 20, 80, 25.0, 0.3, 30]
+        self.assertTrue(shadow.submit(features, served(features, self.primary)))
+        deadline = time.time() + 5
+        while shadow.error is None and time.time() < deadline:
+            time.sleep(0.01)
+
+        stats = shadow.stats()
+        self.assertIn("v-typo", stats["candidate_error"])
+        self.assertFalse(stats["candidate_loaded"])
+        self.assertEqual(shadow.scored, 0)
+        conn = self.connect()
+        self.assertEqual(shadow.summary(conn), [])
+        conn.close()
+
+    def test_disabled_without_candidate(self):
+        shadow = self.evaluator(sample_rate=1.0)
+        shadow.candidate_version = ""
+        self.assertFalse(shadow.submit([1] * 8, served([1] * 8, self.primary)))
+        self.assertIsNone(shadow._worker)
+        self.assertFalse(self.evaluator(sample_rate=0).submit([1] * 8, served([1] * 8, self.primary)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from staging import STAGE_COLUMNS, STAGE_NAMES, STAGE_RULES, classify_stage, classify_stages, stage_indices
+
+
+def legacy_stage(glucose, insulin, bmi):
+    """The original scalar if/elif chain from predict()"""
+    if glucose < 110 and bmi < 25:
+        return "Normal"
+    elif 110 <= glucose <= 140 or bmi >= 25:
+        return "Pre-Diabetic"
+    elif glucose >= 140 and insulin < 30:
+        return "Type 1 Diabetes"
+    return "Type 2 Diabetes"
+
+
+class StagingTestCase(unittest.TestCase):
+    def setUp(self):
+        # Every rule boundary, values just either side of it, and a random sample
+        glucose = [0, 109.9, 110, 110.1, 139.9, 140, 140.1, 200, 400]
+        insulin = [0, 29.9, 30, 30.1, 500]
+        bmi = [10, 24.9, 25, 25.1, 70]
+        grid = np.array(np.meshgrid(glucose, insulin, bmi)).reshape(3, -1)
+        rng = np.random.default_rng(0)
+        sample = np.vstack([rng.uniform(0, 400, 5000), rng.uniform(0, 900, 5000), rng.uniform(10, 70, 5000)])
+        self.glucose, self.insulin, self.bmi = np.hstack([grid, sample])
+
+    def test_matches_legacy_chain(self):
+        expected = [legacy_stage(g, i, b) for g, i, b in zip(self.glucose, self.insulin, self.bmi)]
+        indices = stage_indices(self.glucose, self.insulin, self.bmi)
+        self.assertEqual([STAGE_NAMES[k] for k in indices], expected)
+        self.assertEqual(set(expected), set(STAGE_NAMES))
+
+    def test_single_row_matches_batch(self):
+        batch = classify_stages(self.glucose[:200], self.insulin[:200], self.bmi[:200])
+        for k in range(200):
+            self.assertEqual(classify_stage(self.glucose[k], self.insulin[k], self.bmi[k]), batch[k])
+
+    def test_scalar_and_vector_agree_at_every_threshold(self):
+        # Each threshold of each column, the nearest floats either side of it, and NaN
+        values = []
+        for name in STAGE_COLUMNS:
+            column = [np.nan, -1e9, 1e9]
+            for t in {value for rule in STAGE_RULES for clause in rule.clauses
+                      for column_name, _, value in clause if column_name == name}:
+                column += [np.nextafter(t, -np.inf), t, np.nextafter(t, np.inf)]
+            values.append(column)
+        glucose, insulin, bmi = np.array(np.meshgrid(*values)).reshape(3, -1)
+
+        batch = classify_stages(glucose, insulin, bmi)
+        single = [classify_stage(g, i, b) for g, i, b in zip(glucose, insulin, bmi)]
+        self.assertEqual(single, batch)
+        self.assertEqual([stage for stage, _, _ in batch],
+                         [legacy_stage(g, i, b) for g, i, b in zip(glucose, insulin, bmi)])
+
+    def test_outputs_are_independent_copies(self):
+        stage, keys, suggestion = classify_stage(95, 80, 22)
+        self.assertEqual(stage, "Normal")
+        keys.append("mutated")
+        self.assertNotIn("mutated", classify_stage(95, 80, 22)[1])
+
+    def test_missing_values_fall_through_like_the_chain(self):
+        self.assertEqual(classify_stage(np.nan, 10, 22)[0], legacy_stage(np.nan, 10, 22))
+
+
+if __name__ == '__main__':
+    unittest.main()
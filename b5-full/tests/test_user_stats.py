@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from user_stats import check, read_user_stats, rebuild
+
+
+class UserStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "app.db"))
+        migrate(self.conn)
+        self.conn.executemany("INSERT INTO users (username, role) VALUES (?, ?)", [("ana", "patient"), ("ben", "patient")])
+        self.conn.executemany(
+            "INSERT INTO patients (user_id, name, glucose, bmi, bp, stage, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(1, "a1", 100, 22.0, 70, "Normal", "2024-01-01 10:00:00"),
+             (1, "a2", 130, 27.5, 80, "Pre-Diabetic", "2024-02-01 10:00:00"),
+             (1, "a3", 180, 31.0, None, "Type 2 Diabetes", "2024-03-01 10:00:00"),
+             (1, "a4", None, 29.0, 90, "Type 2 Diabetes", "2024-04-01 10:00:00"),
+             (2, "b1", 250, 40.0, 100, "Type 2 Diabetes", "2024-01-15 10:00:00")])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def full_scan(self, user_id):
+        # The aggregates history() used to compute on every view
+        return self.conn.execute("""
+            SELECT COUNT(*), AVG(glucose), AVG(bmi), AVG(bp), MIN(glucose), MAX(glucose), MIN(bmi), MAX(bmi)
+            FROM patients WHERE user_id=?""", (user_id,)).fetchone()
+
+    def assertMatchesScan(self, user_id):
+        stats = read_user_stats(self.conn, user_id)
+        expected = [round(v, 1) if v else 0 for v in self.full_scan(user_id)]
+        self.assertEqual([stats[k] for k in ("total_tests", "avg_glucose", "avg_bmi", "avg_bp", "min_glucose",
+                                             "max_glucose", "min_bmi", "max_bmi")], expected)
+        self.assertEqual(check(self.conn), {})
+        return stats
+
+    def test_inserts(self):
+        stats = self.assertMatchesScan(1)
+        self.assertEqual(stats["total_tests"], 4)
+        self.assertEqual(stats["min_glucose"], 100)
+        self.assertEqual(stats["avg_bp"], 80)
+        self.assertEqual(stats["stage_distribution"], {"Normal": 1, "Pre-Diabetic": 1, "Type 2 Diabetes": 2})
+        # Oldest first, last five at most
+        self.assertEqual(stats["trend_glucose"], [100, 130, 180, None])
+        self.assertEqual(stats["trend_dates"][0], "2024-01-01")
+        self.assertEqual(read_user_stats(self.conn, 2)["max_bmi"], 40)
+
+    def test_delete_and_update_recompute_extremes(self):
+        # a3 holds the max glucose; a1 the min glucose and BMI
+        self.conn.execute("DELETE FROM patients WHERE name='a3'")
+        self.conn.execute("UPDATE patients SET glucose=140, bmi=26.0, stage='Pre-Diabetic' WHERE name='a1'")
+        self.conn.commit()
+        stats = self.assertMatchesScan(1)
+        self.assertEqual((stats["min_glucose"], stats["max_glucose"]), (130, 140))
+        self.assertEqual(stats["stage_distribution"], {"Pre-Diabetic": 2, "Type 2 Diabetes": 1})
+
+        self.conn.execute("UPDATE patients SET user_id=2 WHERE name='a2'")
+        self.conn.execute("DELETE FROM patients WHERE user_id=1")
+        self.conn.commit()
+        self.assertEqual(read_user_stats(self.conn, 1)["total_tests"], 0)
+        self.assertEqual(self.assertMatchesScan(2)["total_tests"], 2)
+
+    def test_rebuild_repairs_drift(self):
+        self.conn.execute("UPDATE user_stats SET glucose_max = 999 WHERE user_id=1 AND stage='Type 2 Diabetes'")
+        self.conn.commit()
+        self.assertIn((1, "Type 2 Diabetes"), check(self.conn))
+        rebuild(self.conn)
+        self.assertMatchesScan(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ from sklearn.ensemble import RandomForestClassifier
 from xgboost import XGBClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
+import os
 
 print("🚀 Starting Multi-Model Training...")
 print("=" * 60)
@@ -96,6 +97,23 @@ print("   ✓ Scaler saved")
 joblib.dump(model_lr, "diabetes_model.pkl")
 print("   ✓ Legacy model saved")
 
+# Compiled (memory-mappable) bundle used by the app for fast inference
+from compiled_models import compile_artifacts
+compile_artifacts()
+print("   ✓ Compiled model bundle saved")
+
+# Publish as a new registry version; running workers swap to it without a restart
+from model_registry import ModelRegistry
+version = ModelRegistry(os.getenv("MODEL_REGISTRY_DIR", "model_registry")).publish(metadata={
+    "accuracy": {
+        "lr": round(accuracy_lr, 4),
+        "rf": round(accuracy_rf, 4),
+        "xgb": round(accuracy_xgb, 4),
+        "ensemble": round(accuracy_ensemble, 4),
+    },
+})
+print(f"   ✓ Published model version {version}")
+
 print("\n" + "=" * 60)
 print("✅ Multi-Model AI System Training Complete!")
 print("=" * 60)
@@ -0,0 +1,228 @@
+"""
+Incrementally maintained per-user statistics for the history page.
+
+``user_stats`` holds one row per (user, stage) with the count, the sums and
+non-NULL counts of glucose, BMI and BP, and the min/max of glucose and BMI.
+history() reads a user's few rows (one per stage they have records in) and
+merges them, instead of aggregating their whole ``patients`` history on every
+view; the stage distribution falls out of the same rows.
+
+Triggers on ``patients`` keep the rows current for every write path, like
+``dashboard_stats``.  Inserts only widen min/max.  A delete or update that
+removes a row holding its group's current min or max recomputes that group's
+extremes from the user's own rows (``idx_patients_user_created``); all other
+changes are O(1).
+
+    python user_stats.py check      # compare with a full recount
+    python user_stats.py rebuild    # recompute the table from scratch
+"""
+
+import argparse
+import math
+import os
+
+USER_STATS_SQL = """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER NOT NULL,
+        stage TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        glucose_sum REAL NOT NULL DEFAULT 0,
+        glucose_n INTEGER NOT NULL DEFAULT 0,
+        glucose_min REAL,
+        glucose_max REAL,
+        bmi_sum REAL NOT NULL DEFAULT 0,
+        bmi_n INTEGER NOT NULL DEFAULT 0,
+        bmi_min REAL,
+        bmi_max REAL,
+        bp_sum REAL NOT NULL DEFAULT 0,
+        bp_n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, stage)
+    ) WITHOUT ROWID
+"""
+
+COLUMNS = ("count", "glucose_sum", "glucose_n", "glucose_min", "glucose_max",
+           "bmi_sum", "bmi_n", "bmi_min", "bmi_max", "bp_sum", "bp_n")
+
+# Rows without a user_id are skipped (the key cannot be NULL); a NULL stage is stored under ''
+_ADD_ROW = """
+    INSERT INTO user_stats (user_id, stage, {columns})
+    SELECT NEW.user_id, COALESCE(NEW.stage, ''), 1,
+           COALESCE(NEW.glucose, 0), NEW.glucose IS NOT NULL, NEW.glucose, NEW.glucose,
+           COALESCE(NEW.bmi, 0), NEW.bmi IS NOT NULL, NEW.bmi, NEW.bmi,
+           COALESCE(NEW.bp, 0), NEW.bp IS NOT NULL
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id, stage) DO UPDATE SET
+        count = count + 1,
+        glucose_sum = glucose_sum + excluded.glucose_sum,
+        glucose_n = glucose_n + excluded.glucose_n,
+        glucose_min = MIN(COALESCE(glucose_min, excluded.glucose_min), COALESCE(excluded.glucose_min, glucose_min)),
+        glucose_max = MAX(COALESCE(glucose_max, excluded.glucose_max), COALESCE(excluded.glucose_max, glucose_max)),
+        bmi_sum = bmi_sum + excluded.bmi_sum,
+        bmi_n = bmi_n + excluded.bmi_n,
+        bmi_min = MIN(COALESCE(bmi_min, excluded.bmi_min), COALESCE(excluded.bmi_min, bmi_min)),
+        bmi_max = MAX(COALESCE(bmi_max, excluded.bmi_max), COALESCE(excluded.bmi_max, bmi_max)),
+        bp_sum = bp_sum + excluded.bp_sum,
+        bp_n = bp_n + excluded.bp_n;
+""".format(columns=", ".join(COLUMNS))
+
+# Runs after the row has left patients, so the recount below no longer sees it
+_REMOVE_ROW = """
+    UPDATE user_stats SET
+        count = count - 1,
+        glucose_sum = glucose_sum - COALESCE(OLD.glucose, 0),
+        glucose_n = glucose_n - (OLD.glucose IS NOT NULL),
+        bmi_sum = bmi_sum - COALESCE(OLD.bmi, 0),
+        bmi_n = bmi_n - (OLD.bmi IS NOT NULL),
+        bp_sum = bp_sum - COALESCE(OLD.bp, 0),
+        bp_n = bp_n - (OLD.bp IS NOT NULL)
+    WHERE user_id = OLD.user_id AND stage = COALESCE(OLD.stage, '');
+    DELETE FROM user_stats WHERE user_id = OLD.user_id AND stage = COALESCE(OLD.stage, '') AND count <= 0;
+    UPDATE user_stats SET (glucose_min, glucose_max, bmi_min, bmi_max) = (
+        SELECT MIN(glucose), MAX(glucose), MIN(bmi), MAX(bmi) FROM patients
+        WHERE user_id = OLD.user_id AND COALESCE(stage, '') = COALESCE(OLD.stage, ''))
+    WHERE user_id = OLD.user_id AND stage = COALESCE(OLD.stage, '')
+      AND (OLD.glucose IN (glucose_min, glucose_max) OR OLD.bmi IN (bmi_min, bmi_max));
+"""
+
+TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_patient_insert AFTER INSERT ON patients
+        BEGIN {_ADD_ROW} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_patient_delete AFTER DELETE ON patients
+        BEGIN {_REMOVE_ROW} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_patient_update
+        AFTER UPDATE OF user_id, stage, glucose, bmi, bp ON patients
+        BEGIN {_REMOVE_ROW} {_ADD_ROW} END""",
+]
+
+# What the table should contain, computed from scratch
+EXPECTED_SQL = """
+    SELECT user_id, COALESCE(stage, ''), COUNT(*),
+           COALESCE(SUM(glucose), 0), COUNT(glucose), MIN(glucose), MAX(glucose),
+           COALESCE(SUM(bmi), 0), COUNT(bmi), MIN(bmi), MAX(bmi),
+           COALESCE(SUM(bp), 0), COUNT(bp)
+    FROM patients
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id, COALESCE(stage, '')
+"""
+
+TREND_SQL = """
+    /* query: user_stats_trend */
+    SELECT glucose, bmi, created_at
+    FROM patients
+    WHERE user_id=?
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+
+TREND_POINTS = 5
+
+
+def create_user_stats(conn):
+    """Table, triggers and initial contents; used by the schema migration"""
+    conn.execute(USER_STATS_SQL)
+    for sql in TRIGGERS_SQL:
+        conn.execute(sql)
+    _fill(conn)
+
+
+def _fill(conn):
+    conn.execute("DELETE FROM user_stats")
+    conn.execute(f"INSERT INTO user_stats (user_id, stage, {', '.join(COLUMNS)}) " + EXPECTED_SQL)
+
+
+def rebuild(conn):
+    """Recompute every row from patients in one write transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _fill(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _same(stored, expected):
+    if stored is None or expected is None:
+        return stored is expected
+    # min/max may be NULL; running float sums may differ from a fresh SUM() in the last bits
+    return all(a is b if a is None or b is None else math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+               for a, b in zip(stored, expected))
+
+
+def check(conn):
+    """Rows whose stored value differs from a full recount: {(user_id, stage): (stored, expected)}"""
+    stored = {(row[0], row[1]): tuple(row[2:])
+              for row in conn.execute(f"SELECT user_id, stage, {', '.join(COLUMNS)} FROM user_stats")}
+    expected = {(row[0], row[1]): tuple(row[2:]) for row in conn.execute(EXPECTED_SQL)}
+    return {key: (stored.get(key), expected.get(key))
+            for key in stored.keys() | expected.keys() if not _same(stored.get(key), expected.get(key))}
+
+
+def _rounded(value):
+    return round(value, 1) if value else 0
+
+
+def read_user_stats(conn, user_id, trend_points=TREND_POINTS):
+    """The history page's statistics: the user's stats rows merged, plus the latest trend points"""
+    total = dict.fromkeys(COLUMNS)
+    stage_distribution = {}
+    for row in conn.execute(f"/* query: user_stats */ SELECT stage, {', '.join(COLUMNS)} FROM user_stats WHERE user_id=?",
+                            (user_id,)):
+        stage_distribution[row[0] or None] = row[1]
+        for column, value in zip(COLUMNS, row[1:]):
+            if value is None:
+                continue
+            if total[column] is None:
+                total[column] = value
+            elif column.endswith("_min"):
+                total[column] = min(total[column], value)
+            elif column.endswith("_max"):
+                total[column] = max(total[column], value)
+            else:
+                total[column] += value
+
+    # Oldest first for the chart
+    trend = conn.execute(TREND_SQL, (user_id, trend_points)).fetchall()[::-1]
+    return {
+        'total_tests': total["count"] or 0,
+        'avg_glucose': _rounded(total["glucose_sum"] / total["glucose_n"]) if total["glucose_n"] else 0,
+        'avg_bmi': _rounded(total["bmi_sum"] / total["bmi_n"]) if total["bmi_n"] else 0,
+        'avg_bp': _rounded(total["bp_sum"] / total["bp_n"]) if total["bp_n"] else 0,
+        'min_glucose': _rounded(total["glucose_min"]),
+        'max_glucose': _rounded(total["glucose_max"]),
+        'min_bmi': _rounded(total["bmi_min"]),
+        'max_bmi': _rounded(total["bmi_max"]),
+        'stage_distribution': stage_distribution,
+        'trend_glucose': [row[0] for row in trend],
+        'trend_bmi': [row[1] for row in trend],
+        'trend_dates': [row[2][:10] if row[2] else '' for row in trend],
+    }
+
+
+def main():
+    from db import DEFAULT_DB_PATH, ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-user history statistics")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", DEFAULT_DB_PATH))
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.db, size=1, profile=os.getenv("DB_PRAGMA_PROFILE", "balanced"))
+    with pool.connection() as conn:
+        drift = check(conn)
+        for (user_id, stage), (stored, expected) in sorted(drift.items()):
+            print(f"  user {user_id}/{stage or '(none)'}: stored {stored}, expected {expected}")
+        if args.command == "rebuild":
+            rebuild(conn)
+            print(f"✓ Rebuilt user_stats ({len(drift)} rows had drifted)")
+        elif drift:
+            print(f"❌ {len(drift)} rows differ; run: python user_stats.py rebuild")
+        else:
+            print("✓ user_stats matches patients")
+    pool.close_all()
+    if args.command == "check" and drift:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()